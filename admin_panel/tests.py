@@ -1,3 +1,147 @@
-from django.test import TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from booking.forecast import FORECAST_KEY
+from booking.models import InventoryCategory, InventoryItem, User
+from salon_project.query_stats import QueryRecorder, rolling_stats
+
+
+class QueryStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = User.objects.create_user(
+            username="manager", email="manager@example.com", password="secret", is_staff=True,
+        )
+        cls.customer = User.objects.create_user(
+            username="customer", email="customer@example.com", password="secret",
+        )
+
+    def setUp(self):
+        rolling_stats.clear()
+
+    def test_staff_responses_carry_server_timing(self):
+        self.client.force_login(self.staff)
+        response = self.client.get(reverse('about'), HTTP_X_SERVER_TIMING='1')
+
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries, \d+ duplicated"')
+
+    def test_anonymous_responses_do_not(self):
+        response = self.client.get(reverse('about'))
+
+        self.assertNotIn('Server-Timing', response)
+
+    def test_perf_endpoint_reports_rolling_stats(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('about'))
+        self.client.get(reverse('about'))
+
+        views = self.client.get(reverse('adminpanel-perf')).json()['views']
+
+        self.assertEqual(views['about']['requests'], 2)
+        self.assertIn('queries_avg', views['about'])
+
+    def test_the_user_is_only_loaded_on_request(self):
+        # The availability API never reads request.user itself
+        self.client.get(reverse('availability'))
+        anonymous = rolling_stats.snapshot()['availability']['queries_max']
+        self.client.force_login(self.staff)
+
+        for headers, extra in (({}, 0), ({'HTTP_X_SERVER_TIMING': '1'}, 2)):
+            rolling_stats.clear()
+            cache.clear()
+            response = self.client.get(reverse('availability'), **headers)
+
+            # Session and user, loaded for the staff check when asked for, and counted
+            self.assertEqual(rolling_stats.snapshot()['availability']['queries_max'], anonymous + extra)
+            self.assertEqual(response.has_header('Server-Timing'), bool(extra))
+
+    def test_streamed_queries_are_counted_when_the_stream_ends(self):
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret",
+        )
+        category = InventoryCategory.objects.create(name="Hair")
+        InventoryItem.objects.create(name="Gel", category=category, quantity=5, unit_price=80)
+        self.client.force_login(admin_user)
+
+        response = self.client.get(reverse('admin:booking_inventoryitem_export'))
+        view = 'admin:booking_inventoryitem_export'
+        self.assertNotIn(view, rolling_stats.snapshot())
+
+        before = int(response['Server-Timing'].split('desc="')[1].split(' ')[0])
+        b''.join(response.streaming_content)
+
+        # The export's SELECT runs while the body is read
+        self.assertEqual(rolling_stats.snapshot()[view]['queries_max'], before + 1)
+
+    def test_recorder_keeps_a_bounded_number_of_statements(self):
+        recorder = QueryRecorder(max_statements=2)
+        with recorder.record():
+            for _ in range(3):
+                User.objects.exists()
+
+        self.assertEqual((recorder.count, len(recorder.statements)), (3, 2))
+
+    def test_reset_is_a_csrf_protected_post(self):
+        self.client.force_login(self.staff)
+        self.client.get(reverse('about'))
+
+        self.client.get(reverse('adminpanel-perf'), {'reset': '1'})
+        self.assertIn('about', rolling_stats.snapshot())
+
+        csrf_client = Client(enforce_csrf_checks=True)
+        csrf_client.force_login(self.staff)
+        self.assertEqual(csrf_client.post(reverse('adminpanel-perf')).status_code, 403)
+        self.assertIn('about', rolling_stats.snapshot())
+
+        self.assertEqual(self.client.post(reverse('adminpanel-perf')).json()['views'], {})
+
+    def test_perf_endpoint_is_staff_only(self):
+        self.client.force_login(self.customer)
+
+        response = self.client.get(reverse('adminpanel-perf'))
+
+        self.assertEqual(response.status_code, 302)
+
+
+class AdminInventoryTest(TestCase):
+
+    def setUp(self):
+        cache.delete(FORECAST_KEY)
+
+    def test_shows_reorder_suggestions(self):
+        staff = User.objects.create_user(
+            username="manager", email="manager@example.com", password="secret", is_staff=True,
+        )
+        category = InventoryCategory.objects.create(name="Hair")
+        InventoryItem.objects.create(name="Shampoo", category=category, quantity=1, min_stock=4, unit_price=100)
+        self.client.force_login(staff)
+
+        response = self.client.get(reverse('adminpanel-inventory'))
+
+        self.assertEqual([item.name for item in response.context['reorder_items']], ["Shampoo"])
+        self.assertEqual(response.context['reorder_items'][0].forecast['reorder'], 3)
+
+    def test_projected_use_is_dated_and_shows_zero(self):
+        staff = User.objects.create_user(
+            username="manager", email="manager@example.com", password="secret", is_staff=True,
+        )
+        category = InventoryCategory.objects.create(name="Hair")
+        InventoryItem.objects.create(
+            name="Shampoo", brand="Loreal", category=category, quantity=9, min_stock=4, unit_price=100,
+        )
+        self.client.force_login(staff)
+
+        response = self.client.get(reverse('adminpanel-inventory'))
+
+        computed_at = timezone.localtime(response.context['forecast']['computed_at'])
+        self.assertContains(response, f"as of {computed_at:%b %d, %H:%M}")
+        self.assertContains(response, "<td>0</td>", html=True)
+
+        # Added after the nightly forecast: not in it
+        InventoryItem.objects.create(name="Toner", brand="Loreal", category=category, quantity=9, unit_price=100)
+        response = self.client.get(reverse('adminpanel-inventory'))
+        self.assertContains(response, "<td>—</td>", count=1, html=True)
 
-# Create your tests here.
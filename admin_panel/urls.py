@@ -2,12 +2,13 @@ from django.contrib import admin
 from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
-from .views import admin_dashboard, admin_inventory
+from .views import admin_dashboard, admin_inventory, query_stats
 
 urlpatterns = [
     # Default admin site
     path('dashboard/', admin_dashboard, name='adminpanel-dashboard'),
     path('inventory/', admin_inventory, name='adminpanel-inventory'),
+    path('perf/', query_stats, name='adminpanel-perf'),
 
 
 ]
\ No newline at end of file
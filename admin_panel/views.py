@@ -1,10 +1,15 @@
 from django.shortcuts import render
-from booking.models import InventoryItem, Service, Appointment, User
+from booking.models import InventoryItem, Service, Appointment
+from booking.forecast import inventory_forecast
+from booking.stats import dashboard_stats, inventory_stats
 from django.shortcuts import render
-from django.utils.timezone import now
 from django.contrib.auth.decorators import login_required
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.contrib.admin.views.decorators import staff_member_required
+from django.http import JsonResponse
+from django.views.decorators.http import require_http_methods
+from salon_project.query_stats import rolling_stats
 
 
 
@@ -15,26 +20,9 @@ def admin_dashboard(request):
         return redirect('/login')
 
 
-    today = now().date()
-
     context = {
         # Stats
-        "today_appointments": Appointment.objects.filter(
-            appointment_date=today
-        ).count(),
-
-        "pending_appointments": Appointment.objects.filter(
-            status="pending"
-        ).count(),
-
-        "total_services": Service.objects.filter(
-            is_active=True
-        ).count(),
-
-        "total_customers": User.objects.filter(
-            role="customer",
-            is_active=True
-        ).count(),
+        **dashboard_stats(),
 
         # Recent appointments (NO customer here)
         "recent_appointments": Appointment.objects.select_related(
@@ -46,8 +34,9 @@ def admin_dashboard(request):
             is_active=True
         )[:5],
 
-        # Low stock items
+        # Low stock items (item_active_status_idx)
         "low_stock_items": InventoryItem.objects.filter(
+            is_active=True,
             status=InventoryItem.StockStatus.LOW_STOCK
         )[:5],
     }
@@ -60,15 +49,31 @@ def admin_inventory(request):
         messages.error(request, "Only Admins or staff are authorized to access this page.")
         return redirect('/login')
 
-    items = InventoryItem.objects.filter(is_active=True).select_related('category')
+    items = list(InventoryItem.objects.filter(is_active=True).select_related('category'))
+
+    # Nightly reorder forecast (forecast_inventory command), read from the cache
+    forecast = inventory_forecast()
+    for item in items:
+        item.forecast = forecast['items'].get(item.id)
+    by_id = {item.id: item for item in items}
 
     context = {
         'items': items,
-        'total_products': items.count(),
-        'in_stock': items.filter(status=InventoryItem.StockStatus.IN_STOCK).count(),
-        'low_stock': items.filter(status=InventoryItem.StockStatus.LOW_STOCK).count(),
-        'out_of_stock': items.filter(status=InventoryItem.StockStatus.OUT_OF_STOCK).count(),
+        'forecast': forecast,
+        'reorder_items': [by_id[item_id] for item_id in forecast['reorder'] if item_id in by_id],
+        **inventory_stats(),
     }
 
     return render(request, 'salon_admin/inventory.html', context)
 
+
+# 🔹 STAFF: rolling per-view query stats of this worker process (POST clears them)
+@staff_member_required
+@require_http_methods(["GET", "POST"])
+def query_stats(request):
+    if request.method == "POST":
+        rolling_stats.clear()
+
+    views = rolling_stats.snapshot()
+    ordered = sorted(views.items(), key=lambda item: -item[1]['total_ms_p95'])
+    return JsonResponse({"views": dict(ordered)})
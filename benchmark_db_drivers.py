@@ -0,0 +1,169 @@
+"""
+Fetch throughput of Appointment list queries per MySQL driver.
+
+    python benchmark_db_drivers.py                      # configured MySQL, every installed driver
+    python benchmark_db_drivers.py --seed 20000         # add fake appointments first
+    python benchmark_db_drivers.py --sqlite --seed 20000  # SQLite stand-in, no server needed
+
+Each driver runs in its own process: once ``MySQLdb`` is imported the
+driver behind it cannot be swapped.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+
+DRIVERS = ('mysqlclient', 'pymysql')
+
+
+def setup_django():
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salon_project.settings')
+    import django
+    django.setup()
+
+
+def seed(count):
+    from datetime import date, time as dtime, timedelta
+
+    from django.core.management import call_command
+    from booking.models import Appointment, User
+
+    call_command('migrate', verbosity=0)
+
+    staff_user, _ = User.objects.get_or_create(
+        username='bench-staff',
+        defaults={'email': 'bench-staff@example.com', 'role': 'staff'},
+    )
+    customer, _ = User.objects.get_or_create(
+        username='bench-customer',
+        defaults={'email': 'bench-customer@example.com'},
+    )
+    staff = staff_user.staff_profile
+
+    start = date(2020, 1, 1)
+    Appointment.objects.bulk_create(
+        [
+            Appointment(
+                staff=staff,
+                customer=customer,
+                name=f"Customer {i}",
+                email=f"customer{i}@example.com",
+                phone="9800000000",
+                appointment_date=start + timedelta(days=i // 8),
+                appointment_time=dtime(9 + i % 8, 0),
+                status='completed',
+                notes="Seeded by benchmark_db_drivers.py",
+            )
+            for i in range(count)
+        ],
+        batch_size=1000,
+    )
+
+
+def measure(rows, repeat):
+    from django.db import connection
+    from booking.models import Appointment
+    from salon_project import db_driver
+
+    listing = (
+        Appointment.objects
+        .select_related('staff__user', 'customer')
+        .order_by('-appointment_date', '-appointment_time', '-id')
+    )
+    fields = [field.attname for field in Appointment._meta.concrete_fields]
+
+    queries = {
+        'models': lambda: list(listing[:rows]),
+        'values_list': lambda: list(listing.values_list(*fields)[:rows]),
+    }
+
+    results = {}
+    for label, run in queries.items():
+        fetched = len(run())  # warm up connection and caches
+        best = min(timed(run) for _ in range(repeat))
+        results[label] = {
+            'rows': fetched,
+            'seconds': best,
+            'rows_per_second': fetched / best if best else 0,
+        }
+
+    driver = db_driver.installed if connection.vendor == 'mysql' else connection.vendor
+    return {'driver': driver, 'results': results}
+
+
+def timed(run):
+    started = time.perf_counter()
+    run()
+    return time.perf_counter() - started
+
+
+def run_child(driver, env, args, action):
+    command = [sys.executable, os.path.abspath(__file__), '--child', action,
+               '--rows', str(args.rows), '--repeat', str(args.repeat), '--seed', str(args.seed)]
+    child_env = dict(os.environ, **env, DB_DRIVER=driver)
+    completed = subprocess.run(command, env=child_env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'driver': driver, 'error': completed.stderr.strip().splitlines()[-1:]}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def print_report(report):
+    if 'error' in report:
+        print(f"❌ {report['driver']:<12} {' '.join(report['error'])}")
+        return
+    for label, result in report['results'].items():
+        print(
+            f"✅ {report['driver']:<12} {label:<12} "
+            f"{result['rows']:>7} rows  {result['seconds'] * 1000:8.1f} ms  "
+            f"{result['rows_per_second']:>10,.0f} rows/s"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000, help="Rows fetched per query")
+    parser.add_argument('--repeat', type=int, default=5, help="Best of N runs")
+    parser.add_argument('--seed', type=int, default=0, help="Insert N fake appointments first")
+    parser.add_argument('--sqlite', action='store_true', help="Use a throwaway SQLite database")
+    parser.add_argument('--child', choices=('seed', 'measure'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        setup_django()
+        if args.child == 'seed':
+            seed(args.seed)
+            print(json.dumps({'seeded': args.seed}))
+        else:
+            print(json.dumps(measure(args.rows, args.repeat)))
+        return
+
+    print("🏁 Appointment fetch benchmark")
+    print("=" * 40)
+
+    env = {}
+    drivers = DRIVERS
+    if args.sqlite:
+        env = {'DB_ENGINE': 'sqlite', 'DB_SQLITE_PATH': os.path.join(tempfile.mkdtemp(), 'bench.sqlite3')}
+        # sqlite3 is the C module from the standard library; only one pass is meaningful
+        drivers = ('pymysql',)
+
+    if args.seed or args.sqlite:
+        seeded = run_child(drivers[-1], env, args, 'seed')
+        if 'error' in seeded:
+            print(f"❌ Seeding failed: {' '.join(seeded['error'])}")
+            sys.exit(1)
+        if args.seed:
+            print(f"🌱 Seeded {args.seed} appointments")
+
+    for driver in drivers:
+        print_report(run_child(driver, env, args, 'measure'))
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1 @@
 # Django app for salon booking system
-default_app_config = 'booking.apps.BookingConfig'
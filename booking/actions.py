@@ -0,0 +1,231 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .availability import invalidate_days
+from .inventory import consume_inventory
+from .mail import queue_mails
+from .models import Appointment, AvailableSlot
+from .reports import mark_daily_stats_dirty
+from .slots import DEFAULT_SERVICE_DURATION, from_minutes, to_minutes
+from .stats import invalidate_customer_stats
+from .utils import cancelled_message, confirmed_message
+
+
+# ---------------------------
+# Set-based appointment changes
+# ---------------------------
+# Used by the AppointmentAdmin bulk actions. Each one is a single UPDATE of
+# the appointments plus, where needed, one UPDATE of their slots and one
+# INSERT of their emails. QuerySet.update() sends no signals, so the caches
+# and rollups the signals normally refresh are invalidated here.
+# Only confirmed appointments hold slots. Actions that hold slots lock the
+# free ones first and only go ahead for the appointments whose whole time
+# is covered; the rest are skipped.
+
+ACTIVE_STATUSES = ('pending', 'confirmed')
+
+LAST_MINUTE = 24 * 60 - 1
+
+
+def _lock(queryset, statuses):
+    """
+    Lock the selected appointments still in `statuses` and return them
+    with the minutes their services take.
+    """
+    ids = list(
+        queryset.filter(status__in=statuses)
+        .select_for_update()
+        .values_list('id', flat=True)
+    )
+    return list(
+        Appointment.objects.filter(id__in=ids)
+        .annotate(duration=Sum(Coalesce('services__duration_minutes', Value(DEFAULT_SERVICE_DURATION))))
+        .values(
+            'id', 'status', 'staff_id', 'customer_id', 'name', 'email',
+            'appointment_date', 'appointment_time', 'duration',
+        )
+    )
+
+
+def _slots_of(bookings, staff_id=None):
+    """
+    Q matching the slots each booking occupies, on its own staff
+    member or on `staff_id`.
+    """
+    condition = Q()
+    for booking in bookings:
+        staff = staff_id or booking['staff_id']
+        if not staff:
+            continue
+        start = to_minutes(booking['appointment_time'])
+        end = from_minutes(min(start + booking['duration'], LAST_MINUTE))
+        condition |= Q(
+            staff_id=staff,
+            date=booking['appointment_date'],
+            start_time__lt=end,
+            end_time__gt=booking['appointment_time'],
+        )
+    return condition
+
+
+def _covered(slots, begin, end):
+    reach = begin
+    for lo, hi, _ in sorted(slots):
+        if lo > reach:
+            return False
+        reach = max(reach, hi)
+    return reach >= end
+
+
+def _claim(bookings, staff_id=None):
+    """
+    Lock the free slots the bookings need, on their own staff member or
+    on `staff_id`, and share them out in order: a booking gets its slots
+    only when free ones cover its whole time and no earlier booking took
+    them. Returns (bookings served, ids of their slots, bookings skipped).
+    """
+    condition = _slots_of(bookings, staff_id)
+    free = defaultdict(list)
+    if condition:
+        for slot_id, staff, day, start, end in (
+            AvailableSlot.objects
+            .filter(condition, is_available=True)
+            .select_for_update()
+            .values_list('id', 'staff_id', 'date', 'start_time', 'end_time')
+        ):
+            free[staff, day].append((to_minutes(start), to_minutes(end), slot_id))
+
+    served, skipped, taken = [], [], set()
+    for booking in bookings:
+        begin = to_minutes(booking['appointment_time'])
+        end = min(begin + booking['duration'], LAST_MINUTE)
+        slots = [
+            slot for slot in free.get((staff_id or booking['staff_id'], booking['appointment_date']), ())
+            if slot[0] < end and slot[1] > begin
+        ]
+        slot_ids = {slot_id for _, _, slot_id in slots}
+        if _covered(slots, begin, end) and not slot_ids & taken:
+            served.append(booking)
+            taken |= slot_ids
+        else:
+            skipped.append(booking)
+    return served, taken, skipped
+
+
+def _set_slots(condition, available):
+    if not condition:
+        return 0
+    return AvailableSlot.objects.filter(condition).update(is_available=available)
+
+
+def _changed(bookings):
+    days = {booking['appointment_date'] for booking in bookings}
+    mark_daily_stats_dirty(*days)
+    invalidate_days(days)
+    invalidate_customer_stats(*(booking['customer_id'] for booking in bookings))
+
+
+def confirm_appointments(queryset):
+    """
+    Confirm pending appointments, hold their staff's slots and queue
+    the confirmation emails. Appointments without a staff member or
+    without free slots for their whole time stay pending.
+    Returns (number confirmed, ids of the appointments skipped).
+    """
+    with transaction.atomic():
+        bookings, slot_ids, skipped = _claim(_lock(queryset, ['pending']))
+        if not bookings:
+            return 0, [b['id'] for b in skipped]
+
+        Appointment.objects.filter(id__in=[b['id'] for b in bookings]).update(
+            status='confirmed',
+            updated_at=timezone.now(),
+        )
+        AvailableSlot.objects.filter(id__in=slot_ids).update(is_available=False)
+
+        queue_mails([
+            (*confirmed_message(b['name'], b['appointment_date'], b['appointment_time']), b['email'])
+            for b in bookings
+        ])
+        _changed(bookings)
+    return len(bookings), [b['id'] for b in skipped]
+
+
+def complete_appointments(queryset):
+    """
+    Mark pending/confirmed appointments as completed and take their
+    materials out of stock. Returns the number completed.
+    """
+    with transaction.atomic():
+        bookings = _lock(queryset, ACTIVE_STATUSES)
+        if not bookings:
+            return 0
+
+        ids = [b['id'] for b in bookings]
+        Appointment.objects.filter(id__in=ids).update(
+            status='completed',
+            updated_at=timezone.now(),
+        )
+        consume_inventory(ids)
+        _changed(bookings)
+    return len(bookings)
+
+
+def cancel_appointments(queryset, reason=""):
+    """
+    Cancel pending/confirmed appointments, free the slots of the
+    confirmed ones and queue the cancellation emails. Returns the
+    number cancelled.
+    """
+    with transaction.atomic():
+        bookings = _lock(queryset, ACTIVE_STATUSES)
+        if not bookings:
+            return 0
+
+        now = timezone.now()
+        Appointment.objects.filter(id__in=[b['id'] for b in bookings]).update(
+            status='cancelled',
+            cancelled_reason=reason or "Cancelled by the salon",
+            cancelled_at=now,
+            updated_at=now,
+        )
+        _set_slots(_slots_of(b for b in bookings if b['status'] == 'confirmed'), available=True)
+
+        queue_mails([
+            (*cancelled_message(b['name'], b['appointment_date'], b['appointment_time'], reason), b['email'])
+            for b in bookings
+        ])
+        _changed(bookings)
+    return len(bookings)
+
+
+def reassign_appointments(queryset, staff):
+    """
+    Move pending/confirmed appointments to another staff member. A
+    confirmed appointment frees its old slots and holds the new staff's,
+    and stays where it is when the new staff member has no free slots
+    for it; pending ones hold nothing and simply move.
+    Returns (number reassigned, ids of the appointments skipped).
+    """
+    with transaction.atomic():
+        bookings = [b for b in _lock(queryset, ACTIVE_STATUSES) if b['staff_id'] != staff.pk]
+        pending = [b for b in bookings if b['status'] == 'pending']
+        confirmed, slot_ids, skipped = _claim(
+            [b for b in bookings if b['status'] == 'confirmed'], staff_id=staff.pk,
+        )
+        bookings = pending + confirmed
+        if not bookings:
+            return 0, [b['id'] for b in skipped]
+
+        Appointment.objects.filter(id__in=[b['id'] for b in bookings]).update(
+            staff=staff,
+            updated_at=timezone.now(),
+        )
+        _set_slots(_slots_of(confirmed), available=True)
+        AvailableSlot.objects.filter(id__in=slot_ids).update(is_available=False)
+        _changed(bookings)
+    return len(bookings), [b['id'] for b in skipped]
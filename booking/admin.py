@@ -1,7 +1,23 @@
-from django.contrib import admin
+import io
+
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin.helpers import ActionForm
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import User, Service, ServiceType, Staff, Appointment, AvailableSlot, Contact,InventoryItem, InventoryCategory
+from django.core.exceptions import ValidationError
+from django.http import StreamingHttpResponse
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path
+from .models import User, Service, ServiceType, Staff, Appointment, AvailableSlot, Contact,InventoryItem, InventoryCategory, OutboundEmail, DailyStats, ServiceTypeMaterial, StockMovement, StockSnapshot
 from django.utils.html import format_html
+from django.core.files.storage import default_storage
+from .images import renditions_are_current
+from .pagination import EstimatedCountPaginator
+from .inventory_csv import import_inventory_csv, export_inventory_csv
+from .actions import (
+    confirm_appointments, complete_appointments, cancel_appointments, reassign_appointments,
+)
 
 
 # ---------- User Admin ----------
@@ -84,9 +100,15 @@ class ServiceAdmin(admin.ModelAdmin):
 
     def image_preview(self, obj):
             if obj.image:
+                # smallest rendition once built, so the changelist stays light
+                if renditions_are_current(obj):
+                    jpegs = obj.image_renditions.get('jpeg', {})
+                    url = default_storage.url(jpegs[min(jpegs, key=int)])
+                else:
+                    url = obj.image.url
                 return format_html(
                     '<img src="{}" width="80" height="80" style="object-fit:cover;border-radius:8px;" />',
-                    obj.image.url
+                    url
                 )
             return "No Image"
 
@@ -99,6 +121,7 @@ class StaffAdmin(admin.ModelAdmin):
     list_display = ('user_name', 'specialization', 'is_available')
     list_filter = ('is_available', 'specialization')
     search_fields = ('user__first_name', 'user__last_name', 'specialization')
+    list_select_related = ('user',)
 
     def user_name(self, obj):
         return f"{obj.user.first_name} {obj.user.last_name}" if obj.user else "No User"
@@ -106,8 +129,21 @@ class StaffAdmin(admin.ModelAdmin):
 
 
 # ---------- Appointment Admin ----------
+class AppointmentActionForm(ActionForm):
+    # Extra inputs next to the action dropdown, read by the actions below
+    reason = forms.CharField(required=False, label="Cancel reason")
+    staff = forms.ModelChoiceField(
+        queryset=Staff.objects.select_related('user'),
+        required=False,
+        label="Reassign to",
+    )
+
+
 @admin.register(Appointment)
 class AppointmentAdmin(admin.ModelAdmin):
+    action_form = AppointmentActionForm
+    actions = ('confirm_selected', 'complete_selected', 'cancel_selected', 'reassign_selected')
+
     list_display = (
         'customer_name',
         'customer_email',
@@ -130,11 +166,16 @@ class AppointmentAdmin(admin.ModelAdmin):
 
     ordering = ('-created_at',)
 
+    # Grows every day: no COUNT(*) over the whole table per page
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
     readonly_fields = ('created_at', 'updated_at')
+    raw_id_fields = ('customer',)
 
     fieldsets = (
         ('Customer Info', {
-            'fields': ('name', 'email', 'phone')
+            'fields': ('customer', 'name', 'email', 'phone')
         }),
         ('Appointment', {
             'fields': ('appointment_date', 'appointment_time')
@@ -153,6 +194,46 @@ class AppointmentAdmin(admin.ModelAdmin):
         return obj.email
     customer_email.short_description = "Email"
 
+    # -------- Bulk actions (one UPDATE each, emails queued in one batch) --------
+    def message_skipped(self, request, skipped, reason):
+        if not skipped:
+            return
+        shown = ", ".join(f"#{pk}" for pk in skipped[:20])
+        if len(skipped) > 20:
+            shown += f" and {len(skipped) - 20} more"
+        self.message_user(request, f"{len(skipped)} appointment(s) skipped ({reason}): {shown}.", messages.WARNING)
+
+    @admin.action(description="Confirm selected appointments")
+    def confirm_selected(self, request, queryset):
+        count, skipped = confirm_appointments(queryset)
+        self.message_user(request, f"{count} appointment(s) confirmed.")
+        self.message_skipped(request, skipped, "no staff member, or no free slots for the whole appointment")
+
+    @admin.action(description="Mark selected appointments as completed")
+    def complete_selected(self, request, queryset):
+        count = complete_appointments(queryset)
+        self.message_user(request, f"{count} appointment(s) completed.")
+
+    @admin.action(description="Cancel selected appointments (with reason)")
+    def cancel_selected(self, request, queryset):
+        reason = request.POST.get('reason', '').strip()
+        count = cancel_appointments(queryset, reason)
+        self.message_user(request, f"{count} appointment(s) cancelled.")
+
+    @admin.action(description="Reassign selected appointments to staff")
+    def reassign_selected(self, request, queryset):
+        try:
+            staff = AppointmentActionForm.base_fields['staff'].clean(request.POST.get('staff'))
+        except ValidationError:
+            staff = None
+        if staff is None:
+            self.message_user(request, "Choose a staff member to reassign to.", messages.ERROR)
+            return
+
+        count, skipped = reassign_appointments(queryset, staff)
+        self.message_user(request, f"{count} appointment(s) reassigned to {staff}.")
+        self.message_skipped(request, skipped, f"{staff} has no free slots for the whole appointment")
+
 
 
 # ---------- AvailableSlot Admin ----------
@@ -161,6 +242,17 @@ class AvailableSlotAdmin(admin.ModelAdmin):
     list_display = ('staff_name', 'date', 'start_time', 'end_time', 'is_available')
     list_filter = ('is_available', 'date')
     search_fields = ('staff__user__first_name', 'staff__user__last_name')
+    list_select_related = ('staff__user',)
+
+    # Thousands of rows after generate_slots
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def formfield_for_foreignkey(self, db_field, request, **kwargs):
+        # Staff.__str__ reads the user: one query per dropdown option otherwise
+        if db_field.name == 'staff':
+            kwargs['queryset'] = Staff.objects.select_related('user')
+        return super().formfield_for_foreignkey(db_field, request, **kwargs)
 
     def staff_name(self, obj):
         if obj.staff and obj.staff.user:
@@ -171,7 +263,28 @@ class AvailableSlotAdmin(admin.ModelAdmin):
 
 
 admin.site.register(Contact)
-admin.site.register(ServiceType)
+
+
+# ---------- ServiceType Admin ----------
+class ServiceTypeMaterialInline(admin.TabularInline):
+    # Stock taken out when an appointment with this service is completed
+    model = ServiceTypeMaterial
+    extra = 1
+    fields = ('item', 'quantity')
+    autocomplete_fields = ('item',)
+
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related('item')
+
+
+@admin.register(ServiceType)
+class ServiceTypeAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'price', 'duration_minutes', 'is_active')
+    list_filter = ('is_active', 'service')
+    search_fields = ('name', 'service__name')
+    # __str__ shows the parent service name
+    list_select_related = ('service',)
+    inlines = [ServiceTypeMaterialInline]
 
 
 
@@ -199,4 +312,112 @@ class InventoryItemAdmin(admin.ModelAdmin):
     )
     list_filter = ("status", "category", "is_active")
     search_fields = ("name", "brand")
+    list_select_related = ("category",)
     readonly_fields = ("status", "created_at", "updated_at")
+
+    # Import / Export CSV buttons (templates/admin/booking/inventoryitem/)
+    change_list_template = "admin/booking/inventoryitem/change_list.html"
+
+    def get_urls(self):
+        urls = [
+            path("import/", self.admin_site.admin_view(self.import_csv), name="booking_inventoryitem_import"),
+            path("export/", self.admin_site.admin_view(self.export_csv), name="booking_inventoryitem_export"),
+        ]
+        return urls + super().get_urls()
+
+    def import_csv(self, request):
+        if not self.has_change_permission(request) or not self.has_add_permission(request):
+            return redirect("admin:booking_inventoryitem_changelist")
+
+        if request.method == "POST" and request.FILES.get("csv_file"):
+            # utf-8-sig also reads CSV files saved from Excel (they start with a BOM)
+            lines = io.TextIOWrapper(request.FILES["csv_file"], encoding="utf-8-sig", newline="")
+            result = import_inventory_csv(lines)
+
+            self.message_user(request, f"{result['imported']} item(s) imported.")
+            for line, error in result["errors"][:20]:
+                self.message_user(request, f"Line {line}: {error}", messages.WARNING)
+            if len(result["errors"]) > 20:
+                self.message_user(request, f"... and {len(result['errors']) - 20} more skipped rows.", messages.WARNING)
+            return redirect("admin:booking_inventoryitem_changelist")
+
+        context = {
+            **self.admin_site.each_context(request),
+            "opts": self.model._meta,
+            "title": "Import inventory CSV",
+        }
+        return TemplateResponse(request, "admin/booking/inventoryitem/import_csv.html", context)
+
+    def export_csv(self, request):
+        if not self.has_view_permission(request):
+            return redirect("admin:index")
+
+        response = StreamingHttpResponse(export_inventory_csv(), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="inventory.csv"'
+        return response
+
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    """
+    The ledger is append-only: it is written by stock changes, never edited.
+    """
+    list_display = ("item", "delta", "reason", "appointment", "created_at")
+    list_filter = ("reason",)
+    search_fields = ("item__name",)
+    list_select_related = ("item",)
+    raw_id_fields = ("item", "appointment")
+    date_hierarchy = "created_at"
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(StockSnapshot)
+class StockSnapshotAdmin(admin.ModelAdmin):
+    list_display = ("item", "taken_at", "quantity")
+    search_fields = ("item__name",)
+    list_select_related = ("item",)
+    raw_id_fields = ("item",)
+    date_hierarchy = "taken_at"
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+
+@admin.register(OutboundEmail)
+class OutboundEmailAdmin(admin.ModelAdmin):
+    list_display = ("to", "subject", "status", "attempts", "next_attempt_at", "sent_at")
+    list_filter = ("status",)
+    search_fields = ("to", "subject")
+    show_full_result_count = False
+    paginator = EstimatedCountPaginator
+    readonly_fields = ("created_at", "sent_at", "last_error")
+
+
+
+@admin.register(DailyStats)
+class DailyStatsAdmin(admin.ModelAdmin):
+    list_display = (
+        "date",
+        "total_appointments",
+        "completed_count",
+        "cancelled_count",
+        "revenue",
+    )
+    date_hierarchy = "date"
+    readonly_fields = ("updated_at",)
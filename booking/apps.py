@@ -6,4 +6,5 @@ class BookingConfig(AppConfig):
     name = 'booking'
     
     def ready(self):
+        import booking.checks
         import booking.signals
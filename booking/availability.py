@@ -0,0 +1,134 @@
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from .models import AvailableSlot
+from .slots import from_minutes, slot_index_key, to_minutes
+
+
+# Minutes represented by one bit of a staff bitmap
+AVAILABILITY_GRANULARITY = 5
+
+AVAILABILITY_CACHE_TIMEOUT = 60 * 60
+
+
+def _cache_key(day):
+    return f"availability:{day.isoformat()}"
+
+
+def build_day_bitmaps(day):
+    """
+    Free time of every bookable staff member on `day`, as {staff_id: int}.
+    Bit i is set when the staff member is free during minute
+    i * AVAILABILITY_GRANULARITY of the day.
+    """
+    rows = (
+        AvailableSlot.objects
+        .filter(
+            date=day,
+            is_available=True,
+            staff__is_active=True,
+            staff__is_available=True,
+        )
+        .values_list(
+            'staff_id',
+            'start_time',
+            'end_time',
+            'staff__working_hours_start',
+            'staff__working_hours_end',
+        )
+    )
+
+    step = AVAILABILITY_GRANULARITY
+    bitmaps = {}
+    for staff_id, start, end, hours_start, hours_end in rows:
+        lo = -(-max(to_minutes(start), to_minutes(hours_start)) // step)
+        hi = min(to_minutes(end), to_minutes(hours_end)) // step
+        if lo < hi:
+            bits = ((1 << (hi - lo)) - 1) << lo
+            bitmaps[staff_id] = bitmaps.get(staff_id, 0) | bits
+    return bitmaps
+
+
+def get_day_bitmaps(days):
+    """
+    Cached bitmaps for several days at once, as {day: {staff_id: int}}.
+    """
+    keys = {_cache_key(day): day for day in days}
+    cached = cache.get_many(keys)
+
+    result = {keys[key]: bitmaps for key, bitmaps in cached.items()}
+    missing = {}
+    for key, day in keys.items():
+        if key not in cached:
+            result[day] = missing[key] = build_day_bitmaps(day)
+
+    if missing:
+        cache.set_many(missing, AVAILABILITY_CACHE_TIMEOUT)
+    return result
+
+
+def invalidate_days(days):
+    keys = [_cache_key(day) for day in days] + [slot_index_key(day) for day in days]
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_range(start_date, end_date):
+    days = []
+    day = start_date
+    while day <= end_date:
+        days.append(day)
+        day += timedelta(days=1)
+    invalidate_days(days)
+
+
+def invalidate_staff(staff_id):
+    """
+    Drop the cached days a staff member has slots on, from today on:
+    their hours or availability changed.
+    """
+    days = (
+        AvailableSlot.objects
+        .filter(staff_id=staff_id, date__gte=timezone.localdate())
+        .values_list('date', flat=True)
+        .distinct()
+    )
+    invalidate_days(list(days))
+
+
+def _free_runs(bits, length):
+    """
+    Bit i of the result is set when bits i .. i+length-1 are all set.
+    """
+    run, width = bits, 1
+    while width * 2 <= length:
+        run &= run >> width
+        width *= 2
+    if width < length:
+        run &= run >> (length - width)
+    return run
+
+
+def free_start_times(bitmaps, duration, every=15):
+    """
+    Start times (every `every` minutes) at which at least one staff member
+    is free for `duration` minutes.
+    """
+    step = AVAILABILITY_GRANULARITY
+    length = max(1, -(-duration // step))
+    stride = max(1, every // step)
+
+    combined = 0
+    for bits in bitmaps.values():
+        combined |= _free_runs(bits, length)
+
+    times = []
+    i = 0
+    while combined:
+        if combined & 1 and i % stride == 0:
+            times.append(from_minutes(i * step))
+        combined >>= 1
+        i += 1
+    return times
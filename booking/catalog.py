@@ -0,0 +1,183 @@
+import hashlib
+import time
+from functools import lru_cache, wraps
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Prefetch
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, patch_vary_headers
+from django.utils.http import quote_etag
+
+from .cache import LRUCache
+from .models import Service, ServiceType
+from .slots import DEFAULT_SERVICE_DURATION
+
+
+# Shared tier: any configured Django cache (locmem, file, redis, ...)
+CATALOG_CACHE_ALIAS = getattr(settings, 'CATALOG_CACHE_ALIAS', 'default')
+CATALOG_CACHE_TIMEOUT = getattr(settings, 'CATALOG_CACHE_TIMEOUT', 60 * 60 * 24)
+
+CATALOG_VERSION_KEY = "catalog:version"
+
+# Process tier: catalogs and rendered pages, keyed by catalog version
+_local = LRUCache(maxsize=64)
+
+
+def _shared():
+    return caches[CATALOG_CACHE_ALIAS]
+
+
+class ServiceCatalog:
+    """
+    Active services with their active types, loaded once and shared by
+    every request of the process until the catalog version changes.
+    """
+
+    def __init__(self, version, services):
+        self.version = version
+        self.services = services
+        self.types = {
+            service_type.id: service_type
+            for service in services
+            for service_type in service.types.all()
+        }
+
+    @classmethod
+    def load(cls, version):
+        services = list(
+            Service.objects
+            .filter(is_active=True)
+            .prefetch_related(
+                Prefetch('types', queryset=ServiceType.objects.filter(is_active=True))
+            )
+            .order_by('id')
+        )
+        return cls(version, services)
+
+    def selected_types(self, data, prefix='service_type_'):
+        """
+        Service types picked in a booking form, one `service_type_<service id>`
+        field per service. Raises ValueError on an unknown or mismatched pick.
+        """
+        selected = []
+        for key, value in data.items():
+            if not key.startswith(prefix) or not value:
+                continue
+
+            try:
+                service_id = int(key[len(prefix):])
+                service_type = self.types[int(value)]
+            except (ValueError, KeyError):
+                raise ValueError("Invalid service type selection.")
+
+            if service_type.service_id != service_id:
+                raise ValueError("Invalid service type selection.")
+            selected.append(service_type)
+        return selected
+
+    def duration(self, service_types):
+        return sum(
+            service_type.duration_minutes or DEFAULT_SERVICE_DURATION
+            for service_type in service_types
+        ) or DEFAULT_SERVICE_DURATION
+
+
+def current_version():
+    cache = _shared()
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        # Start from the clock so a flushed cache never reuses an old version
+        cache.add(CATALOG_VERSION_KEY, int(time.time() * 1000), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def get_catalog():
+    """
+    The current catalog: process LRU first, then the shared cache, then the DB.
+    """
+    # Read once: a bump in between must not file one version's catalog under another's key
+    version = current_version()
+    key = f"catalog:{version}"
+
+    catalog = _local.get(key)
+    if catalog is None:
+        catalog = _shared().get(key)
+        if catalog is None:
+            catalog = ServiceCatalog.load(version)
+            _shared().set(key, catalog, CATALOG_CACHE_TIMEOUT)
+        _local.set(key, catalog)
+    return catalog
+
+
+def _bump_version():
+    try:
+        _shared().incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        _shared().set(CATALOG_VERSION_KEY, current_version() + 1, None)
+
+
+def invalidate_catalog():
+    transaction.on_commit(_bump_version)
+
+
+@lru_cache(maxsize=None)
+def release_token():
+    """
+    Identifies the deployed code, so cached pages and ETags from a previous
+    release are never served: settings.RELEASE (e.g. the git commit, set on
+    deploy) plus a digest of the static files manifest. Without RELEASE the
+    process start time stands in, which is safe but not shared by workers.
+    """
+    release = getattr(settings, 'RELEASE', '') or f"boot{int(time.time() * 1000)}"
+    hashed_files = getattr(staticfiles_storage, 'hashed_files', None)
+    if hashed_files:
+        manifest = hashlib.sha1(repr(sorted(hashed_files.items())).encode()).hexdigest()[:12]
+        release = f"{release}-{manifest}"
+    return release
+
+
+def cached_catalog_page(view):
+    """
+    Cache a page that only depends on the service catalog.
+
+    Anonymous GETs are answered from the two-tier cache, keyed by release
+    and catalog version, and carry an ETag so browsers revalidate with a
+    304. There is no Last-Modified: the catalog's date says nothing about
+    a deploy that changed the templates. Signed-in users always get a
+    fresh render.
+    """
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD') or request.user.is_authenticated:
+            return view(request, *args, **kwargs)
+
+        catalog = get_catalog()
+        release = release_token()
+        etag = quote_etag(f"catalog-{release}-{catalog.version}")
+
+        response = get_conditional_response(request, etag=etag)
+        if response is None:
+            key = f"page:{release}:{catalog.version}:{request.path}"
+            page = _local.get(key) or _shared().get(key)
+
+            if page is None:
+                rendered = view(request, *args, **kwargs)
+                if rendered.status_code != 200:
+                    return rendered
+                page = (rendered.content, rendered['Content-Type'])
+                _shared().set(key, page, CATALOG_CACHE_TIMEOUT)
+            _local.set(key, page)
+
+            content, content_type = page
+            response = HttpResponse(content, content_type=content_type)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = 'no-cache'
+        patch_vary_headers(response, ('Cookie',))
+        return response
+
+    return wrapper
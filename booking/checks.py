@@ -0,0 +1,82 @@
+from django.conf import settings
+from django.core import checks
+
+
+# ---------------------------
+# Performance self-check
+# ---------------------------
+# Runs with manage.py check / runserver / migrate, and once when the WSGI
+# app starts. Only warnings: nothing here stops the site from booting.
+
+@checks.register('performance')
+def check_performance_settings(app_configs=None, **kwargs):
+    return performance_warnings(settings)
+
+
+def performance_warnings(settings):
+    """
+    The warnings for a settings object (anything with the setting names
+    as attributes).
+    """
+    warnings = []
+    production = getattr(settings, 'DJANGO_ENV', 'dev') == 'prod'
+
+    if production and settings.DEBUG:
+        warnings.append(checks.Warning(
+            "DEBUG is on in the prod profile.",
+            hint="DEBUG keeps every SQL query in memory and disables the cached template loader.",
+            id='booking.W001',
+        ))
+
+    if not production:
+        return warnings
+
+    for alias, database in settings.DATABASES.items():
+        pooled = database['ENGINE'].startswith('dj_db_conn_pool.')
+        if not pooled and not database.get('CONN_MAX_AGE'):
+            warnings.append(checks.Warning(
+                f"Database '{alias}' opens a new connection for every request.",
+                hint="Set CONN_MAX_AGE (DB_CONN_MAX_AGE) or enable DB_POOL.",
+                id='booking.W002',
+            ))
+        elif not pooled and not database.get('CONN_HEALTH_CHECKS'):
+            warnings.append(checks.Warning(
+                f"Database '{alias}' reuses connections without health checks.",
+                hint="Set CONN_HEALTH_CHECKS = True so dropped connections are replaced.",
+                id='booking.W003',
+            ))
+
+    if getattr(settings, 'DB_POOL', False) and not any(
+        database['ENGINE'].startswith('dj_db_conn_pool.')
+        for database in settings.DATABASES.values()
+    ):
+        warnings.append(checks.Warning(
+            "DB_POOL is on but django-db-connection-pool is not installed.",
+            hint="pip install django-db-connection-pool, or unset DB_POOL.",
+            id='booking.W004',
+        ))
+
+    for template in settings.TEMPLATES:
+        if template['BACKEND'] != 'django.template.backends.django.DjangoTemplates':
+            continue
+        loaders = template.get('OPTIONS', {}).get('loaders')
+        if loaders and not any(
+            isinstance(loader, (list, tuple)) and loader[0] == 'django.template.loaders.cached.Loader'
+            for loader in loaders
+        ):
+            warnings.append(checks.Warning(
+                "Templates are read and parsed from disk on every render.",
+                hint="Wrap the loaders in django.template.loaders.cached.Loader.",
+                id='booking.W005',
+            ))
+
+    if production and any(
+        cache['BACKEND'].endswith('LocMemCache') for cache in settings.CACHES.values()
+    ):
+        warnings.append(checks.Warning(
+            "The cache is private to each worker process (LocMemCache).",
+            hint="Point CACHE_BACKEND/CACHE_LOCATION at Redis or Memcached so workers share cached pages and stats.",
+            id='booking.W006',
+        ))
+
+    return warnings
@@ -0,0 +1,123 @@
+import math
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Sum
+from django.utils import timezone
+
+from .models import InventoryItem, ServiceTypeMaterial, StockMovement
+from .stats import UPCOMING_STATUSES
+
+
+# ---------------------------
+# Reorder forecast
+# ---------------------------
+# Demand over the next FORECAST_DAYS is the larger of two projections:
+#   booked     - materials of the pending/confirmed appointments already
+#                in the calendar (a floor: those will be used)
+#   historical - the consumption rate of the last FORECAST_HISTORY_DAYS
+#                from the stock ledger, which also covers the bookings
+#                not made yet
+# Each projection is one grouped query over all items; the per-item
+# arithmetic is a single pass over the results, so a few thousand SKUs
+# take three queries whatever the horizon.
+
+FORECAST_DAYS = getattr(settings, 'FORECAST_DAYS', 14)
+
+FORECAST_HISTORY_DAYS = getattr(settings, 'FORECAST_HISTORY_DAYS', 28)
+
+# Written nightly by `forecast_inventory`; kept a little over a day so a late run never leaves a gap
+FORECAST_CACHE_TIMEOUT = getattr(settings, 'FORECAST_CACHE_TIMEOUT', 26 * 60 * 60)
+
+FORECAST_KEY = "forecast:inventory"
+
+
+def booked_usage(start, end):
+    """
+    {item id: units} the pending/confirmed appointments between the
+    dates `start` and `end` will use.
+    """
+    return dict(
+        ServiceTypeMaterial.objects
+        .filter(
+            service_type__appointments__status__in=UPCOMING_STATUSES,
+            service_type__appointments__appointment_date__range=(start, end),
+        )
+        .values('item_id')
+        .annotate(total=Sum('quantity'))
+        .values_list('item_id', 'total')
+    )
+
+
+def consumed_since(since):
+    """
+    {item id: units} lost to appointments since `since`, from the ledger.
+    """
+    return dict(
+        StockMovement.objects
+        .filter(reason=StockMovement.Reason.CONSUMPTION, created_at__gte=since)
+        .order_by()
+        .values('item_id')
+        .annotate(total=-Sum('delta'))
+        .values_list('item_id', 'total')
+    )
+
+
+def _urgency(row):
+    # Soonest to run out first; items only short of their safety stock last
+    return (row['days_left'] is None, row['days_left'] or 0, -row['reorder'])
+
+
+def forecast_inventory(days=FORECAST_DAYS, history_days=FORECAST_HISTORY_DAYS):
+    """
+    Projected demand and suggested reorder quantity of every active item.
+
+    An item should hold its projected demand plus min_stock as safety
+    stock at the end of the horizon; the reorder suggestion is whatever
+    is missing from that. Returns {'computed_at', 'days', 'items':
+    {item id: {...}}, 'reorder': [item id, ...]}, the latter most
+    urgent first.
+    """
+    now = timezone.now()
+    today = timezone.localdate()
+    booked = booked_usage(today, today + timedelta(days=days - 1))
+    consumed = consumed_since(now - timedelta(days=history_days))
+
+    items = {}
+    for item_id, quantity, min_stock in (
+        InventoryItem.objects.filter(is_active=True).values_list('id', 'quantity', 'min_stock').iterator()
+    ):
+        from_bookings = booked.get(item_id, 0)
+        from_history = consumed.get(item_id, 0) * days / history_days
+        projected = math.ceil(max(from_bookings, from_history))
+        daily = projected / days
+        items[item_id] = {
+            'booked': from_bookings,
+            'historical': round(from_history, 1),
+            'projected': projected,
+            'days_left': math.floor(quantity / daily) if daily else None,
+            'reorder': max(projected + min_stock - quantity, 0),
+        }
+
+    reorder = sorted(
+        (item_id for item_id, row in items.items() if row['reorder']),
+        key=lambda item_id: _urgency(items[item_id]),
+    )
+    return {'computed_at': now, 'days': days, 'items': items, 'reorder': reorder}
+
+
+def refresh_inventory_forecast(**options):
+    forecast = forecast_inventory(**options)
+    cache.set(FORECAST_KEY, forecast, FORECAST_CACHE_TIMEOUT)
+    return forecast
+
+
+def inventory_forecast():
+    """
+    The cached forecast, computed on the spot if the nightly run is missing.
+    """
+    forecast = cache.get(FORECAST_KEY)
+    if forecast is None:
+        forecast = refresh_inventory_forecast()
+    return forecast
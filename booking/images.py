@@ -0,0 +1,150 @@
+import logging
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+
+from .models import Service
+
+
+logger = logging.getLogger(__name__)
+
+# Card images are shown at ~300px; the larger widths cover 2x/3x screens
+RENDITION_WIDTHS = (320, 640, 1280)
+
+RENDITION_FORMATS = {
+    'webp': {'format': 'WEBP', 'quality': 80, 'method': 6},
+    'jpeg': {'format': 'JPEG', 'quality': 82, 'optimize': True, 'progressive': True},
+}
+
+
+def rendition_name(source, width, ext):
+    """
+    services/foo.jpg -> services/renditions/foo-320.webp
+    """
+    folder, filename = os.path.split(source)
+    stem = os.path.splitext(filename)[0]
+    return os.path.join(folder, 'renditions', f"{stem}-{width}.{ext}")
+
+
+def renditions_attempted(service):
+    """
+    The worker already handled the current image, whether or not it managed to.
+    """
+    return bool(service.image) and service.image_renditions.get('source') == service.image.name
+
+
+def renditions_are_current(service):
+    return renditions_attempted(service) and 'failed' not in service.image_renditions
+
+
+def rendition_files(renditions):
+    return [
+        name
+        for ext in RENDITION_FORMATS
+        for name in renditions.get(ext, {}).values()
+    ]
+
+
+def delete_renditions(renditions, keep=()):
+    """
+    Remove rendition files from storage once the transaction commits.
+    """
+    names = [name for name in rendition_files(renditions) if name not in keep]
+    if not names:
+        return
+
+    def delete():
+        for name in names:
+            try:
+                default_storage.delete(name)
+            except Exception as exc:
+                logger.warning("Could not delete rendition %s: %s", name, exc)
+
+    transaction.on_commit(delete)
+
+
+def build_renditions(source):
+    """
+    Write the WebP/JPEG renditions of one stored image.
+    Returns {'source': ..., 'webp': {width: name}, 'jpeg': {width: name}}.
+    """
+    # Only the rendition worker needs Pillow; web workers import this module for the signals
+    from PIL import Image, ImageOps
+
+    with default_storage.open(source, 'rb') as fh:
+        image = ImageOps.exif_transpose(Image.open(fh))
+        image.load()
+
+    renditions = {'source': source}
+    widths = [width for width in RENDITION_WIDTHS if width < image.width] or [image.width]
+
+    for width in widths:
+        height = round(image.height * width / image.width)
+        resized = image.resize((width, height), Image.LANCZOS)
+
+        for ext, options in RENDITION_FORMATS.items():
+            frame = resized
+            if ext == 'jpeg' and frame.mode != 'RGB':
+                frame = frame.convert('RGB')
+            elif ext == 'webp' and frame.mode not in ('RGB', 'RGBA'):
+                frame = frame.convert('RGBA')
+
+            buffer = BytesIO()
+            frame.save(buffer, **options)
+
+            name = rendition_name(source, width, ext)
+            if default_storage.exists(name):
+                default_storage.delete(name)
+            saved = default_storage.save(name, ContentFile(buffer.getvalue()))
+            renditions.setdefault(ext, {})[str(width)] = saved
+
+    return renditions
+
+
+def process_pending_renditions(retry_failed=False):
+    """
+    Build renditions for every service whose image has none yet.
+    An image that cannot be read is marked as failed and left alone
+    until it is replaced, or `retry_failed` is passed.
+    Returns the number of services processed.
+    """
+    from .catalog import invalidate_catalog
+
+    processed = 0
+    services = (
+        Service.objects
+        .exclude(image='').exclude(image__isnull=True)
+        .only('id', 'image', 'image_renditions')
+    )
+    for service in services:
+        if renditions_are_current(service) or (renditions_attempted(service) and not retry_failed):
+            continue
+
+        source = service.image.name
+        try:
+            renditions = build_renditions(source)
+        except Exception as exc:
+            logger.warning("Could not build renditions for %s: %s", source, exc)
+            # Recorded so the next scan skips it; a new upload replaces the record
+            Service.objects.filter(pk=service.pk, image=source).update(
+                image_renditions={'source': source, 'failed': str(exc)[:200]}
+            )
+            continue
+
+        # Only store them if the image was not replaced in the meantime
+        updated = Service.objects.filter(pk=service.pk, image=source).update(
+            image_renditions=renditions
+        )
+        if updated:
+            # Leftovers of an earlier image, unless a name was reused
+            delete_renditions(service.image_renditions, keep=rendition_files(renditions))
+            processed += 1
+        else:
+            delete_renditions(renditions)
+
+    if processed:
+        invalidate_catalog()
+    return processed
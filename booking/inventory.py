@@ -0,0 +1,104 @@
+from django.db import transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.utils import timezone
+
+from .ledger import record_movements
+from .models import Appointment, InventoryItem, ServiceTypeMaterial, StockMovement
+from .stats import invalidate_inventory_stats
+
+
+def stock_status_case():
+    """
+    InventoryItem.update_stock_status() as a SQL expression, for
+    recomputing the status of many items in one UPDATE.
+    """
+    status = InventoryItem.StockStatus
+    return Case(
+        When(quantity__lte=0, then=Value(status.OUT_OF_STOCK)),
+        When(quantity__lte=F('min_stock'), then=Value(status.LOW_STOCK)),
+        default=Value(status.IN_STOCK),
+    )
+
+
+def recompute_stock_status(queryset=None):
+    """
+    Bring `status` back in line with quantity/min_stock for every item
+    (or `queryset`) in one UPDATE. Needed after QuerySet.update() calls,
+    which skip InventoryItem.save(). Returns the number of rows updated.
+    """
+    if queryset is None:
+        queryset = InventoryItem.objects.all()
+    updated = queryset.update(status=stock_status_case())
+    invalidate_inventory_stats()
+    return updated
+
+
+def consume_inventory(appointment_ids):
+    """
+    Take the materials of completed appointments out of stock.
+
+    Appointments are claimed first, so each one is consumed once however
+    often it is completed: one is taken only while inventory_consumed_at
+    is unset and it has no consumption in the stock ledger, which also
+    holds when a stale copy saved inventory_consumed_at back to None. All items
+    are then decremented by one UPDATE computed in SQL (no read-modify-
+    write, so concurrent completions cannot lose an update), floored at
+    zero, and their status is recomputed by a second UPDATE. What each
+    appointment actually took is appended to the stock ledger.
+
+    Returns {item id: quantity consumed}.
+    """
+    with transaction.atomic():
+        claimed = list(
+            Appointment.objects
+            .filter(id__in=appointment_ids, status='completed', inventory_consumed_at__isnull=True)
+            .exclude(stock_movements__reason=StockMovement.Reason.CONSUMPTION)
+            .select_for_update()
+            .values_list('id', flat=True)
+        )
+        if not claimed:
+            return {}
+
+        Appointment.objects.filter(id__in=claimed).update(inventory_consumed_at=timezone.now())
+
+        # One row per (appointment, item): a material repeated across service types is summed
+        per_appointment = list(
+            ServiceTypeMaterial.objects
+            .filter(service_type__appointments__id__in=claimed)
+            .values('service_type__appointments__id', 'item_id')
+            .annotate(total=Sum('quantity'))
+            .values_list('service_type__appointments__id', 'item_id', 'total')
+            .order_by('service_type__appointments__id', 'item_id')
+        )
+        if not per_appointment:
+            return {}
+
+        usage = {}
+        for _, item_id, total in per_appointment:
+            usage[item_id] = usage.get(item_id, 0) + total
+
+        # Locked so the ledger records what the UPDATE below really takes
+        available = dict(
+            InventoryItem.objects.filter(id__in=usage).select_for_update().values_list('id', 'quantity')
+        )
+
+        # quantity is unsigned on MySQL: never compute a negative intermediate
+        InventoryItem.objects.filter(id__in=usage).update(
+            quantity=Case(
+                *[
+                    When(id=item_id, quantity__gt=total, then=F('quantity') - Value(total))
+                    for item_id, total in usage.items()
+                ],
+                default=Value(0),
+            ),
+            updated_at=timezone.now(),
+        )
+        recompute_stock_status(InventoryItem.objects.filter(id__in=usage))
+
+        movements = []
+        for appointment_id, item_id, total in per_appointment:
+            taken = min(total, available.get(item_id, 0))
+            available[item_id] = available.get(item_id, 0) - taken
+            movements.append((item_id, -taken, StockMovement.Reason.CONSUMPTION, appointment_id))
+        record_movements(movements)
+    return usage
@@ -0,0 +1,251 @@
+import csv
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Lower
+from django.utils import timezone
+from django.utils.text import slugify
+
+from .ledger import record_movements
+from .models import InventoryCategory, InventoryItem, StockMovement
+from .stats import invalidate_inventory_stats
+from .utils import bulk_upsert
+
+
+# Header of both the import and the export file
+CSV_COLUMNS = [
+    'name', 'category', 'brand', 'quantity', 'min_stock', 'unit_price', 'description', 'is_active',
+]
+
+# Rows parsed and upserted at a time, so a large file never sits in memory
+IMPORT_CHUNK_SIZE = 1000
+
+UPSERT_FIELDS = [
+    'brand', 'quantity', 'min_stock', 'unit_price', 'description', 'is_active', 'status', 'updated_at',
+]
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y'}
+
+# Largest quantity every backend's positive integer column holds
+MAX_COUNT = 2147483647
+
+
+def _match_categories(names):
+    """
+    {name: id} of the existing categories `names` match, by name (in any
+    case) or by slug.
+    """
+    slugs = {name: slugify(name) for name in names}
+    # The categories table is small: LOWER() without an index is fine
+    rows = list(
+        InventoryCategory.objects
+        .annotate(lowered=Lower('name'))
+        .filter(Q(lowered__in={name.lower() for name in names}) | Q(slug__in={slug for slug in slugs.values() if slug}))
+        .values_list('id', 'lowered', 'slug')
+    )
+    by_name = {name: pk for pk, name, _ in rows}
+    by_slug = {slug: pk for pk, _, slug in rows}
+
+    matched = {}
+    for name, slug in slugs.items():
+        pk = by_name.get(name.lower()) or by_slug.get(slug)
+        if pk is not None:
+            matched[name] = pk
+    return matched
+
+
+def _category_ids(names):
+    """
+    {name: id} for the categories in one chunk, creating the missing ones.
+
+    Names matching an existing category's slug share it, so "Hair Care",
+    "hair care" and "Hair-Care" are one category rather than a clash on
+    the unique name or slug. Names that still resolve to nothing (no
+    letters or digits to make a slug from) are left out.
+    """
+    found = _match_categories(names)
+    missing = {}
+    for name in names:
+        slug = slugify(name)
+        if name not in found and slug:
+            missing.setdefault(slug, name)
+
+    if missing:
+        # bulk_create skips save(), which is where the slug is normally filled in
+        InventoryCategory.objects.bulk_create(
+            [InventoryCategory(name=name, slug=slug) for slug, name in missing.items()],
+            ignore_conflicts=True,
+        )
+        found.update(_match_categories([name for name in names if name not in found]))
+    return found
+
+
+def _count(row, column, default):
+    raw = (row.get(column) or default).strip()
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(f"invalid {column} {raw!r}")
+    if value < 0:
+        raise ValueError(f"{column} {raw!r} is negative")
+    if value > MAX_COUNT:
+        raise ValueError(f"{column} {raw!r} is out of range")
+    return value
+
+
+def _unit_price(row):
+    # The model field's own checks: NaN, infinity and too many digits or places are refused
+    raw = (row.get('unit_price') or '0').strip()
+    try:
+        value = InventoryItem._meta.get_field('unit_price').clean(raw, None)
+    except ValidationError:
+        raise ValueError(f"invalid unit_price {raw!r}")
+    if value < 0:
+        raise ValueError(f"unit_price {raw!r} is negative")
+    return value
+
+
+def _parse(row):
+    """
+    Field values of one CSV row. Raises ValueError on bad data.
+    """
+    name = (row.get('name') or '').strip()
+    category = (row.get('category') or '').strip()
+    if not name or not category:
+        raise ValueError("name and category are required")
+
+    return {
+        'name': name[:150],
+        'category': category[:100],
+        'brand': (row.get('brand') or '').strip()[:100],
+        'quantity': _count(row, 'quantity', '0'),
+        'min_stock': _count(row, 'min_stock', '5'),
+        'unit_price': _unit_price(row),
+        'description': (row.get('description') or '').strip(),
+        'is_active': (row.get('is_active') or 'true').strip().lower() in TRUE_VALUES,
+    }
+
+
+def _key(name, category_id):
+    # MySQL matches names case-insensitively, so the stored spelling may differ from the file's
+    return name.casefold(), category_id
+
+
+def _numbered(reader):
+    # line_num has to be read as each row comes out: islice runs ahead to the end of the chunk
+    for row in reader:
+        yield reader.line_num, row
+
+
+def import_inventory_csv(lines, chunk_size=IMPORT_CHUNK_SIZE):
+    """
+    Insert or update inventory items from CSV text (a file or any iterable
+    of lines), keyed by (name, category). Categories are created as needed.
+
+    Returns {'imported': n, 'errors': [(line number, message), ...]}.
+    """
+    rows = _numbered(csv.DictReader(lines))
+    imported = 0
+    errors = []
+
+    while True:
+        chunk = list(islice(rows, chunk_size))
+        if not chunk:
+            break
+
+        parsed = {}
+        for line_num, row in chunk:
+            try:
+                values = _parse(row)
+            except ValueError as exc:
+                errors.append((line_num, str(exc)))
+                continue
+            # The last row wins when a file repeats an item
+            parsed[(values['name'], values['category'])] = (line_num, values)
+
+        categories = _category_ids({category for _, category in parsed})
+        now = timezone.now()
+        items = {}
+        for line_num, values in parsed.values():
+            category = values.pop('category')
+            if category not in categories:
+                errors.append((line_num, f"category {category!r} matches no category and cannot be created"))
+                continue
+            item = InventoryItem(category_id=categories[category], updated_at=now, **values)
+            item.update_stock_status()
+            # Spellings of one category ("Hair Care", "hair care") share their items
+            items[_key(item.name, item.category_id)] = item
+
+        items = list(items.values())
+        if not items:
+            continue
+
+        with transaction.atomic():
+            # Quantities before the upsert, locked, for the ledger: bulk_create skips the save() signals
+            names = {item.name for item in items}
+            keys = {_key(item.name, item.category_id) for item in items}
+            before = {
+                _key(name, category_id): (item_id, quantity)
+                for item_id, name, category_id, quantity in InventoryItem.objects
+                .filter(name__in=names, category_id__in={category for _, category in keys})
+                .select_for_update()
+                .values_list('id', 'name', 'category_id', 'quantity')
+            }
+
+            bulk_upsert(InventoryItem, items, ['name', 'category'], UPSERT_FIELDS, batch_size=chunk_size)
+            imported += len(items)
+
+            new_keys = keys - before.keys()
+            created = {}
+            if new_keys:
+                created = {
+                    _key(name, category_id): item_id
+                    for item_id, name, category_id in InventoryItem.objects
+                    .filter(name__in={item.name for item in items if _key(item.name, item.category_id) in new_keys})
+                    .values_list('id', 'name', 'category_id')
+                }
+
+            movements = []
+            for item in items:
+                key = _key(item.name, item.category_id)
+                if key in before:
+                    item_id, quantity = before[key]
+                    movements.append((item_id, item.quantity - quantity, StockMovement.Reason.IMPORT, None))
+                elif key in created:
+                    movements.append((created[key], item.quantity, StockMovement.Reason.IMPORT, None))
+            record_movements(movements)
+
+    if imported:
+        invalidate_inventory_stats()
+    return {'imported': imported, 'errors': sorted(errors)}
+
+
+class _Echo:
+    # csv.writer target that hands each formatted line straight back
+    def write(self, value):
+        return value
+
+
+def export_inventory_csv(queryset=None, chunk_size=2000):
+    """
+    Yield the inventory as CSV lines, reading the table chunk by chunk.
+    """
+    if queryset is None:
+        queryset = InventoryItem.objects.all()
+
+    writer = csv.writer(_Echo())
+    yield writer.writerow(CSV_COLUMNS)
+
+    rows = (
+        queryset
+        .order_by('category__name', 'name')
+        .values_list(
+            'name', 'category__name', 'brand', 'quantity', 'min_stock',
+            'unit_price', 'description', 'is_active',
+        )
+        .iterator(chunk_size=chunk_size)
+    )
+    for row in rows:
+        yield writer.writerow(row)
@@ -0,0 +1,132 @@
+from datetime import datetime, time, timezone as dt_timezone
+
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, OuterRef, Subquery, Sum, Value, Window
+from django.db.models.functions import Cast, Coalesce, Rank
+from django.utils import timezone
+
+from .models import InventoryItem, StockMovement, StockSnapshot
+
+
+# ---------------------------
+# Stock ledger
+# ---------------------------
+# Every change of InventoryItem.quantity is appended to StockMovement.
+# StockSnapshot rows compact the ledger: the quantity of an item at a past
+# moment is its latest snapshot before that moment plus the movements in
+# between, so a lookup only scans the ledger back to the last snapshot
+# (both reads use an (item, time) index).
+
+# Stand-in snapshot time for items that have none yet: scan the whole ledger
+BEGINNING = datetime(2000, 1, 1, tzinfo=dt_timezone.utc)
+
+
+def record_movements(movements):
+    """
+    Append [(item id, delta, reason, appointment id), ...] to the ledger
+    in one INSERT. Zero deltas are dropped.
+    """
+    now = timezone.now()
+    rows = [
+        StockMovement(item_id=item_id, delta=delta, reason=reason, appointment_id=appointment_id, created_at=now)
+        for item_id, delta, reason, appointment_id in movements
+        if delta
+    ]
+    return StockMovement.objects.bulk_create(rows, batch_size=1000)
+
+
+def stock_at(when, queryset=None):
+    """
+    Inventory items annotated with `stock`, their quantity at `when`,
+    rebuilt from the nearest snapshot and the movements after it.
+    """
+    if queryset is None:
+        queryset = InventoryItem.objects.all()
+
+    latest_snapshot = (
+        StockSnapshot.objects
+        .filter(item=OuterRef('pk'), taken_at__lte=when)
+        .order_by('-taken_at')
+    )
+    movements_since = (
+        StockMovement.objects
+        .filter(item=OuterRef('pk'), created_at__gt=OuterRef('snapshot_at'), created_at__lte=when)
+        .order_by()
+        .values('item')
+        .annotate(total=Sum('delta'))
+        .values('total')
+    )
+    return (
+        queryset
+        .annotate(
+            snapshot_at=Coalesce(Subquery(latest_snapshot.values('taken_at')[:1]), Value(BEGINNING)),
+            snapshot_quantity=Coalesce(Subquery(latest_snapshot.values('quantity')[:1]), 0),
+        )
+        .annotate(stock=F('snapshot_quantity') + Coalesce(Subquery(movements_since, output_field=IntegerField()), 0))
+    )
+
+
+def stock_valuation(when, queryset=None):
+    """
+    Value of the stock held at `when`. Priced at today's unit_price:
+    the ledger records quantities only.
+    """
+    items = stock_at(when, queryset).values_list('stock', 'unit_price')
+    return sum(stock * unit_price for stock, unit_price in items)
+
+
+def take_stock_snapshots(at=None):
+    """
+    Snapshot every item's quantity at `at`, rebuilt from the ledger, or
+    by default its current quantity, which also resets any drift between
+    the ledger and the table. Items already snapshotted at that moment
+    are left alone. Returns the number of snapshots written.
+
+    Current quantities are read with the items locked and stamped only
+    once the locks are held: every change is written under that row lock
+    together with its movement, so each movement is either in the
+    quantity read (and earlier than the snapshot) or after it.
+    """
+    with transaction.atomic():
+        if at is None:
+            rows = list(InventoryItem.objects.select_for_update().values_list('id', 'quantity').order_by('id'))
+            at = timezone.now()
+        else:
+            rows = stock_at(at).values_list('id', 'stock').iterator(chunk_size=2000)
+        snapshots = [
+            StockSnapshot(item_id=item_id, taken_at=at, quantity=quantity)
+            for item_id, quantity in rows
+        ]
+        StockSnapshot.objects.bulk_create(snapshots, batch_size=1000, ignore_conflicts=True)
+    return len(snapshots)
+
+
+def consumption_report(start, end):
+    """
+    Units each item lost to appointments between the dates `start` and
+    `end` (inclusive), busiest first.
+
+    One grouped query: RANK() runs as a window over the per-item totals,
+    so the ranking comes back with the rows instead of being sorted out
+    in Python.
+    """
+    days = (end - start).days + 1
+    tz = timezone.get_current_timezone()
+    used = -Sum('delta')
+    return list(
+        StockMovement.objects
+        .filter(
+            reason=StockMovement.Reason.CONSUMPTION,
+            created_at__gte=datetime.combine(start, time.min, tzinfo=tz),
+            created_at__lte=datetime.combine(end, time.max, tzinfo=tz),
+        )
+        .order_by()
+        .values('item_id', 'item__name')
+        .annotate(
+            used=used,
+            appointments=Count('appointment', distinct=True),
+            per_day=Cast(used, FloatField()) / days,
+            rank=Window(Rank(), order_by=used.desc()),
+        )
+        .order_by('rank', 'item__name')
+    )
@@ -0,0 +1,168 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import connection as db_connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import OutboundEmail
+
+
+logger = logging.getLogger(__name__)
+
+# Give up on a message after this many delivery attempts
+MAIL_MAX_ATTEMPTS = 5
+
+# First retry delay; doubled after every failed attempt
+MAIL_RETRY_BASE_SECONDS = 60
+
+# A claimed message stays hidden from other workers for this long,
+# so a crashed worker's batch is picked up again afterwards
+MAIL_LEASE_SECONDS = 300
+
+
+def queue_mail(subject, message, recipient_list, from_email=None):
+    """
+    Store an email in the outbox. It is delivered by `send_queued_mail`.
+    """
+    return queue_mails(
+        [(subject, message, recipient) for recipient in recipient_list],
+        from_email=from_email,
+    )
+
+
+def queue_mails(messages, from_email=None, batch_size=500):
+    """
+    Store many different emails at once: `messages` is a list of
+    (subject, message, recipient). One INSERT per batch_size emails.
+    """
+    from_email = from_email or settings.DEFAULT_FROM_EMAIL
+
+    return OutboundEmail.objects.bulk_create(
+        [
+            OutboundEmail(
+                subject=subject,
+                body=message,
+                from_email=from_email,
+                to=recipient,
+            )
+            for subject, message, recipient in messages
+        ],
+        batch_size=batch_size,
+    )
+
+
+def claim_batch(batch_size):
+    """
+    Lease up to `batch_size` due messages for delivery.
+    """
+    now = timezone.now()
+
+    with transaction.atomic():
+        ids = list(
+            OutboundEmail.objects
+            .select_for_update(skip_locked=True)
+            .filter(
+                status=OutboundEmail.Status.PENDING,
+                next_attempt_at__lte=now
+            )
+            .order_by('next_attempt_at')
+            .values_list('id', flat=True)[:batch_size]
+        )
+        if not ids:
+            return []
+
+        OutboundEmail.objects.filter(id__in=ids).update(
+            attempts=F('attempts') + 1,
+            next_attempt_at=now + timedelta(seconds=MAIL_LEASE_SECONDS),
+        )
+
+    return list(OutboundEmail.objects.filter(id__in=ids))
+
+
+def _reschedule(email, error):
+    email.last_error = str(error)
+
+    if email.attempts >= MAIL_MAX_ATTEMPTS:
+        email.status = OutboundEmail.Status.FAILED
+    else:
+        delay = MAIL_RETRY_BASE_SECONDS * 2 ** (email.attempts - 1)
+        email.next_attempt_at = timezone.now() + timedelta(seconds=delay)
+
+    email.save(update_fields=['status', 'next_attempt_at', 'last_error'])
+
+
+def deliver_batch(emails):
+    """
+    Send a claimed batch over a single SMTP connection.
+    Returns the number of messages sent.
+    """
+    connection = get_connection(fail_silently=False)
+
+    try:
+        connection.open()
+    except Exception as exc:
+        logger.warning("Could not open mail connection: %s", exc)
+        for email in emails:
+            _reschedule(email, exc)
+        return 0
+
+    sent = []
+    try:
+        for email in emails:
+            message = EmailMessage(
+                subject=email.subject,
+                body=email.body,
+                from_email=email.from_email,
+                to=[email.to],
+                connection=connection,
+            )
+            try:
+                message.send()
+            except Exception as exc:
+                logger.warning("Sending email %s failed: %s", email.id, exc)
+                _reschedule(email, exc)
+            else:
+                sent.append(email.id)
+    finally:
+        connection.close()
+
+    OutboundEmail.objects.filter(id__in=sent).update(
+        status=OutboundEmail.Status.SENT,
+        sent_at=timezone.now(),
+        last_error="",
+    )
+    return len(sent)
+
+
+def _deliver_in_thread(emails):
+    try:
+        return deliver_batch(emails)
+    finally:
+        db_connection.close()
+
+
+def drain_outbox(batch_size=50, workers=4):
+    """
+    Deliver every due message, `workers` batches at a time.
+    Returns the number of messages sent.
+    """
+    total = 0
+
+    if workers <= 1:
+        while True:
+            batch = claim_batch(batch_size)
+            if not batch:
+                return total
+            total += deliver_batch(batch)
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        while True:
+            batches = [claim_batch(batch_size) for _ in range(workers)]
+            batches = [batch for batch in batches if batch]
+            if not batches:
+                return total
+            total += sum(pool.map(_deliver_in_thread, batches))
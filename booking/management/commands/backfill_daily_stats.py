@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from booking.management.commands.generate_slots import parse_date
+from booking.reports import backfill_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyStats rollup table from appointment history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day (YYYY-MM-DD), defaults to the earliest appointment")
+        parser.add_argument('--end', help="Last day (YYYY-MM-DD), defaults to the latest appointment")
+        parser.add_argument('--chunk-size', type=int, default=2000)
+        parser.add_argument('--batch-size', type=int, default=500)
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start']) if options['start'] else None
+        end = parse_date(options['end']) if options['end'] else None
+
+        written = backfill_daily_stats(
+            start=start,
+            end=end,
+            chunk_size=options['chunk_size'],
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(f"Wrote {written} daily rollup row(s)"))
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.images import process_pending_renditions
+
+
+class Command(BaseCommand):
+    help = "Build resized WebP/JPEG copies of newly uploaded service images"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep watching for new uploads instead of exiting",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=30,
+            help="Seconds to sleep between scans with --loop",
+        )
+        parser.add_argument(
+            '--retry-failed',
+            action='store_true',
+            help="Try again on images that could not be read before",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending_renditions(retry_failed=options['retry_failed'])
+            if processed:
+                self.stdout.write(f"Built renditions for {processed} service image(s)")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,19 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from booking.inventory_csv import export_inventory_csv
+
+
+class Command(BaseCommand):
+    help = "Write all inventory items as CSV (to stdout when no path is given)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', nargs='?')
+
+    def handle(self, *args, **options):
+        if options['path']:
+            with open(options['path'], 'w', encoding='utf-8', newline='') as fh:
+                fh.writelines(export_inventory_csv())
+        else:
+            sys.stdout.writelines(export_inventory_csv())
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from booking.forecast import FORECAST_DAYS, FORECAST_HISTORY_DAYS, refresh_inventory_forecast
+
+
+class Command(BaseCommand):
+    help = "Recompute the inventory reorder forecast shown on the admin inventory page (run nightly)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=FORECAST_DAYS, help="Days ahead to forecast")
+        parser.add_argument(
+            '--history', type=int, default=FORECAST_HISTORY_DAYS,
+            help="Days of past consumption the usage rate is taken from",
+        )
+
+    def handle(self, *args, **options):
+        if options['days'] < 1 or options['history'] < 1:
+            raise CommandError("--days and --history must be positive")
+
+        started = time.perf_counter()
+        forecast = refresh_inventory_forecast(days=options['days'], history_days=options['history'])
+        elapsed = time.perf_counter() - started
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Forecast {len(forecast['items'])} item(s) over {forecast['days']} days "
+            f"in {elapsed:.2f}s: {len(forecast['reorder'])} to reorder"
+        ))
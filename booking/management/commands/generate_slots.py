@@ -0,0 +1,48 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from booking.slots import generate_slots
+
+
+def parse_date(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d").date()
+    except ValueError:
+        raise CommandError(f"Invalid date '{value}', expected YYYY-MM-DD")
+
+
+class Command(BaseCommand):
+    help = "Create available slots for all active staff from their working hours"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day (YYYY-MM-DD), defaults to today")
+        parser.add_argument('--end', help="Last day (YYYY-MM-DD), overrides --days")
+        parser.add_argument('--days', type=int, default=30)
+        parser.add_argument('--slot-minutes', type=int, default=60)
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start']) if options['start'] else timezone.localdate()
+
+        if options['end']:
+            end = parse_date(options['end'])
+        else:
+            end = start + timedelta(days=options['days'] - 1)
+
+        if end < start:
+            raise CommandError("End date is before start date")
+        if options['slot_minutes'] <= 0:
+            raise CommandError("--slot-minutes must be positive")
+
+        created = generate_slots(
+            start,
+            end,
+            slot_minutes=options['slot_minutes'],
+            batch_size=options['batch_size'],
+        )
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Generated {created} slot(s) from {start} to {end}"
+        ))
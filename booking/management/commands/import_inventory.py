@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from booking.inventory_csv import IMPORT_CHUNK_SIZE, import_inventory_csv
+
+
+class Command(BaseCommand):
+    help = "Insert or update inventory items from a CSV file, keyed by name + category"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--chunk-size', type=int, default=IMPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        with open(options['path'], encoding='utf-8-sig', newline='') as fh:
+            result = import_inventory_csv(fh, chunk_size=options['chunk_size'])
+
+        for line, error in result['errors']:
+            self.stderr.write(f"Line {line}: {error}")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result['imported']} item(s), skipped {len(result['errors'])} row(s)"
+        ))
@@ -0,0 +1,89 @@
+import os
+import statistics
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+
+# Imports the app the way a fresh worker does and prints the seconds it took
+BOOT_SNIPPET = (
+    "import time; started = time.perf_counter(); "
+    "import {module}; "
+    "print(time.perf_counter() - started)"
+)
+
+
+class Command(BaseCommand):
+    help = "Report per-module import cost and cold-boot time of the WSGI application"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--module',
+            default=settings.WSGI_APPLICATION.rsplit('.', 1)[0],
+            help="Module to boot (default: the WSGI_APPLICATION module)",
+        )
+        parser.add_argument('--top', type=int, default=15, help="Modules to list")
+        parser.add_argument('--repeat', type=int, default=5, help="Cold boots to time")
+
+    def handle(self, *args, **options):
+        module = options['module']
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+
+        # ---------------------------
+        # Cold boot: one fresh interpreter per run
+        # ---------------------------
+        boots = [self.boot(module, env) for _ in range(options['repeat'])]
+        self.stdout.write(self.style.MIGRATE_HEADING(f"Cold boot of {module}"))
+        self.stdout.write(
+            f"  best {min(boots) * 1000:.0f} ms, "
+            f"median {statistics.median(boots) * 1000:.0f} ms "
+            f"over {len(boots)} runs"
+        )
+
+        # ---------------------------
+        # -X importtime digest
+        # ---------------------------
+        rows = self.import_times(module, env)
+        total = sum(self_us for _, self_us, _ in rows)
+
+        by_package = defaultdict(int)
+        for name, self_us, _ in rows:
+            by_package[name.split('.')[0]] += self_us
+
+        self.stdout.write(self.style.MIGRATE_HEADING(
+            f"\nImport time by top-level package ({len(rows)} modules, {total / 1000:.0f} ms)"
+        ))
+        for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:options['top']]:
+            self.stdout.write(f"  {self_us / 1000:8.1f} ms  {self_us * 100 / total:5.1f}%  {package}")
+
+        self.stdout.write(self.style.MIGRATE_HEADING("\nSlowest modules (cumulative)"))
+        for name, self_us, cumulative_us in sorted(rows, key=lambda row: -row[2])[:options['top']]:
+            self.stdout.write(f"  {cumulative_us / 1000:8.1f} ms  (self {self_us / 1000:6.1f} ms)  {name}")
+
+    def boot(self, module, env):
+        completed = subprocess.run(
+            [sys.executable, '-c', BOOT_SNIPPET.format(module=module)],
+            env=env, capture_output=True, text=True, check=True,
+        )
+        return float(completed.stdout.strip().splitlines()[-1])
+
+    def import_times(self, module, env):
+        """
+        [(module, self us, cumulative us)] parsed from python -X importtime.
+        """
+        completed = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', f"import {module}"],
+            env=env, capture_output=True, text=True, check=True,
+        )
+
+        rows = []
+        for line in completed.stderr.splitlines():
+            # import time:       123 |        456 |     django.db
+            if not line.startswith('import time:') or '[us]' in line:
+                continue
+            self_us, cumulative_us, name = line[len('import time:'):].split('|')
+            rows.append((name.strip(), int(self_us), int(cumulative_us)))
+        return rows
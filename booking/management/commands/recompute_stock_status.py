@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from booking.inventory import recompute_stock_status
+
+
+class Command(BaseCommand):
+    help = "Recompute the stock status of every inventory item in one UPDATE"
+
+    def handle(self, *args, **options):
+        updated = recompute_stock_status()
+        self.stdout.write(self.style.SUCCESS(f"Recomputed stock status of {updated} item(s)"))
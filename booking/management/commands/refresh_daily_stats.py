@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from booking.management.commands.generate_slots import parse_date
+from booking.reports import refresh_dirty_daily_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute the DailyStats rows flagged dirty by appointment changes (run every few minutes)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--start', help="First day (YYYY-MM-DD), defaults to every dirty day")
+        parser.add_argument('--end', help="Last day (YYYY-MM-DD)")
+
+    def handle(self, *args, **options):
+        start = parse_date(options['start']) if options['start'] else None
+        end = parse_date(options['end']) if options['end'] else None
+
+        refreshed = refresh_dirty_daily_stats(start=start, end=end)
+
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {refreshed} daily rollup row(s)"))
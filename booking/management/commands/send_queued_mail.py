@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from booking.mail import drain_outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued emails from the outbox"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--workers', type=int, default=4)
+        parser.add_argument(
+            '--loop',
+            action='store_true',
+            help="Keep polling the outbox instead of exiting when it is empty",
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help="Seconds to sleep between polls with --loop",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = drain_outbox(
+                batch_size=options['batch_size'],
+                workers=options['workers'],
+            )
+            if sent:
+                self.stdout.write(f"Sent {sent} email(s)")
+
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
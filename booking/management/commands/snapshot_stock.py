@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from booking.ledger import take_stock_snapshots
+
+
+class Command(BaseCommand):
+    help = "Snapshot the quantity of every inventory item (run nightly to bound stock ledger scans)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--at',
+            help="Back-dated snapshot, rebuilt from the ledger (ISO datetime; default: now)",
+        )
+
+    def handle(self, *args, **options):
+        at = None
+        if options['at']:
+            at = parse_datetime(options['at'])
+            if at is None:
+                raise CommandError(f"Invalid datetime: {options['at']}")
+            if timezone.is_naive(at):
+                at = timezone.make_aware(at)
+
+        written = take_stock_snapshots(at)
+        self.stdout.write(self.style.SUCCESS(f"Snapshotted {written} item(s)"))
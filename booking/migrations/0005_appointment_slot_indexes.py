@@ -0,0 +1,25 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:42
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_dailystats'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['email', 'appointment_date', 'appointment_time'], name='appt_email_schedule_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['appointment_date', 'status'], name='appt_date_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='availableslot',
+            index=models.Index(fields=['date', 'is_available', 'start_time'], name='slot_date_free_start_idx'),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:43
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_appointment_slot_indexes'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='appointment',
+            name='appt_email_schedule_idx',
+        ),
+        migrations.AddField(
+            model_name='appointment',
+            name='customer',
+            field=models.ForeignKey(blank=True, help_text='Account that booked this appointment', null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='appointments', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='appointment',
+            index=models.Index(fields=['customer', 'appointment_date', 'appointment_time'], name='appt_customer_schedule_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations
+from django.db.models import Case, UUIDField, Value, When
+
+
+BATCH_SIZE = 1000
+
+
+def link_customers(apps, schema_editor):
+    """
+    Point existing appointments at the user with the same email,
+    one UPDATE per batch of appointments.
+    """
+    Appointment = apps.get_model('booking', 'Appointment')
+    User = apps.get_model('booking', 'User')
+
+    last_id = 0
+    while True:
+        batch = list(
+            Appointment.objects
+            .filter(id__gt=last_id, customer__isnull=True)
+            .order_by('id')
+            .values_list('id', 'email')[:BATCH_SIZE]
+        )
+        if not batch:
+            return
+        last_id = batch[-1][0]
+
+        user_ids = dict(
+            User.objects
+            .filter(email__in={email for _, email in batch})
+            .values_list('email', 'id')
+        )
+        if not user_ids:
+            continue
+
+        Appointment.objects.filter(
+            id__in=[appointment_id for appointment_id, email in batch if email in user_ids]
+        ).update(
+            customer_id=Case(
+                *[When(email=email, then=Value(user_id)) for email, user_id in user_ids.items()],
+                output_field=UUIDField(),
+            )
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_appointment_customer'),
+    ]
+
+    operations = [
+        migrations.RunPython(link_customers, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0007_backfill_appointment_customer'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dailystats',
+            name='is_dirty',
+            field=models.BooleanField(db_index=True, default=False),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.16 on 2026-10-18 15:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_dailystats_is_dirty'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='service',
+            name='image_renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
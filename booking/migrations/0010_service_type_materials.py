@@ -0,0 +1,35 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_service_image_renditions'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='appointment',
+            name='inventory_consumed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True),
+        ),
+        migrations.CreateModel(
+            name='ServiceTypeMaterial',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField(default=1)),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='service_usages', to='booking.inventoryitem')),
+                ('service_type', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='materials', to='booking.servicetype')),
+            ],
+            options={
+                'db_table': 'service_type_materials',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='servicetypematerial',
+            constraint=models.UniqueConstraint(fields=('service_type', 'item'), name='unique_service_type_item'),
+        ),
+    ]
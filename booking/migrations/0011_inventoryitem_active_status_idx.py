@@ -0,0 +1,22 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0010_service_type_materials'),
+    ]
+
+    operations = [
+        # New index first, so status lookups are never without one
+        migrations.AddIndex(
+            model_name='inventoryitem',
+            index=models.Index(fields=['status', 'is_active', 'name'], name='item_active_status_idx'),
+        ),
+        migrations.RemoveIndex(
+            model_name='inventoryitem',
+            name='booking_inv_status_8d3b70_idx',
+        ),
+    ]
@@ -0,0 +1,72 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:04
+
+from collections import defaultdict
+
+from django.db import migrations, models
+
+
+def merge_duplicate_items(apps, schema_editor):
+    """
+    Fold items repeated within a category into one before the unique
+    constraint goes on: the most recently updated row is kept, with the
+    stock of all of them and their service type materials.
+    """
+    InventoryItem = apps.get_model('booking', 'InventoryItem')
+    ServiceTypeMaterial = apps.get_model('booking', 'ServiceTypeMaterial')
+
+    # MySQL's default collation ignores case and trailing spaces, so its constraint would too
+    if schema_editor.connection.vendor == 'mysql':
+        fold = lambda name: name.rstrip().casefold()
+    else:
+        fold = str
+
+    groups = defaultdict(list)
+    rows = (
+        InventoryItem.objects
+        .order_by('-updated_at', 'id')
+        .values_list('id', 'name', 'category_id', 'quantity', 'min_stock')
+        .iterator()
+    )
+    for item_id, name, category_id, quantity, min_stock in rows:
+        groups[fold(name), category_id].append((item_id, quantity, min_stock))
+
+    for items in groups.values():
+        if len(items) < 2:
+            continue
+        (keep, _, min_stock), duplicates = items[0], [item_id for item_id, _, _ in items[1:]]
+
+        # A service type already using the kept item keeps its own quantity
+        used = set(ServiceTypeMaterial.objects.filter(item_id=keep).values_list('service_type_id', flat=True))
+        for material_id, service_type_id in (
+            ServiceTypeMaterial.objects.filter(item_id__in=duplicates).values_list('id', 'service_type_id')
+        ):
+            if service_type_id in used:
+                ServiceTypeMaterial.objects.filter(id=material_id).delete()
+            else:
+                ServiceTypeMaterial.objects.filter(id=material_id).update(item_id=keep)
+                used.add(service_type_id)
+
+        quantity = sum(quantity for _, quantity, _ in items)
+        if quantity <= 0:
+            status = 'out_of_stock'
+        elif quantity <= min_stock:
+            status = 'low_stock'
+        else:
+            status = 'in_stock'
+        InventoryItem.objects.filter(id=keep).update(quantity=quantity, status=status)
+        InventoryItem.objects.filter(id__in=duplicates).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_inventoryitem_active_status_idx'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_items, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='inventoryitem',
+            constraint=models.UniqueConstraint(fields=('name', 'category'), name='unique_item_name_category'),
+        ),
+    ]
@@ -0,0 +1,69 @@
+# Generated by Django 4.2.16 on 2026-10-18 16:06
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+def record_initial_stock(apps, schema_editor):
+    # Open the ledger with what is on the shelves today
+    InventoryItem = apps.get_model('booking', 'InventoryItem')
+    StockMovement = apps.get_model('booking', 'StockMovement')
+    now = django.utils.timezone.now()
+    StockMovement.objects.bulk_create(
+        [
+            StockMovement(item_id=item_id, delta=quantity, reason='initial', created_at=now)
+            for item_id, quantity in InventoryItem.objects.filter(quantity__gt=0).values_list('id', 'quantity')
+        ],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_inventoryitem_unique_name_category'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='StockSnapshot',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('taken_at', models.DateTimeField()),
+                ('quantity', models.IntegerField()),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='snapshots', to='booking.inventoryitem')),
+            ],
+            options={
+                'db_table': 'stock_snapshots',
+            },
+        ),
+        migrations.CreateModel(
+            name='StockMovement',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('delta', models.IntegerField()),
+                ('reason', models.CharField(choices=[('initial', 'Initial stock'), ('consumption', 'Used by an appointment'), ('restock', 'Restock'), ('adjustment', 'Manual adjustment'), ('import', 'CSV import')], max_length=20)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('appointment', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='stock_movements', to='booking.appointment')),
+                ('item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='movements', to='booking.inventoryitem')),
+            ],
+            options={
+                'db_table': 'stock_movements',
+                'ordering': ['created_at'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='stocksnapshot',
+            constraint=models.UniqueConstraint(fields=('item', 'taken_at'), name='unique_item_snapshot'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['item', 'created_at'], name='movement_item_time_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='stockmovement',
+            index=models.Index(fields=['reason', 'created_at'], name='movement_reason_time_idx'),
+        ),
+        migrations.RunPython(record_initial_stock, migrations.RunPython.noop),
+    ]
@@ -1,7 +1,9 @@
-from django.db import models
+from django.db import models, transaction
 from django.contrib.auth.models import AbstractUser
 import uuid
 from django.core.validators import FileExtensionValidator
+from django.utils import timezone
+from django.utils.text import slugify
 
 # ---------- User ----------
 class User(AbstractUser):
@@ -43,6 +45,9 @@ class Service(models.Model):
         help_text="Upload service image (jpg, png, webp)"
     )
 
+    # Resized copies of `image`, written by the build_image_renditions worker
+    image_renditions = models.JSONField(default=dict, blank=True, editable=False)
+
     is_active = models.BooleanField(default=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
@@ -98,6 +103,18 @@ class Appointment(models.Model):
 
     class Meta:
         db_table = 'appointments'
+        indexes = [
+            # customer history / dashboard: filter by customer, sort by schedule
+            models.Index(
+                fields=['customer', 'appointment_date', 'appointment_time'],
+                name='appt_customer_schedule_idx'
+            ),
+            # admin lists: filter by day and status
+            models.Index(
+                fields=['appointment_date', 'status'],
+                name='appt_date_status_idx'
+            ),
+        ]
 
     # ---------------------------
     # SERVICES (IMPORTANT)
@@ -120,7 +137,17 @@ class Appointment(models.Model):
         help_text="Staff assigned to this appointment"
     )
 
-   
+    # ---------------------------
+    # CUSTOMER ACCOUNT
+    # ---------------------------
+    customer = models.ForeignKey(
+        User,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='appointments',
+        help_text="Account that booked this appointment"
+    )
 
     # ---------------------------
     # APPOINTMENT STATUS
@@ -163,6 +190,10 @@ class Appointment(models.Model):
     cancelled_reason = models.TextField(blank=True, null=True)
     cancelled_at = models.DateTimeField(blank=True, null=True)
 
+    # Set when the materials of the services were taken out of stock,
+    # so completing the same appointment twice only consumes once
+    inventory_consumed_at = models.DateTimeField(blank=True, null=True, editable=False)
+
     # ---------------------------
     # TIMESTAMPS
     # ---------------------------
@@ -187,6 +218,13 @@ class AvailableSlot(models.Model):
     class Meta:
         db_table = 'available_slots'
         unique_together = ['staff', 'date', 'start_time']
+        indexes = [
+            # slot allocation: free slots of a day in time order
+            models.Index(
+                fields=['date', 'is_available', 'start_time'],
+                name='slot_date_free_start_idx'
+            ),
+        ]
     
     def __str__(self):
         staff_name = f"{self.staff.user.first_name} {self.staff.user.last_name}" if self.staff and self.staff.user else "No Staff"
@@ -282,8 +320,17 @@ class InventoryItem(models.Model):
         ordering = ["name"]
         indexes = [
             models.Index(fields=["name"]),
-            models.Index(fields=["status"]),
             models.Index(fields=["category"]),
+            # dashboard low-stock list / stock counters: active items by status, by name.
+            # Leads with status so it also replaces the old status-only index.
+            models.Index(
+                fields=["status", "is_active", "name"],
+                name="item_active_status_idx"
+            ),
+        ]
+        constraints = [
+            # CSV import key: one item of a name per category
+            models.UniqueConstraint(fields=["name", "category"], name="unique_item_name_category"),
         ]
 
     def __str__(self):
@@ -299,4 +346,169 @@ class InventoryItem(models.Model):
 
     def save(self, *args, **kwargs):
         self.update_stock_status()
-        super().save(*args, **kwargs)
+        # The ledger movement (post_save) commits with the row, as take_stock_snapshots expects
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+
+# ---------- Bill of materials ----------
+class ServiceTypeMaterial(models.Model):
+    """
+    How much of an inventory item one booking of a service type uses up.
+    """
+    service_type = models.ForeignKey(
+        ServiceType,
+        on_delete=models.CASCADE,
+        related_name='materials'
+    )
+    item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        related_name='service_usages'
+    )
+    quantity = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        db_table = 'service_type_materials'
+        constraints = [
+            models.UniqueConstraint(fields=['service_type', 'item'], name='unique_service_type_item'),
+        ]
+
+    def __str__(self):
+        return f"{self.quantity} x {self.item.name}"
+
+
+# ---------- Stock ledger ----------
+class StockMovement(models.Model):
+    """
+    One change of an item's quantity. Rows are only ever appended:
+    stock at a past moment is a snapshot plus the movements after it.
+    """
+
+    class Reason(models.TextChoices):
+        INITIAL = "initial", "Initial stock"
+        CONSUMPTION = "consumption", "Used by an appointment"
+        RESTOCK = "restock", "Restock"
+        ADJUSTMENT = "adjustment", "Manual adjustment"
+        IMPORT = "import", "CSV import"
+
+    item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        related_name="movements"
+    )
+    delta = models.IntegerField()
+    reason = models.CharField(max_length=20, choices=Reason.choices)
+    appointment = models.ForeignKey(
+        Appointment,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name="stock_movements"
+    )
+    created_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        db_table = 'stock_movements'
+        ordering = ["created_at"]
+        indexes = [
+            # stock_at(): movements of an item after its snapshot
+            models.Index(fields=["item", "created_at"], name="movement_item_time_idx"),
+            # consumption report: one reason over a period
+            models.Index(fields=["reason", "created_at"], name="movement_reason_time_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} {self.delta:+d} ({self.reason})"
+
+
+class StockSnapshot(models.Model):
+    """
+    Quantity of an item at a moment, so reading stock never scans the
+    whole ledger. Written by `snapshot_stock`.
+    """
+    item = models.ForeignKey(
+        InventoryItem,
+        on_delete=models.CASCADE,
+        related_name="snapshots"
+    )
+    taken_at = models.DateTimeField()
+    quantity = models.IntegerField()
+
+    class Meta:
+        db_table = 'stock_snapshots'
+        constraints = [
+            models.UniqueConstraint(fields=["item", "taken_at"], name="unique_item_snapshot"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} @ {self.taken_at}: {self.quantity}"
+
+
+
+
+class OutboundEmail(models.Model):
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        SENT = "sent", "Sent"
+        FAILED = "failed", "Failed"
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=255)
+    to = models.EmailField()
+
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default="")
+
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'outbound_emails'
+        ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
+
+    def __str__(self):
+        return f"{self.to} - {self.subject} ({self.status})"
+
+
+
+
+class DailyStats(models.Model):
+    date = models.DateField(unique=True)
+
+    total_appointments = models.PositiveIntegerField(default=0)
+    pending_count = models.PositiveIntegerField(default=0)
+    confirmed_count = models.PositiveIntegerField(default=0)
+    completed_count = models.PositiveIntegerField(default=0)
+    cancelled_count = models.PositiveIntegerField(default=0)
+
+    # Sum of service prices of completed appointments
+    revenue = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+
+    # {service_type_id: bookings}, cancelled appointments excluded
+    service_counts = models.JSONField(default=dict, blank=True)
+
+    # Appointments of this day changed since the row was computed
+    is_dirty = models.BooleanField(default=False, db_index=True)
+
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'daily_stats'
+        verbose_name = "Daily Stats"
+        verbose_name_plural = "Daily Stats"
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"{self.date} | {self.total_appointments} appointments"
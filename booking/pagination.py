@@ -0,0 +1,162 @@
+import base64
+import binascii
+from datetime import date, time
+
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.utils.functional import cached_property
+
+
+KEYSET_PAGE_SIZE = 20
+KEYSET_MAX_PAGE_SIZE = 100
+
+# Below this the statistics are too rough to be worth it; COUNT(*) is cheap anyway
+ESTIMATE_MIN_ROWS = 10000
+
+
+def encode_cursor(appointment):
+    raw = (
+        f"{appointment.appointment_date.isoformat()}|"
+        f"{appointment.appointment_time.isoformat()}|"
+        f"{appointment.id}"
+    )
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """
+    Return (date, time, id) from a cursor. Raises ValueError if it is malformed.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor.encode()).decode()
+        day, at, pk = raw.split('|')
+        return date.fromisoformat(day), time.fromisoformat(at), int(pk)
+    except (ValueError, binascii.Error) as exc:
+        raise ValueError("Invalid cursor") from exc
+
+
+def keyset_page(queryset, cursor=None, size=KEYSET_PAGE_SIZE, descending=False):
+    """
+    One page of appointments ordered by (appointment_date, appointment_time, id),
+    starting after `cursor`. Seeks on the ordering key instead of using OFFSET,
+    so every page costs the same however deep it is.
+
+    Returns (appointments, next_cursor); next_cursor is None on the last page.
+    """
+    size = max(1, min(size, KEYSET_MAX_PAGE_SIZE))
+
+    if descending:
+        ordering = ('-appointment_date', '-appointment_time', '-id')
+        op = 'lt'
+    else:
+        ordering = ('appointment_date', 'appointment_time', 'id')
+        op = 'gt'
+
+    if cursor:
+        day, at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(
+            Q(**{f'appointment_date__{op}': day})
+            | Q(appointment_date=day, **{f'appointment_time__{op}': at})
+            | Q(appointment_date=day, appointment_time=at, **{f'id__{op}': pk})
+        )
+
+    items = list(queryset.order_by(*ordering)[:size + 1])
+
+    next_cursor = None
+    if len(items) > size:
+        items = items[:size]
+        next_cursor = encode_cursor(items[-1])
+
+    return items, next_cursor
+
+
+def appointment_as_dict(appointment):
+    return {
+        "id": appointment.id,
+        "date": appointment.appointment_date.isoformat(),
+        "time": appointment.appointment_time.strftime("%H:%M"),
+        "status": appointment.status,
+        "staff": str(appointment.staff) if appointment.staff_id else None,
+        "services": [str(service_type) for service_type in appointment.services.all()],
+    }
+
+
+def estimate_row_count(model, using='default'):
+    """
+    Table size from the database statistics, or None when the backend
+    keeps none we can read. Only a rough guide: InnoDB samples a handful
+    of pages for TABLE_ROWS, which can be 40-50% off and, with
+    information_schema_stats_expiry, up to a day stale.
+    """
+    connection = connections[using]
+    table = model._meta.db_table
+
+    if connection.vendor == 'mysql':
+        sql = (
+            "SELECT TABLE_ROWS FROM information_schema.TABLES "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+        )
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    else:
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [table])
+        row = cursor.fetchone()
+    return row[0] if row and row[0] is not None and row[0] >= 0 else None
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Admin paginator for big tables: an unfiltered changelist takes its
+    total from the table statistics instead of a COUNT(*) over every row.
+    Filtered changelists are still counted exactly.
+
+    The estimate is checked against each page fetched: a page that turns
+    out to be the last one gives the exact total for free, and one that
+    disagrees with the estimated page count (short, empty or overflowing)
+    falls back to COUNT(*), so the page links never lead past the end.
+    """
+
+    estimated = False
+
+    def estimate(self):
+        query = getattr(self.object_list, 'query', None)
+        if query is None or query.where:
+            return None
+        return estimate_row_count(self.object_list.model, self.object_list.db)
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is not None and estimate >= ESTIMATE_MIN_ROWS:
+            self.estimated = True
+            return estimate
+        return super().count
+
+    def correct_count(self, count=None):
+        self.estimated = False
+        self.__dict__['count'] = super().count if count is None else count
+        self.__dict__.pop('num_pages', None)
+
+    def page(self, number):
+        number = self.validate_number(number)
+        if not self.estimated:
+            return super().page(number)
+
+        # One row past the longest possible page tells whether this is the last one
+        bottom = (number - 1) * self.per_page
+        objects = list(self.object_list[bottom:bottom + self.per_page + self.orphans + 1])
+        is_last = len(objects) <= self.per_page + self.orphans
+
+        if is_last and (objects or bottom == 0):
+            self.correct_count(bottom + len(objects))
+        elif is_last or number == self.num_pages:
+            # Past the real end, or more rows than the estimate allowed for
+            self.correct_count()
+            number = self.validate_number(number)
+        if not is_last:
+            objects = objects[:self.per_page]
+        return self._get_page(objects, number, self)
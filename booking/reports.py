@@ -0,0 +1,204 @@
+from collections import Counter
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+
+from .models import Appointment, DailyStats, ServiceType
+from .utils import bulk_upsert
+
+
+STATUS_FIELDS = {
+    'pending': 'pending_count',
+    'confirmed': 'confirmed_count',
+    'completed': 'completed_count',
+    'cancelled': 'cancelled_count',
+}
+
+ROLLUP_FIELDS = [
+    'total_appointments',
+    *STATUS_FIELDS.values(),
+    'revenue',
+    'service_counts',
+]
+
+
+def compute_daily_stats(day):
+    """
+    Rollup values for one day, read from the appointments of that day.
+    """
+    values = Appointment.objects.filter(appointment_date=day).aggregate(
+        total_appointments=Count('id'),
+        **{
+            field: Count('id', filter=Q(status=status))
+            for status, field in STATUS_FIELDS.items()
+        }
+    )
+
+    values['revenue'] = ServiceType.objects.filter(
+        appointments__appointment_date=day,
+        appointments__status='completed'
+    ).aggregate(total=Sum('price'))['total'] or Decimal('0')
+
+    values['service_counts'] = {
+        str(row['servicetype_id']): row['bookings']
+        for row in (
+            Appointment.services.through.objects
+            .filter(appointment__appointment_date=day)
+            .exclude(appointment__status='cancelled')
+            .values('servicetype_id')
+            .annotate(bookings=Count('id'))
+        )
+    }
+    return values
+
+
+def refresh_daily_stats(day):
+    # Clear the flag first: a change made while computing marks the day again
+    DailyStats.objects.filter(date=day).update(is_dirty=False)
+
+    bulk_upsert(
+        DailyStats,
+        [DailyStats(date=day, **compute_daily_stats(day))],
+        unique_fields=['date'],
+        update_fields=ROLLUP_FIELDS,
+    )
+
+
+def refresh_dirty_daily_stats(start=None, end=None):
+    """
+    Recompute and store the changed days (between two dates, when given).
+    Run by the `refresh_daily_stats` command. Returns the number of days.
+    """
+    dirty = DailyStats.objects.filter(is_dirty=True)
+    if start:
+        dirty = dirty.filter(date__gte=start)
+    if end:
+        dirty = dirty.filter(date__lte=end)
+
+    days = list(dirty.values_list('date', flat=True))
+    for day in days:
+        refresh_daily_stats(day)
+    return len(days)
+
+
+def mark_daily_stats_dirty(*days):
+    """
+    Flag the rollup rows of `days` for recomputation once the current
+    transaction commits. Booking writes pay one upsert; the day is
+    recomputed by `refresh_daily_stats` (and on the fly by reports until then).
+    """
+    days = sorted({day for day in days if day})
+    if days:
+        transaction.on_commit(lambda: bulk_upsert(
+            DailyStats,
+            [DailyStats(date=day, is_dirty=True) for day in days],
+            unique_fields=['date'],
+            update_fields=['is_dirty'],
+        ))
+
+
+def backfill_daily_stats(start=None, end=None, chunk_size=2000, batch_size=500):
+    """
+    Rebuild the rollup rows from the full appointment history, streaming
+    one row per (appointment, service type). Returns the number of days written.
+    """
+    appointments = Appointment.objects.all()
+    rollups = DailyStats.objects.all()
+    if start:
+        appointments = appointments.filter(appointment_date__gte=start)
+        rollups = rollups.filter(date__gte=start)
+    if end:
+        appointments = appointments.filter(appointment_date__lte=end)
+        rollups = rollups.filter(date__lte=end)
+
+    rows = (
+        appointments
+        .order_by('appointment_date', 'id')
+        .values_list('id', 'appointment_date', 'status', 'services__id', 'services__price')
+        .iterator(chunk_size=chunk_size)
+    )
+
+    rollups.delete()
+
+    written = 0
+    buffer = []
+
+    def flush():
+        nonlocal written
+        bulk_upsert(DailyStats, buffer, ['date'], ROLLUP_FIELDS, batch_size=batch_size)
+        written += len(buffer)
+        buffer.clear()
+
+    current = None
+    last_id = None
+    for appointment_id, day, status, type_id, price in rows:
+        if current is None or current.date != day:
+            if current is not None:
+                current.service_counts = dict(current.service_counts)
+                buffer.append(current)
+                if len(buffer) >= batch_size:
+                    flush()
+            current = DailyStats(date=day, revenue=Decimal('0'), service_counts=Counter())
+
+        if appointment_id != last_id:
+            last_id = appointment_id
+            current.total_appointments += 1
+            if status in STATUS_FIELDS:
+                field = STATUS_FIELDS[status]
+                setattr(current, field, getattr(current, field) + 1)
+
+        if type_id is not None and status != 'cancelled':
+            current.service_counts[str(type_id)] += 1
+            if status == 'completed':
+                current.revenue += price
+
+    if current is not None:
+        current.service_counts = dict(current.service_counts)
+        buffer.append(current)
+    if buffer:
+        flush()
+
+    return written
+
+
+def period_report(start, end, top=3):
+    """
+    Totals between two dates, read from the rollup table. Days changed
+    since their row was stored are computed on the fly but not written:
+    reading a report never writes.
+    """
+    rows = DailyStats.objects.filter(date__range=(start, end))
+    clean = rows.filter(is_dirty=False)
+
+    totals = clean.aggregate(
+        revenue=Sum('revenue'),
+        total_appointments=Sum('total_appointments'),
+        completed_count=Sum('completed_count'),
+        cancelled_count=Sum('cancelled_count'),
+    )
+    totals = {field: value or 0 for field, value in totals.items()}
+
+    service_counts = Counter()
+    for counts in clean.values_list('service_counts', flat=True):
+        service_counts.update(counts)
+
+    for day in rows.filter(is_dirty=True).values_list('date', flat=True):
+        values = compute_daily_stats(day)
+        for field in totals:
+            totals[field] += values[field]
+        service_counts.update(values['service_counts'])
+
+    top_ids = [int(type_id) for type_id, _ in service_counts.most_common(top)]
+    names = {
+        service_type.id: str(service_type)
+        for service_type in ServiceType.objects.filter(id__in=top_ids).select_related('service')
+    }
+
+    return {
+        "revenue": totals['revenue'] or Decimal('0'),
+        "total_appointments": totals['total_appointments'],
+        "completed_count": totals['completed_count'],
+        "cancelled_count": totals['cancelled_count'],
+        "popular_services": [names[type_id] for type_id in top_ids if type_id in names],
+    }
@@ -1,6 +1,13 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, pre_save, post_save, pre_delete, post_delete, m2m_changed
 from django.dispatch import receiver
-from .models import User, Staff, Appointment
+from .models import User, Staff, Appointment, AvailableSlot, Service, ServiceType, InventoryItem, StockMovement
+from .availability import invalidate_days, invalidate_staff
+from .stats import invalidate_customer_stats, invalidate_dashboard_stats, invalidate_inventory_stats
+from .reports import mark_daily_stats_dirty
+from .catalog import invalidate_catalog
+from .images import delete_renditions
+from .inventory import consume_inventory
+from .ledger import record_movements
 
 
 @receiver(post_save, sender=User)
@@ -34,3 +41,136 @@ def manage_staff_profile(sender, instance, **kwargs):
         else:
             # SAFE DELETE
             staff.delete()
+
+
+@receiver([post_save, post_delete], sender=AvailableSlot)
+def invalidate_slot_availability(sender, instance, **kwargs):
+    invalidate_days([instance.date])
+
+
+# Staff fields the cached availability is built from
+STAFF_AVAILABILITY_FIELDS = ('is_active', 'is_available', 'working_hours_start', 'working_hours_end')
+
+
+@receiver(post_init, sender=Staff)
+def remember_staff_availability(sender, instance, **kwargs):
+    instance._loaded_availability = tuple(instance.__dict__.get(field) for field in STAFF_AVAILABILITY_FIELDS)
+
+
+@receiver(post_save, sender=Staff)
+def invalidate_staff_availability(sender, instance, created, **kwargs):
+    current = tuple(getattr(instance, field) for field in STAFF_AVAILABILITY_FIELDS)
+    if not created and current != instance._loaded_availability:
+        invalidate_staff(instance.pk)
+    instance._loaded_availability = current
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_appointment_availability(sender, instance, **kwargs):
+    invalidate_days([instance.appointment_date])
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+def invalidate_appointment_stats(sender, instance, **kwargs):
+    invalidate_customer_stats(instance.customer_id)
+
+
+@receiver(m2m_changed, sender=Appointment.services.through)
+def invalidate_appointment_services_stats(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Appointment):
+        invalidate_customer_stats(instance.customer_id)
+
+
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=User)
+def invalidate_model_dashboard_stats(sender, **kwargs):
+    invalidate_dashboard_stats()
+
+
+@receiver([post_save, post_delete], sender=InventoryItem)
+def invalidate_item_inventory_stats(sender, **kwargs):
+    invalidate_inventory_stats()
+
+
+# ---------- Daily rollup ----------
+@receiver(post_init, sender=Appointment)
+def remember_appointment_date(sender, instance, **kwargs):
+    # Read from __dict__ so deferred fields are not fetched
+    instance._rollup_date = instance.__dict__.get('appointment_date')
+    instance._loaded_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Appointment)
+def refresh_appointment_rollup(sender, instance, **kwargs):
+    mark_daily_stats_dirty(instance._rollup_date, instance.appointment_date)
+    instance._rollup_date = instance.appointment_date
+
+
+@receiver(post_delete, sender=Appointment)
+def refresh_deleted_appointment_rollup(sender, instance, **kwargs):
+    mark_daily_stats_dirty(instance.appointment_date)
+
+
+@receiver(m2m_changed, sender=Appointment.services.through)
+def refresh_appointment_services_rollup(sender, instance, action, **kwargs):
+    if action.startswith('post_') and isinstance(instance, Appointment):
+        mark_daily_stats_dirty(instance.appointment_date)
+
+
+# ---------- Inventory consumption ----------
+@receiver(post_save, sender=Appointment)
+def consume_completed_appointment_inventory(sender, instance, created, **kwargs):
+    # A new appointment has no services attached yet; only transitions count
+    if not created and instance.status == 'completed' and instance._loaded_status != 'completed':
+        consume_inventory([instance.pk])
+        # Stamped by an UPDATE; keep the instance in step with the row
+        instance.refresh_from_db(fields=['inventory_consumed_at'])
+    instance._loaded_status = instance.status
+
+
+# ---------- Stock ledger ----------
+@receiver(post_init, sender=InventoryItem)
+def remember_item_quantity(sender, instance, **kwargs):
+    instance._loaded_quantity = instance.__dict__.get('quantity')
+
+
+@receiver(post_save, sender=InventoryItem)
+def record_item_quantity_change(sender, instance, created, **kwargs):
+    if created:
+        delta, reason = instance.quantity, StockMovement.Reason.INITIAL
+    elif instance._loaded_quantity is None:
+        # quantity was deferred and never read, so it was not edited either
+        return
+    else:
+        delta = instance.quantity - instance._loaded_quantity
+        reason = StockMovement.Reason.RESTOCK if delta > 0 else StockMovement.Reason.ADJUSTMENT
+    record_movements([(instance.pk, delta, reason, None)])
+    instance._loaded_quantity = instance.quantity
+
+
+# ---------- Service catalog ----------
+@receiver([post_save, post_delete], sender=Service)
+@receiver([post_save, post_delete], sender=ServiceType)
+def invalidate_service_catalog(sender, **kwargs):
+    invalidate_catalog()
+
+
+# ---------- Service image renditions ----------
+@receiver(pre_save, sender=Service)
+def drop_stale_renditions(sender, instance, **kwargs):
+    source = instance.image_renditions.get('source')
+    if source and source != instance.image.name:
+        delete_renditions(instance.image_renditions)
+        instance.image_renditions = {}
+
+
+@receiver(pre_delete, sender=Service)
+def delete_service_renditions(sender, instance, **kwargs):
+    # The worker writes renditions with update(), so read the stored value
+    renditions = (
+        Service.objects
+        .filter(pk=instance.pk)
+        .values_list('image_renditions', flat=True)
+        .first()
+    )
+    delete_renditions(renditions or {})
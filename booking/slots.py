@@ -0,0 +1,202 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import time, timedelta
+from itertools import islice
+
+from django.core.cache import cache
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
+
+from .models import AvailableSlot, Staff
+
+
+# Used when a service type has no duration configured
+DEFAULT_SERVICE_DURATION = 60
+
+# Free slot rows of a day are cached between bookings; every change to the
+# day's slots, appointments or staff drops them (availability.invalidate_days)
+SLOT_INDEX_CACHE_TIMEOUT = 60 * 60
+
+
+def slot_index_key(day):
+    return f"slot-index:{day.isoformat()}"
+
+
+def to_minutes(value):
+    return value.hour * 60 + value.minute
+
+
+def from_minutes(value):
+    return time(value // 60, value % 60)
+
+
+def services_duration(service_types):
+    """
+    Total duration (minutes) of a ServiceType queryset.
+    """
+    total = service_types.aggregate(
+        total=Sum(Coalesce('duration_minutes', Value(DEFAULT_SERVICE_DURATION)))
+    )['total']
+    return total or DEFAULT_SERVICE_DURATION
+
+
+def appointment_duration(appointment):
+    """
+    Total duration (minutes) of the services booked on an appointment.
+    """
+    return services_duration(appointment.services.all())
+
+
+class SlotIndex:
+    """
+    Free intervals for one day, per staff member.
+
+    Adjacent free slots of a staff member are merged into a single
+    interval and clipped to the staff working hours. Intervals are kept
+    sorted by start so a fit query is a bisect per staff member.
+    """
+
+    def __init__(self, day, rows):
+        self.day = day
+        self._intervals = {}
+        self._starts = {}
+
+        per_staff = defaultdict(list)
+        for slot_id, staff_id, start, end, hours_start, hours_end in rows:
+            lo = max(to_minutes(start), to_minutes(hours_start))
+            hi = min(to_minutes(end), to_minutes(hours_end))
+            if lo < hi:
+                per_staff[staff_id].append((lo, hi, slot_id))
+
+        for staff_id, slots in per_staff.items():
+            slots.sort()
+            intervals = []
+            for lo, hi, slot_id in slots:
+                if intervals and intervals[-1][1] >= lo:
+                    last = intervals[-1]
+                    last[1] = max(last[1], hi)
+                    last[2].append((lo, hi, slot_id))
+                else:
+                    intervals.append([lo, hi, [(lo, hi, slot_id)]])
+            self._intervals[staff_id] = intervals
+            self._starts[staff_id] = [interval[0] for interval in intervals]
+
+    @classmethod
+    def for_date(cls, day, exclude=()):
+        """
+        Index of the free slots of `day`, from the cache when possible.
+        Slots in `exclude` (lost to another booking) are left out.
+        """
+        key = slot_index_key(day)
+        rows = cache.get(key)
+        if rows is None:
+            rows = list(
+                AvailableSlot.objects
+                .filter(
+                    date=day,
+                    is_available=True,
+                    staff__is_active=True,
+                    staff__is_available=True,
+                )
+                .values_list(
+                    'id',
+                    'staff_id',
+                    'start_time',
+                    'end_time',
+                    'staff__working_hours_start',
+                    'staff__working_hours_end',
+                )
+            )
+            cache.set(key, rows, SLOT_INDEX_CACHE_TIMEOUT)
+
+        if exclude:
+            rows = [row for row in rows if row[0] not in exclude]
+        return cls(day, rows)
+
+    def __bool__(self):
+        return bool(self._intervals)
+
+    def find(self, start_time, duration):
+        """
+        Return (staff_id, slot_ids) for the first staff member that is free
+        for `duration` minutes from `start_time`, or None.
+        """
+        begin = to_minutes(start_time)
+        finish = begin + duration
+
+        for staff_id in sorted(self._starts):
+            starts = self._starts[staff_id]
+            i = bisect_right(starts, begin) - 1
+            if i < 0:
+                continue
+
+            lo, hi, slots = self._intervals[staff_id][i]
+            if hi < finish:
+                continue
+
+            slot_ids = [
+                slot_id for s_lo, s_hi, slot_id in slots
+                if s_lo < finish and s_hi > begin
+            ]
+            return staff_id, slot_ids
+
+        return None
+
+
+def generate_slots(start_date, end_date, slot_minutes=60, batch_size=1000):
+    """
+    Create AvailableSlot rows from the working hours of every active staff
+    member, for each day in [start_date, end_date] that has no slots yet.
+    Returns the number of slots submitted for insert.
+    """
+    staff_hours = list(
+        Staff.objects
+        .filter(is_active=True)
+        .values_list('id', 'working_hours_start', 'working_hours_end')
+    )
+
+    # Days already materialized per staff member are left untouched
+    filled = set(
+        AvailableSlot.objects
+        .filter(
+            date__range=(start_date, end_date),
+            staff_id__in=[staff_id for staff_id, _, _ in staff_hours]
+        )
+        .values_list('staff_id', 'date')
+        .distinct()
+    )
+
+    def new_slots():
+        day = start_date
+        while day <= end_date:
+            for staff_id, hours_start, hours_end in staff_hours:
+                if (staff_id, day) in filled:
+                    continue
+
+                begin = to_minutes(hours_start)
+                finish = to_minutes(hours_end)
+                while begin + slot_minutes <= finish:
+                    yield AvailableSlot(
+                        staff_id=staff_id,
+                        date=day,
+                        start_time=from_minutes(begin),
+                        end_time=from_minutes(begin + slot_minutes),
+                    )
+                    begin += slot_minutes
+            day += timedelta(days=1)
+
+    created = 0
+    slots = new_slots()
+    while True:
+        batch = list(islice(slots, batch_size))
+        if not batch:
+            break
+        AvailableSlot.objects.bulk_create(batch, batch_size=batch_size, ignore_conflicts=True)
+        created += len(batch)
+
+    if created:
+        # bulk_create sends no signals
+        from .availability import invalidate_range
+        invalidate_range(start_date, end_date)
+
+    return created
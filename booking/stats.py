@@ -0,0 +1,111 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils import timezone
+
+from .models import Appointment, InventoryItem, Service, User
+
+
+# Dashboards tolerate counters this many seconds old
+STATS_CACHE_TIMEOUT = getattr(settings, 'STATS_CACHE_TIMEOUT', 30)
+
+UPCOMING_STATUSES = ['pending', 'confirmed']
+
+
+# Keys of date-dependent counters carry the day, so they roll over at midnight
+def _customer_key(customer_id):
+    return f"stats:customer:{customer_id}:{timezone.localdate()}"
+
+
+def _dashboard_key():
+    return f"stats:dashboard:{timezone.localdate()}"
+
+
+INVENTORY_KEY = "stats:inventory"
+
+
+def _cached(key, compute):
+    stats = cache.get(key)
+    if stats is None:
+        stats = compute()
+        cache.set(key, stats, STATS_CACHE_TIMEOUT)
+    return stats
+
+
+def customer_appointment_stats(customer):
+    """
+    Appointment counters for one customer, in a single query.
+    """
+    def compute():
+        today = timezone.localdate()
+        return Appointment.objects.filter(customer=customer).aggregate(
+            total_appointments=Count('id', distinct=True),
+            upcoming_count=Count(
+                'id',
+                distinct=True,
+                filter=Q(appointment_date__gte=today, status__in=UPCOMING_STATUSES)
+            ),
+            completed_count=Count('id', distinct=True, filter=Q(status='completed')),
+            cancelled_count=Count('id', distinct=True, filter=Q(status='cancelled')),
+            # unique services booked (Haircut, Makeup, etc.)
+            services_booked=Count('services__service', distinct=True),
+        )
+
+    return _cached(_customer_key(customer.pk), compute)
+
+
+def dashboard_stats():
+    """
+    Admin dashboard counters, one query per model.
+    """
+    def compute():
+        today = timezone.localdate()
+        return {
+            **Appointment.objects.aggregate(
+                today_appointments=Count('id', filter=Q(appointment_date=today)),
+                pending_appointments=Count('id', filter=Q(status='pending')),
+            ),
+            **Service.objects.aggregate(
+                total_services=Count('id', filter=Q(is_active=True)),
+            ),
+            **User.objects.aggregate(
+                total_customers=Count('id', filter=Q(role='customer', is_active=True)),
+            ),
+        }
+
+    return _cached(_dashboard_key(), compute)
+
+
+def inventory_stats():
+    """
+    Stock counters for active inventory items, in a single query.
+    """
+    def compute():
+        status = InventoryItem.StockStatus
+        return InventoryItem.objects.filter(is_active=True).aggregate(
+            total_products=Count('id'),
+            in_stock=Count('id', filter=Q(status=status.IN_STOCK)),
+            low_stock=Count('id', filter=Q(status=status.LOW_STOCK)),
+            out_of_stock=Count('id', filter=Q(status=status.OUT_OF_STOCK)),
+        )
+
+    return _cached(INVENTORY_KEY, compute)
+
+
+def _delete_on_commit(keys):
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def invalidate_customer_stats(*customer_ids):
+    keys = [_dashboard_key()]
+    keys += [_customer_key(customer_id) for customer_id in set(customer_ids) if customer_id]
+    _delete_on_commit(keys)
+
+
+def invalidate_dashboard_stats():
+    _delete_on_commit([_dashboard_key()])
+
+
+def invalidate_inventory_stats():
+    _delete_on_commit([INVENTORY_KEY])
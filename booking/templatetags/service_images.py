@@ -0,0 +1,47 @@
+from django import template
+from django.utils.html import format_html, format_html_join
+from django.core.files.storage import default_storage
+
+from booking.images import renditions_are_current
+
+
+register = template.Library()
+
+
+def _srcset(names):
+    return ", ".join(
+        f"{default_storage.url(name)} {width}w"
+        for width, name in sorted(names.items(), key=lambda item: int(item[0]))
+    )
+
+
+@register.simple_tag
+def service_image(service, sizes="(max-width: 768px) 100vw, 33vw", css_class=""):
+    """
+    <picture> for a service image with WebP and JPEG srcsets.
+    Falls back to the original upload until its renditions are built.
+    """
+    if not service.image:
+        return ""
+
+    if not renditions_are_current(service):
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" loading="lazy">',
+            service.image.url, service.name, css_class
+        )
+
+    renditions = service.image_renditions
+    sources = format_html_join(
+        "",
+        '<source type="{}" srcset="{}" sizes="{}">',
+        [("image/webp", _srcset(renditions.get('webp', {})), sizes)]
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" alt="{}" class="{}" loading="lazy"></picture>',
+        sources,
+        service.image.url,
+        _srcset(renditions.get('jpeg', {})),
+        sizes,
+        service.name,
+        css_class,
+    )
@@ -0,0 +1,1423 @@
+import io
+import shutil
+import tempfile
+import threading
+from datetime import date, time, timedelta
+from types import SimpleNamespace
+
+from django.contrib.messages import get_messages
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.paginator import EmptyPage
+from django.db import connection
+from django.test import SimpleTestCase, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.template import Context, Template
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from salon_project.testing import QueryBudgetMixin
+
+from . import catalog
+from .actions import cancel_appointments, confirm_appointments, reassign_appointments
+from .availability import _free_runs, free_start_times, get_day_bitmaps
+from .catalog import get_catalog
+from .checks import check_performance_settings, performance_warnings
+from .forecast import forecast_inventory
+from .mail import drain_outbox, queue_mail
+from .models import (
+    User, Service, ServiceType, Appointment, AvailableSlot, OutboundEmail, DailyStats,
+    InventoryCategory, InventoryItem, ServiceTypeMaterial, StockMovement, StockSnapshot,
+)
+from .images import build_renditions, process_pending_renditions
+from .inventory import consume_inventory, recompute_stock_status
+from .inventory_csv import export_inventory_csv, import_inventory_csv
+from .ledger import consumption_report, stock_at, stock_valuation, take_stock_snapshots
+from .pagination import EstimatedCountPaginator, decode_cursor, encode_cursor, keyset_page
+from .reports import backfill_daily_stats, period_report, refresh_dirty_daily_stats
+from .slots import SlotIndex, generate_slots, slot_index_key
+from .stats import customer_appointment_stats, dashboard_stats, inventory_stats
+from .utils import reserve_slot
+
+
+def make_staff(email):
+    user = User.objects.create_user(
+        username=email.split('@')[0],
+        email=email,
+        password='secret',
+        role='staff',
+    )
+    return user.staff_profile
+
+
+class SlotIndexTest(SimpleTestCase):
+
+    DAY = date(2030, 1, 7)
+
+    def row(self, slot_id, staff_id, start, end, hours=(time(9, 0), time(18, 0))):
+        return (slot_id, staff_id, start, end, *hours)
+
+    def test_adjacent_slots_merge_into_one_interval(self):
+        index = SlotIndex(self.DAY, [
+            self.row(2, 1, time(11, 0), time(12, 0)),
+            self.row(1, 1, time(10, 0), time(11, 0)),
+            self.row(3, 1, time(13, 0), time(14, 0)),
+        ])
+
+        self.assertEqual(index.find(time(10, 30), 60), (1, [1, 2]))
+        # 12:00-13:00 is not free, so 90 minutes from 11:30 does not fit
+        self.assertIsNone(index.find(time(11, 30), 90))
+        self.assertEqual(index.find(time(13, 0), 60), (1, [3]))
+
+    def test_slots_are_clipped_to_working_hours(self):
+        index = SlotIndex(self.DAY, [
+            self.row(1, 1, time(8, 0), time(10, 0)),
+            self.row(2, 1, time(17, 0), time(19, 0), hours=(time(9, 0), time(18, 0))),
+            self.row(3, 2, time(7, 0), time(8, 0), hours=(time(9, 0), time(18, 0))),
+        ])
+
+        self.assertIsNone(index.find(time(8, 0), 60))
+        self.assertEqual(index.find(time(9, 0), 60), (1, [1]))
+        self.assertIsNone(index.find(time(17, 30), 60))
+        # Staff 2 has no slot inside their hours at all
+        self.assertEqual(set(index._intervals), {1})
+
+    def test_find_takes_the_first_staff_that_fits(self):
+        index = SlotIndex(self.DAY, [
+            self.row(1, 2, time(10, 0), time(12, 0)),
+            self.row(2, 1, time(10, 0), time(11, 0)),
+        ])
+
+        self.assertEqual(index.find(time(10, 0), 60), (1, [2]))
+        self.assertEqual(index.find(time(10, 0), 120), (2, [1]))
+        self.assertIsNone(index.find(time(9, 0), 30))
+        self.assertFalse(SlotIndex(self.DAY, []))
+
+
+class SlotIndexCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 1, 7)
+        self.staff = make_staff("staff@example.com")
+        self.slot = AvailableSlot.objects.create(
+            staff=self.staff, date=self.day, start_time=time(10, 0), end_time=time(11, 0),
+        )
+
+    def test_index_is_cached_until_the_day_changes(self):
+        SlotIndex.for_date(self.day)
+        with self.assertNumQueries(0):
+            index = SlotIndex.for_date(self.day, exclude={self.slot.pk})
+        self.assertIsNone(index.find(time(10, 0), 60))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.slot.is_available = False
+            self.slot.save()
+
+        self.assertIsNone(cache.get(slot_index_key(self.day)))
+        self.assertIsNone(SlotIndex.for_date(self.day).find(time(10, 0), 60))
+
+
+class FreeRunsTest(SimpleTestCase):
+
+    def test_free_runs_mark_starts_of_long_enough_runs(self):
+        # Runs of bits 1-3 and 5-8
+        bits = 0b0111101110
+        self.assertEqual(_free_runs(bits, 1), bits)
+        self.assertEqual(_free_runs(bits, 3), 0b0001100010)
+        self.assertEqual(_free_runs(bits, 4), 0b0000100000)
+        self.assertEqual(_free_runs(bits, 5), 0)
+
+    def test_free_start_times_over_staff_bitmaps(self):
+        # 5-minute bits: staff 1 free 10:00-10:30, staff 2 free 10:30-11:30
+        def span(start, end):
+            lo, hi = start // 5, end // 5
+            return ((1 << (hi - lo)) - 1) << lo
+
+        bitmaps = {1: span(600, 630), 2: span(630, 690)}
+
+        self.assertEqual(
+            free_start_times(bitmaps, 30),
+            [time(10, 0), time(10, 30), time(10, 45), time(11, 0)],
+        )
+        # No single staff member is free for 90 minutes
+        self.assertEqual(free_start_times(bitmaps, 90), [])
+        self.assertEqual(free_start_times(bitmaps, 60, every=30), [time(10, 30)])
+
+
+class AvailabilityCacheTest(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.day = timezone.localdate() + timedelta(days=1)
+        self.staff = make_staff("staff@example.com")
+        AvailableSlot.objects.create(
+            staff=self.staff, date=self.day, start_time=time(9, 0), end_time=time(12, 0),
+        )
+
+    def free_minutes(self):
+        bits = get_day_bitmaps([self.day])[self.day].get(self.staff.pk, 0)
+        return bin(bits).count('1') * 5
+
+    def test_editing_staff_hours_drops_cached_days(self):
+        self.assertEqual(self.free_minutes(), 180)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.working_hours_start = time(10, 0)
+            self.staff.save()
+
+        self.assertEqual(self.free_minutes(), 120)
+
+    def test_staff_going_unavailable_drops_cached_days(self):
+        self.assertEqual(self.free_minutes(), 180)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.staff.is_available = False
+            self.staff.save()
+
+        self.assertEqual(self.free_minutes(), 0)
+
+    def test_unrelated_staff_edits_keep_the_cache(self):
+        get_day_bitmaps([self.day])
+
+        with self.assertNumQueries(1):
+            self.staff.experience_years = 5
+            self.staff.save()
+
+
+class ServiceCatalogTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.haircut = Service.objects.create(name="Haircut", is_active=True)
+        cls.nails = Service.objects.create(name="Nails", is_active=True)
+        cls.basic = ServiceType.objects.create(service=cls.haircut, name="Basic", price=500, duration_minutes=30)
+        cls.retired = ServiceType.objects.create(service=cls.haircut, name="Retired", price=500, is_active=False)
+        cls.gel = ServiceType.objects.create(service=cls.nails, name="Gel", price=700)
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+
+    def test_selected_types_and_duration(self):
+        current = get_catalog()
+        picked = current.selected_types({
+            f'service_type_{self.haircut.pk}': str(self.basic.pk),
+            f'service_type_{self.nails.pk}': str(self.gel.pk),
+            f'service_type_{self.nails.pk + 1}': '',
+            'phone': '0123456789',
+        })
+
+        self.assertEqual(picked, [self.basic, self.gel])
+        self.assertEqual(current.duration(picked), 30 + 60)
+        self.assertEqual(current.duration([]), 60)
+
+    def test_bad_selections_are_refused(self):
+        current = get_catalog()
+        for data in (
+            {f'service_type_{self.haircut.pk}': '999999'},              # unknown type
+            {f'service_type_{self.haircut.pk}': str(self.retired.pk)},  # inactive type
+            {f'service_type_{self.haircut.pk}': str(self.gel.pk)},      # another service's type
+            {f'service_type_{self.haircut.pk}': 'basic'},
+            {'service_type_x': str(self.basic.pk)},
+        ):
+            with self.assertRaises(ValueError, msg=data):
+                current.selected_types(data)
+
+    def test_saving_or_deleting_services_invalidates_the_catalog(self):
+        first = get_catalog()
+        with self.assertNumQueries(0):
+            self.assertIs(get_catalog(), first)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.basic.name = "Classic"
+            self.basic.save()
+        renamed = get_catalog()
+        self.assertGreater(renamed.version, first.version)
+        self.assertEqual(renamed.types[self.basic.pk].name, "Classic")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.gel.delete()
+        self.assertNotIn(self.gel.pk, get_catalog().types)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.nails.is_active = False
+            self.nails.save()
+        self.assertEqual([service.pk for service in get_catalog().services], [self.haircut.pk])
+
+
+class GenerateSlotsTest(TestCase):
+
+    def setUp(self):
+        self.first = make_staff("first@example.com")
+        self.start = date(2030, 1, 7)
+
+    def test_fills_only_missing_days(self):
+        # 09:00-18:00 in hours: 9 slots a day
+        self.assertEqual(generate_slots(self.start, self.start + timedelta(days=1), batch_size=4), 18)
+
+        AvailableSlot.objects.filter(staff=self.first, date=self.start, start_time=time(9, 0)).delete()
+        second = make_staff("second@example.com")
+
+        with self.assertNumQueries(6):
+            # Staff, filled days, then the 36 new slots in batches of 10
+            created = generate_slots(self.start, self.start + timedelta(days=2), batch_size=10)
+
+        # The first staff's two filled days are left alone, gap included
+        self.assertEqual(created, 9 + 27)
+        self.assertEqual(AvailableSlot.objects.filter(staff=self.first).count(), 17 + 9)
+        self.assertEqual(AvailableSlot.objects.filter(staff=second).count(), 27)
+
+
+class ReserveSlotTest(TestCase):
+    """
+    The contended path of reserve_slot, on any backend: a stale slot index
+    offers slots another booking has already taken.
+    """
+
+    def setUp(self):
+        cache.clear()
+        self.day = date(2030, 1, 7)
+        self.slots = [
+            AvailableSlot.objects.create(
+                staff=make_staff(f"staff{i}@example.com"),
+                date=self.day,
+                start_time=time(10, 0),
+                end_time=time(11, 0),
+            )
+            for i in range(2)
+        ]
+
+    def book(self):
+        return Appointment.objects.create(
+            name="Customer", email="customer@example.com",
+            appointment_date=self.day, appointment_time=time(10, 0),
+        )
+
+    def take(self, slot):
+        # Taken behind the cached index's back, as by a concurrent booking
+        AvailableSlot.objects.filter(pk=slot.pk).update(is_available=False)
+
+    def test_retries_on_the_next_free_slot(self):
+        SlotIndex.for_date(self.day)
+        self.take(self.slots[0])
+        appointment = self.book()
+
+        self.assertTrue(reserve_slot(appointment, 60))
+
+        appointment.refresh_from_db()
+        self.assertEqual((appointment.status, appointment.staff_id), ('confirmed', self.slots[1].staff_id))
+
+    def test_gives_up_when_every_slot_is_contended(self):
+        SlotIndex.for_date(self.day)
+        for slot in self.slots:
+            self.take(slot)
+        appointment = self.book()
+
+        self.assertFalse(reserve_slot(appointment, 60))
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'pending')
+
+    def test_a_slot_is_never_sold_twice(self):
+        SlotIndex.for_date(self.day)
+        stale = cache.get(slot_index_key(self.day))
+
+        results = []
+        for _ in range(3):
+            # Every booking plans on the index from before the first one
+            cache.set(slot_index_key(self.day), stale)
+            results.append(reserve_slot(self.book(), 60))
+
+        self.assertEqual(results, [True, True, False])
+        staff_ids = list(Appointment.objects.filter(status='confirmed').values_list('staff_id', flat=True))
+        self.assertEqual(sorted(staff_ids), sorted(slot.staff_id for slot in self.slots))
+
+
+@skipUnlessDBFeature('has_select_for_update_skip_locked')
+class ConcurrentBookingLoadTest(TransactionTestCase):
+    """
+    Many workers book the same time at once; no slot may be sold twice.
+    """
+
+    WORKERS = 16
+    STAFF = 3
+
+    def setUp(self):
+        self.day = date(2030, 1, 7)
+        for i in range(self.STAFF):
+            staff = make_staff(f"staff{i}@example.com")
+            AvailableSlot.objects.create(
+                staff=staff,
+                date=self.day,
+                start_time=time(10, 0),
+                end_time=time(11, 0),
+            )
+
+        service = Service.objects.create(name="Haircut")
+        service_type = ServiceType.objects.create(
+            service=service,
+            name="Basic",
+            price=500,
+            duration_minutes=60,
+        )
+
+        self.appointments = []
+        for i in range(self.WORKERS):
+            appointment = Appointment.objects.create(
+                name=f"Customer {i}",
+                email=f"customer{i}@example.com",
+                appointment_date=self.day,
+                appointment_time=time(10, 0),
+            )
+            appointment.services.add(service_type)
+            self.appointments.append(appointment)
+
+    def test_no_double_booking(self):
+        barrier = threading.Barrier(self.WORKERS)
+        errors = []
+
+        def book(appointment):
+            try:
+                barrier.wait()
+                reserve_slot(appointment, 60)
+            except Exception as exc:
+                errors.append(exc)
+            finally:
+                connection.close()
+
+        threads = [
+            threading.Thread(target=book, args=(appointment,))
+            for appointment in self.appointments
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(errors, [])
+
+        confirmed = Appointment.objects.filter(status='confirmed')
+        staff_ids = list(confirmed.values_list('staff_id', flat=True))
+
+        self.assertEqual(len(staff_ids), len(set(staff_ids)))
+        self.assertLessEqual(len(staff_ids), self.STAFF)
+        self.assertEqual(
+            AvailableSlot.objects.filter(is_available=False).count(),
+            len(staff_ids),
+        )
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise ConnectionError("SMTP unavailable")
+
+
+@override_settings(EMAIL_BACKEND='django.core.mail.backends.locmem.EmailBackend')
+class MailQueueTest(TestCase):
+
+    def test_drain_sends_queued_mail(self):
+        queue_mail("Hello", "Body", ["a@example.com", "b@example.com"])
+
+        sent = drain_outbox(batch_size=1, workers=1)
+
+        self.assertEqual(sent, 2)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertEqual(
+            OutboundEmail.objects.filter(status=OutboundEmail.Status.SENT).count(),
+            2,
+        )
+
+    @override_settings(EMAIL_BACKEND='booking.tests.FailingEmailBackend')
+    def test_failed_delivery_is_retried_later(self):
+        queue_mail("Hello", "Body", ["a@example.com"])
+
+        self.assertEqual(drain_outbox(workers=1), 0)
+
+        email = OutboundEmail.objects.get()
+        self.assertEqual(email.status, OutboundEmail.Status.PENDING)
+        self.assertEqual(email.attempts, 1)
+        self.assertIn("SMTP unavailable", email.last_error)
+
+        # Not due again until the backoff has passed
+        self.assertEqual(drain_outbox(workers=1), 0)
+        self.assertEqual(OutboundEmail.objects.get().attempts, 1)
+
+
+class PerformanceCheckTest(SimpleTestCase):
+
+    def warning_ids(self, **overrides):
+        values = {
+            'DEBUG': False,
+            'DJANGO_ENV': 'prod',
+            'DATABASES': {'default': {
+                'ENGINE': 'django.db.backends.mysql',
+                'CONN_MAX_AGE': 300,
+                'CONN_HEALTH_CHECKS': True,
+            }},
+            'TEMPLATES': [],
+            'CACHES': {'default': {'BACKEND': 'django.core.cache.backends.redis.RedisCache'}},
+            **overrides,
+        }
+        return {warning.id for warning in performance_warnings(SimpleNamespace(**values))}
+
+    def test_prod_profile_is_clean(self):
+        self.assertEqual(self.warning_ids(), set())
+
+    def test_prod_without_persistent_connections_warns(self):
+        databases = {'default': {'ENGINE': 'django.db.backends.mysql', 'CONN_MAX_AGE': 0}}
+        self.assertEqual(self.warning_ids(DATABASES=databases), {'booking.W002'})
+
+    def test_debug_in_prod_warns(self):
+        self.assertEqual(self.warning_ids(DEBUG=True), {'booking.W001'})
+
+    def test_dev_only_checks_templates(self):
+        self.assertEqual(self.warning_ids(DJANGO_ENV='dev', DEBUG=True, CACHES={
+            'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        }), set())
+
+    def test_registered_check_reads_the_active_settings(self):
+        self.assertIsInstance(check_performance_settings(), list)
+
+
+class AdminChangelistQueryTest(QueryBudgetMixin, TestCase):
+    """
+    Changelist pages cost the same number of queries however many rows
+    they show.
+    """
+
+    # changelist url name -> query budget for one page
+    BUDGETS = {
+        'admin:booking_availableslot_changelist': 4,
+        'admin:booking_staff_changelist': 6,
+        'admin:booking_servicetype_changelist': 6,
+        'admin:booking_appointment_changelist': 5,
+        'admin:booking_inventoryitem_changelist': 6,
+    }
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret",
+        )
+        cls.category = InventoryCategory.objects.create(name="Hair", slug="hair")
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.rows = 0
+
+    def add_rows(self, count):
+        for _ in range(count):
+            self.rows += 1
+            i = self.rows
+            staff = make_staff(f"staff{i}@example.com")
+            service = Service.objects.create(name=f"Service {i}")
+            ServiceType.objects.create(service=service, name="Basic", price=500)
+            AvailableSlot.objects.create(
+                staff=staff, date=date(2030, 1, 7), start_time=time(9, 0), end_time=time(10, 0),
+            )
+            Appointment.objects.create(
+                staff=staff,
+                name=f"Customer {i}",
+                appointment_date=date(2030, 1, 7),
+                appointment_time=time(9, 0),
+            )
+            InventoryItem.objects.create(
+                name=f"Item {i}", category=self.category, quantity=5, unit_price=100,
+            )
+
+    def changelist_queries(self, url_name):
+        with self.assertMaxQueries(self.BUDGETS[url_name]) as recorder:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, 200)
+        return recorder.count
+
+    def test_query_count_does_not_grow_with_rows(self):
+        self.add_rows(2)
+        few = {name: self.changelist_queries(name) for name in self.BUDGETS}
+
+        self.add_rows(20)
+        many = {name: self.changelist_queries(name) for name in self.BUDGETS}
+
+        self.assertEqual(few, many)
+
+
+class AppointmentBulkActionTest(QueryBudgetMixin, TestCase):
+    """
+    Closing out a busy day is one request with a handful of queries.
+    """
+
+    DAY = date(2030, 1, 7)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret",
+        )
+        cls.staff = make_staff("staff@example.com")
+        cls.other_staff = make_staff("other@example.com")
+
+        # 200 one-hour bookings, each holding its own slot
+        AvailableSlot.objects.bulk_create([
+            AvailableSlot(
+                staff=cls.staff,
+                date=cls.DAY + timedelta(days=i // 8),
+                start_time=time(9 + i % 8, 0),
+                end_time=time(10 + i % 8, 0),
+                is_available=False,
+            )
+            for i in range(200)
+        ])
+        Appointment.objects.bulk_create([
+            Appointment(
+                staff=cls.staff,
+                name=f"Customer {i}",
+                email=f"customer{i}@example.com",
+                appointment_date=cls.DAY + timedelta(days=i // 8),
+                appointment_time=time(9 + i % 8, 0),
+                status='confirmed',
+            )
+            for i in range(200)
+        ])
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+        self.ids = list(Appointment.objects.values_list('id', flat=True))
+
+    def run_action(self, action, **data):
+        return self.client.post(
+            reverse('admin:booking_appointment_changelist'),
+            {'action': action, '_selected_action': self.ids, **data},
+        )
+
+    def test_cancel_frees_slots_and_queues_emails(self):
+        # session, user, count, lock, read, 2 updates, email inserts (1 on MySQL, 3 on SQLite)
+        with self.assertMaxQueries(12):
+            response = self.run_action('cancel_selected', reason="Salon closed")
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(Appointment.objects.filter(status='cancelled', cancelled_reason="Salon closed").count(), 200)
+        self.assertFalse(AvailableSlot.objects.filter(is_available=False).exists())
+        self.assertEqual(OutboundEmail.objects.count(), 200)
+
+    def test_reassign_moves_slots_to_the_new_staff(self):
+        # The new staff member is free for one of the 200 bookings only
+        AvailableSlot.objects.create(
+            staff=self.other_staff, date=self.DAY, start_time=time(9, 0), end_time=time(10, 0),
+        )
+
+        response = self.run_action('reassign_selected', staff=self.other_staff.pk)
+
+        moved = Appointment.objects.get(staff=self.other_staff)
+        self.assertEqual((moved.appointment_date, moved.appointment_time), (self.DAY, time(9, 0)))
+        self.assertEqual(Appointment.objects.filter(staff=self.staff).count(), 199)
+        self.assertTrue(AvailableSlot.objects.get(staff=self.staff, date=self.DAY, start_time=time(9, 0)).is_available)
+        self.assertEqual(AvailableSlot.objects.filter(staff=self.staff, is_available=False).count(), 199)
+        self.assertFalse(AvailableSlot.objects.get(staff=self.other_staff).is_available)
+        self.assertIn("199 appointment(s) skipped", [str(m) for m in get_messages(response.wsgi_request)][1])
+
+    def test_reassign_needs_the_whole_appointment_free(self):
+        Appointment.objects.exclude(appointment_date=self.DAY, appointment_time=time(9, 0)).delete()
+        appointment = Appointment.objects.get()
+        appointment.services.add(ServiceType.objects.create(
+            service=Service.objects.create(name="Colour"), name="Full colour", price=90, duration_minutes=90,
+        ))
+        AvailableSlot.objects.create(
+            staff=self.other_staff, date=self.DAY, start_time=time(9, 0), end_time=time(10, 0),
+        )
+
+        self.assertEqual(reassign_appointments(Appointment.objects.all(), self.other_staff), (0, [appointment.pk]))
+
+        AvailableSlot.objects.create(
+            staff=self.other_staff, date=self.DAY, start_time=time(10, 0), end_time=time(11, 0),
+        )
+        self.assertEqual(reassign_appointments(Appointment.objects.all(), self.other_staff), (1, []))
+        self.assertFalse(AvailableSlot.objects.filter(staff=self.other_staff, is_available=True).exists())
+
+    def test_confirm_holds_free_slots_only(self):
+        Appointment.objects.all().delete()
+        AvailableSlot.objects.filter(date=self.DAY, start_time=time(9, 0)).update(is_available=True)
+        pending = [
+            Appointment.objects.create(
+                staff=staff, name=name, email="pending@example.com",
+                appointment_date=self.DAY, appointment_time=at,
+            )
+            for staff, name, at in (
+                (self.staff, "Free slot", time(9, 0)),
+                (self.staff, "Slot already held", time(10, 0)),
+                (None, "No staff", time(9, 0)),
+                (self.staff, "Same slot as the first", time(9, 0)),
+            )
+        ]
+
+        self.assertEqual(
+            confirm_appointments(Appointment.objects.all()),
+            (1, [appointment.pk for appointment in pending[1:]]),
+        )
+        self.assertEqual(list(Appointment.objects.filter(status='confirmed')), pending[:1])
+        self.assertFalse(AvailableSlot.objects.get(date=self.DAY, start_time=time(9, 0)).is_available)
+        self.assertEqual(OutboundEmail.objects.count(), 1)
+
+    def test_reassigned_pending_appointment_can_be_confirmed(self):
+        AvailableSlot.objects.create(
+            staff=self.other_staff, date=self.DAY, start_time=time(8, 0), end_time=time(9, 0),
+        )
+        pending = Appointment.objects.create(
+            staff=self.staff, name="Early bird", email="early@example.com",
+            appointment_date=self.DAY, appointment_time=time(8, 0),
+        )
+        selected = Appointment.objects.filter(pk=pending.pk)
+
+        # Pending appointments hold no slot, so moving one leaves the slots alone
+        self.assertEqual(reassign_appointments(selected, self.other_staff), (1, []))
+        self.assertTrue(AvailableSlot.objects.get(staff=self.other_staff).is_available)
+
+        self.assertEqual(confirm_appointments(selected), (1, []))
+        self.assertFalse(AvailableSlot.objects.get(staff=self.other_staff).is_available)
+
+    def test_cancelling_a_pending_appointment_keeps_held_slots(self):
+        # Same time as a confirmed booking, whose slot it must not free
+        pending = Appointment.objects.create(
+            staff=self.staff, name="Waiting", email="waiting@example.com",
+            appointment_date=self.DAY, appointment_time=time(9, 0),
+        )
+
+        self.assertEqual(cancel_appointments(Appointment.objects.filter(pk=pending.pk)), 1)
+
+        self.assertFalse(AvailableSlot.objects.get(staff=self.staff, date=self.DAY, start_time=time(9, 0)).is_available)
+
+    def test_complete_skips_cancelled(self):
+        Appointment.objects.filter(appointment_time=time(9, 0)).update(status='cancelled')
+
+        self.run_action('complete_selected')
+
+        self.assertEqual(Appointment.objects.filter(status='completed').count(), 175)
+        self.assertEqual(Appointment.objects.filter(status='cancelled').count(), 25)
+
+
+class InventoryConsumptionTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = InventoryCategory.objects.create(name="Hair", slug="hair")
+        cls.shampoo = InventoryItem.objects.create(
+            name="Shampoo", category=category, quantity=10, min_stock=5, unit_price=100,
+        )
+        cls.dye = InventoryItem.objects.create(
+            name="Dye", category=category, quantity=3, min_stock=1, unit_price=300,
+        )
+        service = Service.objects.create(name="Hair")
+        cls.wash = ServiceType.objects.create(service=service, name="Wash", price=200)
+        cls.colour = ServiceType.objects.create(service=service, name="Colour", price=900)
+        ServiceTypeMaterial.objects.create(service_type=cls.wash, item=cls.shampoo, quantity=1)
+        ServiceTypeMaterial.objects.create(service_type=cls.colour, item=cls.shampoo, quantity=1)
+        ServiceTypeMaterial.objects.create(service_type=cls.colour, item=cls.dye, quantity=2)
+
+    def book(self, *service_types):
+        appointment = Appointment.objects.create(
+            appointment_date=date(2030, 1, 7), appointment_time=time(10, 0), status='confirmed',
+        )
+        appointment.services.set(service_types)
+        return appointment
+
+    def test_completing_consumes_materials_once(self):
+        appointment = self.book(self.wash, self.colour)
+
+        appointment.status = 'completed'
+        appointment.save()
+        appointment.save()
+
+        self.shampoo.refresh_from_db()
+        self.dye.refresh_from_db()
+        self.assertEqual(self.shampoo.quantity, 8)
+        self.assertEqual(self.dye.quantity, 1)
+        self.assertEqual(self.dye.status, InventoryItem.StockStatus.LOW_STOCK)
+
+    def test_saving_a_stale_copy_does_not_consume_twice(self):
+        appointment = self.book(self.wash)
+        stale = Appointment.objects.get(pk=appointment.pk)
+
+        appointment.status = 'completed'
+        appointment.save()
+        self.assertIsNotNone(appointment.inventory_consumed_at)
+
+        stale.notes = "Left a tip"
+        stale.save()
+
+        # Reopened and completed again: the materials were already taken
+        appointment.refresh_from_db()
+        appointment.status = 'confirmed'
+        appointment.save()
+        appointment.status = 'completed'
+        appointment.save()
+
+        self.shampoo.refresh_from_db()
+        self.assertEqual(self.shampoo.quantity, 9)
+        self.assertEqual(appointment.notes, "Left a tip")
+
+    def test_appointments_clone_and_resave_as_usual(self):
+        appointment = self.book(self.wash)
+
+        clone = Appointment.objects.get(pk=appointment.pk)
+        clone.pk = None
+        clone.save()
+
+        appointment.delete()
+        appointment.save()
+
+        self.assertEqual(Appointment.objects.count(), 2)
+
+    def test_bulk_consumption_floors_at_zero(self):
+        appointments = [self.book(self.colour) for _ in range(3)]
+        Appointment.objects.update(status='completed')
+
+        with self.assertNumQueries(9):
+            usage = consume_inventory([appointment.pk for appointment in appointments])
+
+        self.assertEqual(usage[self.dye.pk], 6)
+        self.dye.refresh_from_db()
+        self.assertEqual(self.dye.quantity, 0)
+        self.assertEqual(self.dye.status, InventoryItem.StockStatus.OUT_OF_STOCK)
+        self.assertEqual(consume_inventory([appointment.pk for appointment in appointments]), {})
+
+    def test_recompute_fixes_status_left_stale_by_update(self):
+        InventoryItem.objects.filter(pk=self.shampoo.pk).update(quantity=0)
+        InventoryItem.objects.filter(pk=self.dye.pk).update(min_stock=10)
+
+        with self.assertNumQueries(1):
+            recompute_stock_status()
+
+        statuses = dict(InventoryItem.objects.values_list('name', 'status'))
+        self.assertEqual(statuses, {
+            "Shampoo": InventoryItem.StockStatus.OUT_OF_STOCK,
+            "Dye": InventoryItem.StockStatus.LOW_STOCK,
+        })
+
+
+class InventoryCsvTest(TestCase):
+
+    CSV = (
+        "name,category,brand,quantity,min_stock,unit_price,description,is_active\n"
+        "Shampoo,Hair Care,Loreal,20,5,450.00,,true\n"
+        "Conditioner,Hair Care,Loreal,3,5,500.00,,true\n"
+        "Nail Polish,Nails,,0,2,150,,yes\n"
+        ",Nails,,1,1,1,,true\n"
+        "Toner,Skin,,abc,1,1,,true\n"
+    )
+
+    def test_import_creates_categories_and_items_in_chunks(self):
+        result = import_inventory_csv(self.CSV.splitlines(keepends=True), chunk_size=2)
+
+        self.assertEqual(result['imported'], 3)
+        self.assertEqual([line for line, _ in result['errors']], [5, 6])
+        self.assertEqual(
+            set(InventoryCategory.objects.values_list('slug', flat=True)),
+            {'hair-care', 'nails'},
+        )
+        statuses = dict(InventoryItem.objects.values_list('name', 'status'))
+        self.assertEqual(statuses['Conditioner'], InventoryItem.StockStatus.LOW_STOCK)
+        self.assertEqual(statuses['Nail Polish'], InventoryItem.StockStatus.OUT_OF_STOCK)
+
+    def test_errors_point_at_their_own_line(self):
+        lines = self.CSV.splitlines(keepends=True)
+        # Bad rows in the middle of a chunk, and a quoted field spanning two lines
+        lines[5:5] = ['Serum,Skin,,2,1,1,"two\n', 'lines",true\n']
+
+        result = import_inventory_csv(lines + ["Mask,Skin,,1,1,1,,true\n"])
+
+        self.assertEqual(result['imported'], 5)
+        self.assertEqual([line for line, _ in result['errors']], [5, 8])
+
+    def test_bad_numbers_are_row_errors(self):
+        result = import_inventory_csv([
+            "name,category,quantity,min_stock,unit_price\n",
+            "Huge price,Hair,1,1,1e20\n",
+            "Not a number,Hair,1,1,NaN\n",
+            "Infinite,Hair,1,1,Infinity\n",
+            "Fractions of a cent,Hair,1,1,1.005\n",
+            "Negative price,Hair,1,1,-5\n",
+            "Negative quantity,Hair,-3,1,1\n",
+            "Negative minimum,Hair,1,-1,1\n",
+            "Too many,Hair,99999999999,1,1\n",
+            "Fine,Hair,1,1,12345678.90\n",
+        ])
+
+        self.assertEqual(result['imported'], 1)
+        self.assertEqual([line for line, _ in result['errors']], list(range(2, 10)))
+        self.assertIn("quantity '-3' is negative", result['errors'][5][1])
+        self.assertEqual(InventoryItem.objects.get().name, "Fine")
+
+    def test_name_case_variants_keep_their_ledger_movement(self):
+        import_inventory_csv(["name,category,quantity\n", "Shampoo,Hair,4\n"])
+        import_inventory_csv(["name,category,quantity\n", "Shampoo,Hair,6\n", "shampoo,Hair,9\n"])
+
+        # Whether the collation makes "shampoo" the same item or a new one, the ledger accounts for it
+        self.assertEqual(
+            dict(stock_at(timezone.now()).values_list('name', 'stock')),
+            dict(InventoryItem.objects.values_list('name', 'quantity')),
+        )
+        self.assertEqual(InventoryItem.objects.filter(name__iexact="shampoo").order_by('-updated_at')[0].quantity, 9)
+
+    def test_category_spellings_share_one_category(self):
+        hair = InventoryCategory.objects.create(name="Hair Care")
+        nails = InventoryCategory.objects.create(name="Nails", slug="nail-bar")
+
+        result = import_inventory_csv([
+            "name,category,quantity,unit_price\n",
+            "Shampoo,Hair-Care,2,450\n",
+            "Shampoo,hair care,4,450\n",
+            "Polish,nails,1,150\n",
+            "Mystery,!!!,1,1\n",
+            "Serum,Skin,1,1\n",
+        ])
+
+        self.assertEqual(result['imported'], 3)
+        self.assertEqual([line for line, _ in result['errors']], [5])
+        self.assertEqual(InventoryCategory.objects.count(), 3)
+        self.assertEqual(InventoryItem.objects.get(name="Shampoo", category=hair).quantity, 4)
+        self.assertEqual(InventoryItem.objects.get(name="Polish").category, nails)
+
+    def test_import_updates_existing_items(self):
+        import_inventory_csv(self.CSV.splitlines(keepends=True))
+        import_inventory_csv([
+            "name,category,quantity,unit_price\n",
+            "Shampoo,Hair Care,2,460\n",
+        ])
+
+        shampoo = InventoryItem.objects.get(name="Shampoo")
+        self.assertEqual(InventoryItem.objects.count(), 3)
+        self.assertEqual((shampoo.quantity, shampoo.status), (2, InventoryItem.StockStatus.LOW_STOCK))
+
+    def test_export_round_trips(self):
+        import_inventory_csv(self.CSV.splitlines(keepends=True))
+        exported = list(export_inventory_csv())
+
+        InventoryItem.objects.all().delete()
+        result = import_inventory_csv(exported)
+
+        self.assertEqual(len(exported), 4)
+        self.assertEqual(result, {'imported': 3, 'errors': []})
+
+    def test_admin_import_and_export(self):
+        admin_user = User.objects.create_superuser(
+            username="admin", email="admin@example.com", password="secret",
+        )
+        self.client.force_login(admin_user)
+
+        upload = SimpleUploadedFile("items.csv", ("\ufeff" + self.CSV).encode("utf-8"))
+        self.client.post(reverse('admin:booking_inventoryitem_import'), {'csv_file': upload})
+        self.assertEqual(InventoryItem.objects.count(), 3)
+
+        response = self.client.get(reverse('admin:booking_inventoryitem_export'))
+        body = b"".join(response.streaming_content).decode()
+        self.assertTrue(body.startswith("name,category,"))
+        self.assertIn("Shampoo,Hair Care,Loreal,20,5,450.00,,True", body)
+
+    def test_category_slug_is_filled_in_on_save(self):
+        self.assertEqual(InventoryCategory.objects.create(name="Skin Care").slug, "skin-care")
+
+
+class StockLedgerTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = InventoryCategory.objects.create(name="Hair")
+        cls.shampoo = InventoryItem.objects.create(
+            name="Shampoo", category=category, quantity=10, min_stock=2, unit_price=100,
+        )
+        cls.dye = InventoryItem.objects.create(
+            name="Dye", category=category, quantity=3, min_stock=1, unit_price=300,
+        )
+        service = Service.objects.create(name="Hair")
+        cls.colour = ServiceType.objects.create(service=service, name="Colour", price=900)
+        ServiceTypeMaterial.objects.create(service_type=cls.colour, item=cls.shampoo, quantity=1)
+        ServiceTypeMaterial.objects.create(service_type=cls.colour, item=cls.dye, quantity=2)
+
+    def complete(self, count):
+        appointments = []
+        for _ in range(count):
+            appointment = Appointment.objects.create(
+                appointment_date=date(2030, 1, 7), appointment_time=time(10, 0), status='completed',
+            )
+            appointment.services.set([self.colour])
+            appointments.append(appointment)
+        consume_inventory([appointment.pk for appointment in appointments])
+
+    def stock(self, when):
+        return dict(stock_at(when).values_list('name', 'stock'))
+
+    def test_changes_are_recorded(self):
+        self.shampoo.quantity = 15
+        self.shampoo.save()
+        self.complete(2)
+
+        movements = list(
+            StockMovement.objects.filter(item=self.dye).order_by('id').values_list('reason', 'delta')
+        )
+        # Only 3 in stock: the second appointment got 1 of its 2
+        self.assertEqual(movements, [('initial', 3), ('consumption', -2), ('consumption', -1)])
+        self.assertEqual(
+            list(StockMovement.objects.filter(item=self.shampoo).values_list('reason', 'delta')),
+            [('initial', 10), ('restock', 5), ('consumption', -1), ('consumption', -1)],
+        )
+
+    def test_csv_import_is_recorded(self):
+        import_inventory_csv([
+            "name,category,quantity\n",
+            "Shampoo,Hair,4\n",
+            "Toner,Hair,7\n",
+        ])
+
+        imports = dict(
+            StockMovement.objects.filter(reason='import').values_list('item__name', 'delta')
+        )
+        self.assertEqual(imports, {"Shampoo": -6, "Toner": 7})
+
+    def test_stock_at_past_moments(self):
+        start = timezone.now()
+        self.complete(1)
+        after_first = timezone.now()
+        take_stock_snapshots()
+        self.complete(1)
+
+        self.assertEqual(self.stock(start), {"Shampoo": 10, "Dye": 3})
+        self.assertEqual(self.stock(after_first), {"Shampoo": 9, "Dye": 1})
+        self.assertEqual(self.stock(timezone.now()), {"Shampoo": 8, "Dye": 0})
+        self.assertEqual(stock_valuation(start), 10 * 100 + 3 * 300)
+
+    def test_current_snapshot_is_stamped_after_the_quantities_are_read(self):
+        self.complete(1)
+        before = timezone.now()
+
+        with CaptureQueriesContext(connection) as queries:
+            self.assertEqual(take_stock_snapshots(), 2)
+
+        snapshots = {snapshot.item.name: snapshot for snapshot in StockSnapshot.objects.select_related('item')}
+        self.assertEqual({name: s.quantity for name, s in snapshots.items()}, {"Shampoo": 9, "Dye": 1})
+        self.assertGreater(snapshots["Dye"].taken_at, StockMovement.objects.latest('created_at').created_at)
+        self.assertGreaterEqual(snapshots["Dye"].taken_at, before)
+        if connection.features.has_select_for_update:
+            self.assertTrue(any("FOR UPDATE" in query['sql'] for query in queries))
+
+        # Rebuilt from the snapshot, later movements count once
+        self.complete(1)
+        self.assertEqual(self.stock(timezone.now()), {"Shampoo": 8, "Dye": 0})
+
+    def test_back_dated_snapshot_matches_the_ledger(self):
+        self.complete(1)
+        moment = timezone.now()
+        self.complete(1)
+
+        self.assertEqual(take_stock_snapshots(moment), 2)
+        snapshots = dict(StockSnapshot.objects.values_list('item__name', 'quantity'))
+        self.assertEqual(snapshots, {"Shampoo": 9, "Dye": 1})
+        # A snapshot changes how stock is read, not what it reads
+        self.assertEqual(self.stock(timezone.now()), {"Shampoo": 8, "Dye": 0})
+
+    def test_consumption_report_ranks_items(self):
+        self.complete(2)
+        today = timezone.localdate()
+
+        report = consumption_report(today - timedelta(days=1), today)
+
+        self.assertEqual(
+            [(row['item__name'], row['used'], row['appointments'], row['rank']) for row in report],
+            [("Dye", 3, 2, 1), ("Shampoo", 2, 2, 2)],
+        )
+        self.assertEqual(report[0]['per_day'], 1.5)
+
+
+class InventoryForecastTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        category = InventoryCategory.objects.create(name="Hair")
+        cls.shampoo = InventoryItem.objects.create(
+            name="Shampoo", category=category, quantity=10, min_stock=2, unit_price=100,
+        )
+        cls.dye = InventoryItem.objects.create(
+            name="Dye", category=category, quantity=5, min_stock=1, unit_price=300,
+        )
+        cls.gel = InventoryItem.objects.create(
+            name="Gel", category=category, quantity=50, min_stock=5, unit_price=80,
+        )
+        service = Service.objects.create(name="Hair")
+        cls.colour = ServiceType.objects.create(service=service, name="Colour", price=900)
+        ServiceTypeMaterial.objects.create(service_type=cls.colour, item=cls.dye, quantity=2)
+
+    def book(self, days_ahead, status='confirmed'):
+        appointment = Appointment.objects.create(
+            appointment_date=timezone.localdate() + timedelta(days=days_ahead),
+            appointment_time=time(10, 0),
+            status=status,
+        )
+        appointment.services.set([self.colour])
+
+    def test_forecast_combines_bookings_and_history(self):
+        for days_ahead in (0, 3, 6):
+            self.book(days_ahead)
+        self.book(2, status='cancelled')
+        self.book(20)
+        # 56 shampoos over the last 28 days: 2 a day
+        StockMovement.objects.create(item=self.shampoo, delta=-56, reason='consumption')
+
+        with self.assertNumQueries(3):
+            forecast = forecast_inventory(days=7, history_days=28)
+
+        dye, shampoo, gel = (forecast['items'][item.pk] for item in (self.dye, self.shampoo, self.gel))
+        self.assertEqual((dye['booked'], dye['projected'], dye['reorder']), (6, 6, 2))
+        self.assertEqual((shampoo['projected'], shampoo['days_left'], shampoo['reorder']), (14, 5, 6))
+        self.assertEqual((gel['projected'], gel['days_left'], gel['reorder']), (0, None, 0))
+        # Dye runs out in 5 days, shampoo in 5 but short of more
+        self.assertEqual(forecast['reorder'], [self.shampoo.pk, self.dye.pk])
+
+
+class StatsCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(
+            username="customer", email="customer@example.com", password="secret",
+        )
+        service = Service.objects.create(name="Hair")
+        cls.cut = ServiceType.objects.create(service=service, name="Cut", price=500)
+        today = timezone.localdate()
+        for days, status in ((1, 'pending'), (2, 'confirmed'), (-3, 'completed'), (-1, 'cancelled')):
+            appointment = Appointment.objects.create(
+                customer=cls.customer, email=cls.customer.email,
+                appointment_date=today + timedelta(days=days), appointment_time=time(10, 0), status=status,
+            )
+            appointment.services.set([cls.cut])
+
+    def setUp(self):
+        cache.clear()
+
+    def test_customer_stats_in_one_cached_query(self):
+        with self.assertNumQueries(1):
+            stats = customer_appointment_stats(self.customer)
+        with self.assertNumQueries(0):
+            self.assertEqual(customer_appointment_stats(self.customer), stats)
+
+        self.assertEqual(stats, {
+            'total_appointments': 4,
+            'upcoming_count': 2,
+            'completed_count': 1,
+            'cancelled_count': 1,
+            'services_booked': 1,
+        })
+
+    def test_appointment_changes_invalidate_on_commit(self):
+        customer_appointment_stats(self.customer)
+        dashboard_stats()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.filter(status='pending').get().delete()
+
+        with self.assertNumQueries(1):
+            self.assertEqual(customer_appointment_stats(self.customer)['upcoming_count'], 1)
+        with self.assertNumQueries(3):
+            self.assertEqual(dashboard_stats()['pending_appointments'], 0)
+
+    def test_inventory_stats_follow_item_saves(self):
+        category = InventoryCategory.objects.create(name="Hair")
+        self.assertEqual(inventory_stats()['total_products'], 0)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            InventoryItem.objects.create(name="Gel", category=category, quantity=1, min_stock=5, unit_price=80)
+
+        self.assertEqual(inventory_stats(), {
+            'total_products': 1, 'in_stock': 0, 'low_stock': 1, 'out_of_stock': 0,
+        })
+
+
+class DailyStatsTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        service = Service.objects.create(name="Hair")
+        cls.cut = ServiceType.objects.create(service=service, name="Cut", price=500)
+        cls.colour = ServiceType.objects.create(service=service, name="Colour", price=900)
+        cls.day = date(2030, 1, 7)
+        for status, types in (
+            ('completed', [cls.cut, cls.colour]),
+            ('completed', [cls.colour]),
+            ('cancelled', [cls.cut]),
+            ('pending', [cls.cut]),
+        ):
+            appointment = Appointment.objects.create(
+                appointment_date=cls.day, appointment_time=time(10, 0), status=status,
+            )
+            appointment.services.set(types)
+
+    def test_backfill_rebuilds_the_rollup(self):
+        self.assertEqual(backfill_daily_stats(batch_size=1), 1)
+
+        stats = DailyStats.objects.get(date=self.day)
+        self.assertEqual(
+            (stats.total_appointments, stats.completed_count, stats.cancelled_count, stats.pending_count),
+            (4, 2, 1, 1),
+        )
+        self.assertEqual(stats.revenue, 2300)
+        self.assertEqual(stats.service_counts, {str(self.cut.pk): 2, str(self.colour.pk): 2})
+        self.assertFalse(stats.is_dirty)
+
+    def test_changes_mark_the_day_dirty(self):
+        backfill_daily_stats()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = Appointment.objects.get(status='pending')
+            appointment.status = 'completed'
+            appointment.save()
+
+        self.assertTrue(DailyStats.objects.get(date=self.day).is_dirty)
+        self.assertEqual(refresh_dirty_daily_stats(), 1)
+
+        stats = DailyStats.objects.get(date=self.day)
+        self.assertEqual((stats.completed_count, stats.revenue, stats.is_dirty), (3, 2800, False))
+
+    def test_period_report_reads_dirty_days_without_writing(self):
+        backfill_daily_stats()
+        DailyStats.objects.update(revenue=0, is_dirty=True)
+
+        report = period_report(self.day, self.day)
+
+        self.assertEqual(report['revenue'], 2300)
+        self.assertEqual((report['total_appointments'], report['completed_count']), (4, 2))
+        self.assertCountEqual(report['popular_services'], [str(self.cut), str(self.colour)])
+        # The GET path leaves the stored row for refresh_daily_stats
+        self.assertTrue(DailyStats.objects.get(date=self.day).is_dirty)
+
+    def test_period_report_sums_clean_rows(self):
+        backfill_daily_stats()
+
+        with self.assertNumQueries(4):
+            report = period_report(self.day - timedelta(days=1), self.day + timedelta(days=1))
+
+        self.assertEqual((report['revenue'], report['cancelled_count']), (2300, 1))
+
+
+class KeysetPageTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        # Several appointments share a date and a time, so the id breaks ties
+        for i in range(7):
+            Appointment.objects.create(
+                name=f"Customer {i}", email=f"customer{i}@example.com",
+                appointment_date=date(2030, 1, 7) + timedelta(days=i // 3),
+                appointment_time=time(10 + i % 2, 0),
+            )
+        cls.ordered = list(
+            Appointment.objects.order_by('appointment_date', 'appointment_time', 'id').values_list('id', flat=True)
+        )
+
+    def walk(self, **options):
+        seen, cursor = [], None
+        while True:
+            page, cursor = keyset_page(Appointment.objects.all(), cursor=cursor, size=3, **options)
+            seen.append([appointment.id for appointment in page])
+            if cursor is None:
+                return seen
+
+    def test_pages_cover_every_row_once(self):
+        pages = self.walk()
+
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertEqual(sum(pages, []), self.ordered)
+
+    def test_descending_pages(self):
+        self.assertEqual(sum(self.walk(descending=True), []), self.ordered[::-1])
+
+    def test_each_page_is_one_query(self):
+        _, cursor = keyset_page(Appointment.objects.all(), size=3)
+        with self.assertNumQueries(1):
+            keyset_page(Appointment.objects.all(), cursor=cursor, size=3)
+
+    def test_cursor_round_trip_and_bad_cursors(self):
+        appointment = Appointment.objects.get(pk=self.ordered[0])
+        self.assertEqual(
+            decode_cursor(encode_cursor(appointment)),
+            (appointment.appointment_date, appointment.appointment_time, appointment.pk),
+        )
+        for cursor in ("not-a-cursor", "MjAzMC0wMS0wNw=="):
+            with self.assertRaises(ValueError):
+                decode_cursor(cursor)
+
+    def test_size_is_clamped(self):
+        page, cursor = keyset_page(Appointment.objects.all(), size=0)
+        self.assertEqual((len(page), cursor is not None), (1, True))
+
+    def test_staff_list_view(self):
+        self.assertEqual(self.client.get(reverse('appointments_list')).status_code, 302)
+
+        staff = User.objects.create_user(
+            username="manager", email="manager@example.com", password="secret", is_staff=True,
+        )
+        self.client.force_login(staff)
+
+        first = self.client.get(reverse('appointments_list'))
+        self.assertEqual(len(first.context['appointments']), 7)
+        self.assertContains(first, "Customer 0")
+
+        data = self.client.get(reverse('appointments_list'), {'format': 'json'}).json()
+        self.assertEqual([row['id'] for row in data['results']], self.ordered)
+        self.assertIsNone(data['next_cursor'])
+
+        self.assertEqual(self.client.get(reverse('appointments_list'), {'cursor': 'bad'}).status_code, 404)
+
+
+class EstimatedCountPaginatorTest(TestCase):
+
+    class Paginator(EstimatedCountPaginator):
+        # Stands in for the table statistics, which SQLite does not keep
+        def __init__(self, object_list, per_page, estimated_rows):
+            super().__init__(object_list, per_page)
+            self.estimated_rows = estimated_rows
+
+        def estimate(self):
+            return self.estimated_rows
+
+    @classmethod
+    def setUpTestData(cls):
+        InventoryCategory.objects.bulk_create(
+            InventoryCategory(name=f"Category {i:02}", slug=f"category-{i:02}") for i in range(25)
+        )
+
+    def paginator(self, estimated_rows):
+        return self.Paginator(InventoryCategory.objects.all(), 10, estimated_rows)
+
+    def test_overestimate_is_corrected_on_the_last_page(self):
+        paginator = self.paginator(50000)
+        self.assertEqual(paginator.num_pages, 5000)
+
+        page = paginator.page(3)
+        self.assertEqual(len(page), 5)
+        self.assertEqual((paginator.count, paginator.num_pages), (25, 3))
+        self.assertFalse(page.has_next())
+
+    def test_pages_past_the_real_end_are_empty(self):
+        paginator = self.paginator(50000)
+
+        with self.assertRaises(EmptyPage):
+            paginator.page(40)
+        self.assertEqual(paginator.num_pages, 3)
+
+    def test_underestimate_is_counted_exactly(self):
+        # Exactly 10000 estimated rows, one page's worth, but 25 real ones
+        paginator = self.Paginator(InventoryCategory.objects.all(), 10000, 10000)
+        self.assertEqual(paginator.num_pages, 1)
+
+        page = paginator.page(1)
+        self.assertEqual(len(page), 25)
+        self.assertEqual(paginator.count, 25)
+
+    def test_middle_pages_keep_the_estimate(self):
+        paginator = self.paginator(50000)
+
+        with self.assertNumQueries(1):
+            page = paginator.page(2)
+        self.assertEqual(len(page), 10)
+        self.assertTrue(page.has_next())
+        self.assertEqual(paginator.count, 50000)
+
+    def test_small_tables_are_counted(self):
+        paginator = self.paginator(100)
+        self.assertEqual(paginator.count, 25)
+        self.assertEqual(len(paginator.page(3)), 5)
+
+
+class ServiceImageTest(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = self.settings(MEDIA_ROOT=media_root, MEDIA_URL='/media/')
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def upload(self, width, height=300, mode='RGBA'):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new(mode, (width, height), 'red').save(buffer, format='PNG')
+        return SimpleUploadedFile("cut.png", buffer.getvalue(), content_type="image/png")
+
+    def render(self, service):
+        template = Template('{% load service_images %}{% service_image service css_class="card-img" %}')
+        return template.render(Context({'service': service}))
+
+    def test_renditions_only_downscale(self):
+        service = Service.objects.create(name="Cut", image=self.upload(800))
+
+        renditions = build_renditions(service.image.name)
+
+        self.assertEqual(set(renditions['webp']), {'320', '640'})
+        self.assertEqual(set(renditions['jpeg']), {'320', '640'})
+        self.assertTrue(all(default_storage.exists(name) for name in renditions['jpeg'].values()))
+
+        small = Service.objects.create(name="Small", image=self.upload(200))
+        self.assertEqual(set(build_renditions(small.image.name)['webp']), {'200'})
+
+    def test_picture_markup(self):
+        service = Service.objects.create(name="Cut", image=self.upload(1600))
+
+        # Until the worker has run, the original upload is shown
+        self.assertIn('<img src="/media/services/', self.render(service))
+        self.assertNotIn('<picture>', self.render(service))
+        self.assertEqual(self.render(Service(name="No image")), "")
+
+        self.assertEqual(process_pending_renditions(), 1)
+        service.refresh_from_db()
+        html = self.render(service)
+
+        self.assertTrue(html.startswith('<picture><source type="image/webp" srcset="'))
+        # Widths sorted numerically, not as strings
+        webp = html.split('srcset="')[1].split('"')[0]
+        self.assertEqual([part.split()[-1] for part in webp.split(', ')], ['320w', '640w', '1280w'])
+        self.assertIn('class="card-img"', html)
+
+    def test_unreadable_images_are_not_retried_every_scan(self):
+        service = Service.objects.create(
+            name="Broken", image=SimpleUploadedFile("broken.png", b"not a png", content_type="image/png"),
+        )
+
+        with self.assertLogs('booking.images', 'WARNING'):
+            self.assertEqual(process_pending_renditions(), 0)
+        service.refresh_from_db()
+        self.assertIn('failed', service.image_renditions)
+        # The original upload stays in use
+        self.assertNotIn('<picture>', self.render(service))
+
+        with self.assertNoLogs('booking.images', 'WARNING'):
+            self.assertEqual(process_pending_renditions(), 0)
+
+        with self.assertLogs('booking.images', 'WARNING'):
+            process_pending_renditions(retry_failed=True)
+
+        # A new upload is picked up again
+        with self.captureOnCommitCallbacks(execute=True):
+            service.image = self.upload(400)
+            service.save()
+        self.assertEqual(process_pending_renditions(), 1)
+
+    def test_renditions_are_deleted_with_the_image(self):
+        service = Service.objects.create(name="Cut", image=self.upload(800))
+        process_pending_renditions()
+        service.refresh_from_db()
+        old = list(service.image_renditions['jpeg'].values())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            service.image = self.upload(700)
+            service.save()
+        self.assertFalse(any(default_storage.exists(name) for name in old))
+        self.assertEqual(service.image_renditions, {})
+
+        process_pending_renditions()
+        service.refresh_from_db()
+        current = list(service.image_renditions['webp'].values())
+
+        with self.captureOnCommitCallbacks(execute=True):
+            service.delete()
+        self.assertFalse(any(default_storage.exists(name) for name in current))
+
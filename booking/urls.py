@@ -3,4 +3,6 @@ from . import views
 
 urlpatterns = [
     path('appointments/', views.appointments_create, name='appointments'),
+    path('appointments/all/', views.appointments, name='appointments_list'),
+    path('api/availability/', views.availability, name='availability'),
 ]
@@ -1,14 +1,71 @@
-from datetime import datetime, timedelta
-from django.core.mail import send_mail
+from datetime import datetime
 from django.conf import settings
+from django.db import connection, transaction
 
 from .models import AvailableSlot, Appointment, Staff
+from .mail import queue_mail
+from .slots import SlotIndex, appointment_duration
 
 
-def process_appointment_slot(appointment):
+# How many times a booking re-plans after losing a slot to another request
+BOOKING_MAX_RETRIES = 3
+
+
+def reserve_slot(appointment, duration):
+    """
+    Confirm the appointment on the first free staff slot, race-free.
+
+    The chosen slot rows are locked with SELECT ... FOR UPDATE SKIP LOCKED
+    and only flipped while still available, inside one transaction. When
+    another booking holds or already took a slot, the contended slots are
+    left out and the fit is searched again, up to BOOKING_MAX_RETRIES times.
+    """
+    contended = set()
+
+    for attempt in range(BOOKING_MAX_RETRIES):
+        index = SlotIndex.for_date(appointment.appointment_date, exclude=contended)
+        fit = index.find(appointment.appointment_time, duration)
+        if not fit:
+            return False
+
+        staff_id, slot_ids = fit
+
+        with transaction.atomic():
+            locked = set(
+                AvailableSlot.objects
+                .select_for_update(skip_locked=True)
+                .filter(id__in=slot_ids, is_available=True)
+                .values_list('id', flat=True)
+            )
+            if len(locked) != len(slot_ids):
+                contended.update(set(slot_ids) - locked)
+                continue
+
+            # Guard the write as well, for backends without row locks
+            blocked = AvailableSlot.objects.filter(
+                id__in=slot_ids,
+                is_available=True
+            ).update(is_available=False)
+
+            if blocked != len(slot_ids):
+                transaction.set_rollback(True)
+                contended.update(slot_ids)
+                continue
+
+            appointment.status = 'confirmed'
+            appointment.staff_id = staff_id
+            appointment.save()
+
+        return True
+
+    return False
+
+
+def process_appointment_slot(appointment, duration=None):
     """
     Checks appointment conflicts, confirms slot if available,
-    updates appointment status, and sends email.
+    updates appointment status, and queues the email.
+    `duration` (minutes) is read from the booked services when not given.
     """
 
     # ---------------------------
@@ -26,33 +83,23 @@ def process_appointment_slot(appointment):
         appointment.save()
         return False
     # ---------------------------
-    # APPOINTMENT TIME RANGE
+    # APPOINTMENT DURATION
     # ---------------------------
-    appointment_datetime = datetime.combine(
-        appointment.appointment_date,
-        appointment.appointment_time
-    )
-
-    # Assume service duration = 60 minutes
-    appointment_end = appointment_datetime + timedelta(minutes=60)
+    if duration is None:
+        duration = appointment_duration(appointment)
 
     # ---------------------------
-    # FIND AVAILABLE SLOT ✅
+    # RESERVE SLOT ✅
     # ---------------------------
-    slot = AvailableSlot.objects.filter(
-        date=appointment.appointment_date,
-        start_time__lte=appointment.appointment_time,
-        end_time__gte=appointment_end.time(),
-        is_available=True
-    ).first()
+    confirmed = reserve_slot(appointment, duration)
 
-    if not slot:
+    if not confirmed:
         appointment.status = 'cancelled'
         appointment.cancelled_reason = "No staff available for selected time"
         appointment.cancelled_at = datetime.now()
         appointment.save()
 
-        send_mail(
+        queue_mail(
             subject="Appointment Not Available – Glamour Touch",
             message=(
                 f"Dear {appointment.name},\n\n"
@@ -65,38 +112,69 @@ def process_appointment_slot(appointment):
             ),
             from_email=settings.DEFAULT_FROM_EMAIL,
             recipient_list=[appointment.email],
-            fail_silently=False,
-
         )
 
         return False
 
     # ---------------------------
-    # CONFIRM APPOINTMENT ✅
+    # APPOINTMENT CONFIRMED ✅
     # ---------------------------
-    appointment.status = 'confirmed'
-    appointment.staff = slot.staff
-    appointment.save()
-
-    # Optional: Block slot (only if slots are per-hour)
-    slot.is_available = False
-    slot.save()
-
-    send_mail(
-        subject="Appointment Confirmed – Glamour Touch",
-        message=(
-            f"Dear {appointment.name},\n\n"
-            f"Your appointment has been CONFIRMED successfully.\n\n"
-            f"📅 Date: {appointment.appointment_date}\n"
-            f"⏰ Time: {appointment.appointment_time}\n\n"
-            f"Please arrive at the salon at least 30 minutes before "
-            f"your scheduled time.\n\n"
-            f"Thank you for choosing Glamour Touch.\n"
-            f"We look forward to serving you!"
-        ),
+    queue_mail(
+        *confirmed_message(appointment.name, appointment.appointment_date, appointment.appointment_time),
         from_email=settings.DEFAULT_FROM_EMAIL,
         recipient_list=[appointment.email],
-        fail_silently=False,
     )
 
     return True
+
+
+def confirmed_message(name, day, at):
+    """
+    (subject, message) of the confirmation email.
+    """
+    return (
+        "Appointment Confirmed – Glamour Touch",
+        f"Dear {name},\n\n"
+        f"Your appointment has been CONFIRMED successfully.\n\n"
+        f"📅 Date: {day}\n"
+        f"⏰ Time: {at}\n\n"
+        f"Please arrive at the salon at least 30 minutes before "
+        f"your scheduled time.\n\n"
+        f"Thank you for choosing Glamour Touch.\n"
+        f"We look forward to serving you!"
+    )
+
+
+def cancelled_message(name, day, at, reason=""):
+    """
+    (subject, message) of the email sent when the salon cancels.
+    """
+    return (
+        "Appointment Cancelled – Glamour Touch",
+        f"Dear {name},\n\n"
+        f"We are sorry, your appointment has been cancelled.\n\n"
+        f"📅 Date: {day}\n"
+        f"⏰ Time: {at}\n"
+        + (f"📝 Reason: {reason}\n" if reason else "")
+        + "\nPlease book another appointment at a time that suits you.\n\n"
+        "Glamour Touch"
+    )
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=1000):
+    """
+    INSERT ... ON CONFLICT/ON DUPLICATE KEY UPDATE for a list of instances.
+    MySQL picks the conflict target from the table's unique keys itself.
+    """
+    if connection.features.supports_update_conflicts_with_target:
+        conflict_target = unique_fields
+    else:
+        conflict_target = None
+
+    return model.objects.bulk_create(
+        objs,
+        batch_size=batch_size,
+        update_conflicts=True,
+        unique_fields=conflict_target,
+        update_fields=update_fields,
+    )
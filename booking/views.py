@@ -1,7 +1,18 @@
+from datetime import datetime, timedelta
 from django.shortcuts import render, redirect
+from django.http import Http404, JsonResponse
+from django.utils import timezone
+from django.views.decorators.http import require_GET
 from django.contrib.auth.decorators import login_required
 from django.contrib.admin.views.decorators import staff_member_required
-from .models import Service, Staff, Appointment
+from .models import Service, ServiceType, Staff, Appointment
+from .availability import get_day_bitmaps, free_start_times
+from .slots import services_duration
+from .pagination import keyset_page, appointment_as_dict
+
+
+# Longest range the availability API answers in one request
+AVAILABILITY_MAX_DAYS = 14
 
 
 # 🔹 PUBLIC: Appointment booking page
@@ -32,14 +43,78 @@ def appointments_create(request):
 
 
 
-# 🔹 PUBLIC: Appointment list page
+# 🔹 STAFF: Appointment list page (every customer's bookings)
+@staff_member_required
 def appointments(request):
-    all_appointments = Appointment.objects.all()
+    queryset = (
+        Appointment.objects
+        .select_related('staff__user')
+        .prefetch_related('services__service')
+    )
+
+    try:
+        page, next_cursor = keyset_page(queryset, cursor=request.GET.get('cursor'))
+    except ValueError:
+        raise Http404("Page not found")
+
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            "results": [appointment_as_dict(appt) for appt in page],
+            "next_cursor": next_cursor,
+        })
+
     return render(request, "appointments_list.html", {
-        "appointments": all_appointments
+        "appointments": page,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get('cursor'),
     })
 
 
+# 🔹 PUBLIC: Free start times for the selected service types (JSON)
+@require_GET
+def availability(request):
+    try:
+        start = datetime.strptime(
+            request.GET.get('date') or timezone.localdate().isoformat(),
+            "%Y-%m-%d"
+        ).date()
+        days = min(max(int(request.GET.get('days', 7)), 1), AVAILABILITY_MAX_DAYS)
+        type_ids = [
+            int(value)
+            for raw in request.GET.getlist('service_types')
+            for value in raw.split(',') if value
+        ]
+    except ValueError:
+        return JsonResponse({"error": "Invalid date, days or service_types"}, status=400)
+
+    service_types = ServiceType.objects.filter(id__in=type_ids, is_active=True)
+    duration = services_duration(service_types)
+
+    # Same-day bookings need two hours notice
+    now = timezone.localtime()
+    earliest = now + timedelta(hours=2)
+
+    dates = [start + timedelta(days=i) for i in range(days)]
+    bitmaps = get_day_bitmaps(dates)
+
+    result = []
+    for day in dates:
+        if day < now.date():
+            continue
+        times = free_start_times(bitmaps[day], duration)
+        if day == now.date():
+            times = [
+                t for t in times
+                if earliest.date() == day and t >= earliest.time()
+            ]
+        result.append({
+            "date": day.isoformat(),
+            "times": [t.strftime("%H:%M") for t in times],
+        })
+
+    return JsonResponse({"duration_minutes": duration, "days": result})
+
+
 # 🔹 ADMIN DASHBOARD (staff only)
 @login_required
 @staff_member_required
@@ -1,3 +1,213 @@
+from datetime import date, time, timedelta
+
+from django.core.cache import cache
+from django.db import connection
 from django.test import TestCase
+from django.urls import reverse
+
+from booking import catalog
+from booking.models import (
+    Appointment, AvailableSlot, InventoryCategory, InventoryItem, Service, ServiceType, User,
+)
+from salon_project.testing import QueryBudgetMixin
+
+
+class HotQueryPlanTest(TestCase):
+    """
+    The customer pages, admin filters and slot allocation must be
+    answered from an index, never a full table scan.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.day = date(2030, 1, 7)
+
+        customers = [
+            User.objects.create_user(
+                username=f"customer{i}",
+                email=f"customer{i}@example.com",
+                password="secret",
+            )
+            for i in range(50)
+        ]
+        cls.customer = customers[1]
+
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer=customers[i % 50],
+                name=f"Customer {i}",
+                email=customers[i % 50].email,
+                appointment_date=cls.day + timedelta(days=i % 30),
+                appointment_time=time(9 + i % 9, 0),
+                status=['pending', 'confirmed', 'completed', 'cancelled'][i % 4],
+            )
+            for i in range(500)
+        ])
+
+        AvailableSlot.objects.bulk_create([
+            AvailableSlot(
+                date=cls.day + timedelta(days=i // 9),
+                start_time=time(9 + i % 9, 0),
+                end_time=time(10 + i % 9, 0),
+            )
+            for i in range(500)
+        ])
+
+        category = InventoryCategory.objects.create(name="Hair", slug="hair")
+        InventoryItem.objects.bulk_create([
+            InventoryItem(
+                name=f"Item {i}",
+                category=category,
+                quantity=i % 20,
+                unit_price=100,
+                status=['in_stock', 'low_stock', 'out_of_stock'][i % 3],
+                is_active=i % 10 != 0,
+            )
+            for i in range(300)
+        ])
+
+    def assertUsesIndex(self, queryset, index_name):
+        plan = queryset.explain()
+        self.assertIn(index_name, plan, msg=f"Query does not use {index_name}:\n{plan}")
+
+    def test_customer_history_uses_customer_schedule_index(self):
+        self.assertUsesIndex(
+            Appointment.objects
+            .filter(customer=self.customer)
+            .order_by('-appointment_date', '-appointment_time'),
+            'appt_customer_schedule_idx',
+        )
+
+    def test_admin_day_status_filter_uses_index(self):
+        self.assertUsesIndex(
+            Appointment.objects.filter(appointment_date=self.day, status='pending'),
+            'appt_date_status_idx',
+        )
+
+    def test_dashboard_low_stock_uses_index(self):
+        self.assertUsesIndex(
+            InventoryItem.objects.filter(is_active=True, status='low_stock')[:5],
+            'item_active_status_idx',
+        )
+
+    def test_free_slot_lookup_uses_index(self):
+        self.assertUsesIndex(
+            AvailableSlot.objects
+            .filter(date=self.day, is_available=True)
+            .order_by('start_time'),
+            'slot_date_free_start_idx',
+        )
+
+
+class PageQueryBudgetTest(QueryBudgetMixin, TestCase):
+    """
+    Page query counts must not grow with the number of rows shown.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.customer = User.objects.create_user(
+            username="customer", email="customer@example.com", password="secret",
+        )
+        for i in range(10):
+            service = Service.objects.create(name=f"Service {i}", is_active=True)
+            ServiceType.objects.create(service=service, name="Basic", price=500)
+
+        Appointment.objects.bulk_create([
+            Appointment(
+                customer=cls.customer,
+                email=cls.customer.email,
+                appointment_date=date(2030, 1, 7) + timedelta(days=i),
+                appointment_time=time(10, 0),
+            )
+            for i in range(30)
+        ])
+
+    def test_services_page(self):
+        # Catalog load on a cold cache: services, types
+        with self.assertMaxQueries(2):
+            self.client.get(reverse('services'))
+
+    def test_booking_post(self):
+        staff = User.objects.create_user(
+            username="stylist", email="stylist@example.com", password="secret", role='staff',
+        ).staff_profile
+        AvailableSlot.objects.create(staff=staff, date=date(2030, 1, 7), start_time=time(10, 0), end_time=time(11, 0))
+        service_type = ServiceType.objects.first()
+        self.client.force_login(self.customer)
+        self.client.get(reverse('appointments'))
+
+        # Session, user, the appointment and its services (3), staff check,
+        # free slots, lock and hold inside a savepoint (4), the confirmed
+        # save and the queued email. The service types come from the catalog.
+        with self.assertMaxQueries(13) as recorder:
+            self.client.post(reverse('appointments'), {
+                'phone': '0123456789',
+                f'service_type_{service_type.service_id}': str(service_type.pk),
+                'appointment_date': '2030-01-07',
+                'appointment_time': '10:00',
+            })
+
+        service_types = f"FROM {connection.ops.quote_name(ServiceType._meta.db_table)}"
+        self.assertFalse([sql for sql in recorder.statements if service_types in sql])
+        self.assertEqual(Appointment.objects.get(status='confirmed').services.get(), service_type)
+
+    def test_appointment_history(self):
+        self.client.force_login(self.customer)
+
+        # Session, user, one page of appointments, their services
+        with self.assertMaxQueries(4):
+            self.client.get(reverse('appointment_history'))
+
+
+class CatalogPageCacheTest(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        service = Service.objects.create(name="Haircut", is_active=True)
+        ServiceType.objects.create(service=service, name="Basic", price=500)
+        cls.customer = User.objects.create_user(
+            username="customer", email="customer@example.com", password="secret",
+        )
+
+    def setUp(self):
+        cache.clear()
+        catalog._local.clear()
+        catalog.release_token.cache_clear()
+        self.addCleanup(catalog.release_token.cache_clear)
+
+    def test_anonymous_revalidation_gets_a_304(self):
+        first = self.client.get(reverse('services'))
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(first.has_header('Last-Modified'))
+
+        with self.assertNumQueries(0):
+            again = self.client.get(reverse('services'), HTTP_IF_NONE_MATCH=first['ETag'])
+
+        self.assertEqual(again.status_code, 304)
+        self.assertEqual(again['ETag'], first['ETag'])
+
+    def test_only_anonymous_pages_are_cached(self):
+        self.client.force_login(self.customer)
+        response = self.client.get(reverse('services'))
+
+        self.assertFalse(response.has_header('ETag'))
+        self.assertEqual([key for key in catalog._local._data if key.startswith('page:')], [])
+
+        self.client.logout()
+        self.client.get(reverse('services'))
+        self.assertEqual(len([key for key in catalog._local._data if key.startswith('page:')]), 1)
+
+    def test_a_new_release_is_never_served_the_old_page(self):
+        with self.settings(RELEASE='r1'):
+            catalog.release_token.cache_clear()
+            old = self.client.get(reverse('services'))
+
+        with self.settings(RELEASE='r2'):
+            catalog.release_token.cache_clear()
+            response = self.client.get(reverse('services'), HTTP_IF_NONE_MATCH=old['ETag'])
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], old['ETag'])
+        self.assertIn('r2', response['ETag'])
 
-# Create your tests here.
@@ -1,23 +1,27 @@
 from django.shortcuts import render, redirect
-from django.http import HttpResponse
+from django.http import HttpResponse, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.contrib.auth import authenticate, login, logout
 from django.contrib import messages
-from booking.models import Appointment, Contact, Service, User,ServiceType
+from booking.models import Appointment, Contact, User
 from datetime import datetime, time, timedelta
 from booking.utils import process_appointment_slot
+from booking.stats import customer_appointment_stats, UPCOMING_STATUSES
+from booking.reports import period_report
+from booking.pagination import keyset_page, appointment_as_dict
+from booking.catalog import get_catalog, cached_catalog_page
 from django.http import Http404
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 
 
 # Home Page
+@cached_catalog_page
 def home(request):
-    services = Service.objects.filter(is_active=True).prefetch_related('types')
     context = {
         "title": "Welcome to Beauty Parlour",
         "description": "Book beauty services easily and quickly",
-        "services": services,
+        "services": get_catalog().services,
     }
     return render(request, "home.html", context)
 
@@ -38,11 +42,11 @@ def gallery(request):
 
 
 # Services Page
+@cached_catalog_page
 def services(request):
-    services = Service.objects.filter(is_active=True).prefetch_related('types')
     context = {
         "title": "Our Services",
-        "services": services,
+        "services": get_catalog().services,
     }
     return render(request, "services.html", context)
 
@@ -57,10 +61,10 @@ def appointments(request):
     # ----------------------------
     # DATA FOR TEMPLATE (GET)
     # ----------------------------
-    services = Service.objects.filter(is_active=True).prefetch_related('types')
+    catalog = get_catalog()
 
     context = {
-        'services': services,
+        'services': catalog.services,
     }
 
     # ----------------------------
@@ -82,28 +86,14 @@ def appointments(request):
         # ----------------------------
         # SERVICE TYPE VALIDATION
         # ----------------------------
-        selected_service_type_ids = []
-
-        for service in Service.objects.filter(is_active=True):
-            key = f"service_type_{service.id}"
-            service_type_id = request.POST.get(key)
-
-            if service_type_id:
-                selected_service_type_ids.append(service_type_id)
-
-
-        if not selected_service_type_ids:
-            messages.error(request, "Please select at least one service type.")
+        try:
+            service_types = catalog.selected_types(request.POST)
+        except ValueError as exc:
+            messages.error(request, str(exc))
             return redirect('appointments')
 
-
-        service_types = ServiceType.objects.filter(
-            id__in=selected_service_type_ids,
-            is_active=True
-        )
-
-        if service_types.count() != len(selected_service_type_ids):
-            messages.error(request, "Invalid service type selection.")
+        if not service_types:
+            messages.error(request, "Please select at least one service type.")
             return redirect('appointments')
 
         # ----------------------------
@@ -157,6 +147,7 @@ def appointments(request):
         # CREATE APPOINTMENT
         # ----------------------------
         appointment = Appointment.objects.create(
+            customer=user,
             name=user.get_full_name() or user.username,
             email=user.email,
             phone=phone,
@@ -169,7 +160,10 @@ def appointments(request):
         appointment.services.add(*service_types)
 
         # AUTO SLOT CHECK + EMAIL
-        slot_confirmed = process_appointment_slot(appointment)
+        slot_confirmed = process_appointment_slot(
+            appointment,
+            duration=catalog.duration(service_types)
+        )
 
         if slot_confirmed:
             messages.success(
@@ -236,15 +230,32 @@ def appointment_history(request):
     if request.user.role != 'customer':
         raise Http404("Page not found")
 
-    user_email = request.user.email
-    today = timezone.now().date()
+    queryset = (
+        Appointment.objects
+        .filter(customer=request.user)
+        .select_related('staff__user')
+        .prefetch_related('services__service')
+    )
+
+    try:
+        appointments, next_cursor = keyset_page(
+            queryset,
+            cursor=request.GET.get('cursor'),
+            descending=True
+        )
+    except ValueError:
+        raise Http404("Page not found")
 
-    appointments = Appointment.objects.filter(
-        email=user_email
-    ).order_by('-appointment_date', '-appointment_time')
+    if request.GET.get('format') == 'json':
+        return JsonResponse({
+            "results": [appointment_as_dict(appt) for appt in appointments],
+            "next_cursor": next_cursor,
+        })
 
     context = {
         "appointments": appointments,
+        "next_cursor": next_cursor,
+        "is_first_page": not request.GET.get('cursor'),
         "page_title": "Appointment History",
     }
 
@@ -260,31 +271,23 @@ def dashboard(request):
 
     today = timezone.now().date()
 
-    appointments = (
+    upcoming_appointments = (
         Appointment.objects
-        .filter(email=request.user.email)
+        .filter(
+            customer=request.user,
+            appointment_date__gte=today,
+            status__in=UPCOMING_STATUSES
+        )
         .select_related('staff')
         .prefetch_related('services', 'services__service')
     )
 
-    upcoming_appointments = appointments.filter(
-        appointment_date__gte=today,
-        status__in=['pending', 'confirmed']
-    )
-
     context = {
         "appointments": upcoming_appointments
             .order_by('appointment_date', 'appointment_time')[:5],
 
-        "total_appointments": appointments.count(),
-        "upcoming_count": upcoming_appointments.count(),
-        "completed_count": appointments.filter(status='completed').count(),
-        "cancelled_count": appointments.filter(status='cancelled').count(),
-
-        # unique services booked (Haircut, Makeup, etc.)
-        "services_booked": appointments.values_list(
-            'services__service__id', flat=True
-        ).distinct().count(),
+        # total / upcoming / completed / cancelled / services booked
+        **customer_appointment_stats(request.user),
     }
 
     return render(request, "dashboard.html", context)
@@ -489,11 +492,14 @@ def admin_customers(request):
 
 # Admin Reports
 def admin_reports(request):
+    today = timezone.localdate()
+    report = period_report(today.replace(day=1), today)
+
     context = {
         "title": "Admin - Reports & Analytics",
-        "monthly_revenue": 12500,
-        "total_appointments": 156,
-        "popular_services": ["Haircut", "Facial", "Manicure"],
+        "monthly_revenue": report["revenue"],
+        "total_appointments": report["total_appointments"],
+        "popular_services": report["popular_services"],
     }
     return render(request, "admin-reports.html", context)
 
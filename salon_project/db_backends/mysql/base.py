@@ -0,0 +1,15 @@
+"""
+django.db.backends.mysql, with the client library chosen on first use.
+
+Django imports a backend only when a connection is first needed, so
+commands and workers that never query MySQL do not pay for importing
+mysqlclient / PyMySQL.
+"""
+from django.conf import settings
+
+from salon_project.db_driver import install_mysql_driver
+
+install_mysql_driver(getattr(settings, 'DB_DRIVER', 'auto'))
+
+from django.db.backends.mysql.base import *  # noqa: E402,F401,F403
+from django.db.backends.mysql.base import DatabaseWrapper  # noqa: E402,F401
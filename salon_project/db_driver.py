@@ -0,0 +1,44 @@
+"""
+Which MySQL client library backs django.db.backends.mysql.
+
+Django imports the ``MySQLdb`` module. mysqlclient provides it as a C
+extension; PyMySQL can stand in for it but decodes every row in Python.
+DB_DRIVER picks one:
+
+    auto        mysqlclient if it is installed, else PyMySQL (default)
+    mysqlclient fail at startup if it is missing
+    pymysql     always PyMySQL
+"""
+import importlib
+
+
+DRIVERS = ('auto', 'mysqlclient', 'pymysql')
+
+# Name of the installed driver, once install_mysql_driver() has run
+installed = None
+
+
+def install_mysql_driver(preferred='auto'):
+    """
+    Make ``import MySQLdb`` work and return the name of the driver behind it.
+    """
+    global installed
+    if installed:
+        return installed
+
+    if preferred not in DRIVERS:
+        raise ValueError(f"Unknown DB_DRIVER {preferred!r}, expected one of {', '.join(DRIVERS)}")
+
+    if preferred in ('auto', 'mysqlclient'):
+        try:
+            importlib.import_module('MySQLdb._mysql')
+            installed = 'mysqlclient'
+            return installed
+        except ImportError as exc:
+            if preferred == 'mysqlclient':
+                raise ImportError(f"DB_DRIVER=mysqlclient but it cannot be imported: {exc}") from exc
+
+    import pymysql
+    pymysql.install_as_MySQLdb()
+    installed = 'pymysql'
+    return installed
@@ -0,0 +1,206 @@
+import logging
+import re
+import threading
+import time
+from collections import Counter, defaultdict, deque
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.db import connections
+from django.utils.functional import empty
+
+
+logger = logging.getLogger(__name__)
+
+# Statements slower than this are logged with the view that ran them
+SLOW_QUERY_MS = getattr(settings, 'QUERY_STATS_SLOW_MS', 100)
+
+# Requests remembered per view for the rolling stats
+ROLLING_WINDOW = getattr(settings, 'QUERY_STATS_WINDOW', 200)
+
+# Request header asking for Server-Timing (staff only) when the view did not load the user itself
+TIMING_HEADER = getattr(settings, 'QUERY_STATS_TIMING_HEADER', 'X-Server-Timing')
+
+# SQL kept per recorder for test failure messages; later statements are still counted
+MAX_STATEMENTS = 1000
+
+# IN (%s, %s, %s) and IN (%s) are the same query for duplicate detection
+IN_LIST = re.compile(r'IN \((?:%s, )*%s\)')
+
+
+def fingerprint(sql):
+    return IN_LIST.sub('IN (...)', sql)
+
+
+class QueryRecorder:
+    """
+    connection.execute_wrapper() callable that times every statement.
+    Works across all database aliases at once with record(). The first
+    `max_statements` statements are kept verbatim.
+    """
+
+    def __init__(self, max_statements=MAX_STATEMENTS):
+        self.max_statements = max_statements
+        self.count = 0
+        self.duration = 0.0
+        self.fingerprints = Counter()
+        self.slowest = (0.0, '')
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            self.fingerprints[fingerprint(sql)] += 1
+            if len(self.statements) < self.max_statements:
+                self.statements.append(sql)
+            if elapsed > self.slowest[0]:
+                self.slowest = (elapsed, sql)
+
+    def record(self):
+        """
+        Context manager installing the recorder on every connection.
+        """
+        stack = ExitStack()
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(self))
+        return stack
+
+    @property
+    def duplicates(self):
+        return {sql: count for sql, count in self.fingerprints.items() if count > 1}
+
+
+class RollingStats:
+    """
+    Last ROLLING_WINDOW requests per view, private to the process.
+    """
+
+    def __init__(self, window=ROLLING_WINDOW):
+        self.window = window
+        self._samples = defaultdict(lambda: deque(maxlen=self.window))
+        self._slowest = {}
+        self._duplicates = defaultdict(Counter)
+        self._lock = threading.Lock()
+
+    def add(self, view, recorder, total):
+        with self._lock:
+            self._samples[view].append((recorder.count, recorder.duration, total))
+            self._duplicates[view].update(recorder.duplicates)
+            if recorder.slowest[0] > self._slowest.get(view, (0.0, ''))[0]:
+                self._slowest[view] = recorder.slowest
+
+    def snapshot(self):
+        with self._lock:
+            views = {}
+            for view, samples in self._samples.items():
+                counts = [sample[0] for sample in samples]
+                db_times = sorted(sample[1] for sample in samples)
+                totals = sorted(sample[2] for sample in samples)
+                slowest_time, slowest_sql = self._slowest.get(view, (0.0, ''))
+                views[view] = {
+                    'requests': len(samples),
+                    'queries_avg': round(sum(counts) / len(counts), 1),
+                    'queries_max': max(counts),
+                    'db_ms_p50': ms(percentile(db_times, 50)),
+                    'total_ms_p50': ms(percentile(totals, 50)),
+                    'total_ms_p95': ms(percentile(totals, 95)),
+                    'slowest_query_ms': ms(slowest_time),
+                    'slowest_query': slowest_sql,
+                    'duplicate_queries': [
+                        {'sql': sql, 'count': count}
+                        for sql, count in self._duplicates[view].most_common(5)
+                    ],
+                }
+            return views
+
+    def clear(self):
+        with self._lock:
+            self._samples.clear()
+            self._slowest.clear()
+            self._duplicates.clear()
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))
+    return sorted_values[index]
+
+
+def ms(seconds):
+    return round(seconds * 1000, 2)
+
+
+rolling_stats = RollingStats()
+
+
+class QueryStatsMiddleware:
+    """
+    Per-request query count, DB time, duplicates and slowest statement.
+
+    Responses get a Server-Timing header the browser dev tools understand
+    under DEBUG, and for staff when the view loaded the user anyway or
+    the request sends TIMING_HEADER; the session and user are never
+    looked up just for the check. Every request feeds rolling_stats,
+    served as JSON by admin_panel's perf view. Queries run while a
+    streaming response is consumed are counted too; its header only
+    covers the queries made before the first byte.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        # Only the aggregates are kept: nothing here reads the statements
+        recorder = QueryRecorder(max_statements=0)
+        started = time.perf_counter()
+        with recorder.record():
+            response = self.get_response(request)
+            show_timing = self.show_timing(request)
+
+        if show_timing:
+            duplicated = sum(count - 1 for count in recorder.duplicates.values())
+            response['Server-Timing'] = ', '.join([
+                f'db;dur={ms(recorder.duration)};desc="{recorder.count} queries, {duplicated} duplicated"',
+                f'slowest;dur={ms(recorder.slowest[0])}',
+                f'total;dur={ms(time.perf_counter() - started)}',
+            ])
+
+        if response.streaming and not getattr(response, 'is_async', False):
+            response.streaming_content = self.stream(response.streaming_content, request, recorder, started)
+        else:
+            self.finish(request, recorder, started)
+        return response
+
+    def show_timing(self, request):
+        if settings.DEBUG:
+            return True
+        user = getattr(request, 'user', None)
+        if user is None:
+            return False
+        # request.user is lazy: only read it when it costs nothing or was asked for
+        loaded = getattr(user, '_wrapped', None) is not empty
+        return (loaded or TIMING_HEADER in request.headers) and user.is_staff
+
+    def stream(self, content, request, recorder, started):
+        try:
+            with recorder.record():
+                yield from content
+        finally:
+            self.finish(request, recorder, started)
+
+    def finish(self, request, recorder, started):
+        total = time.perf_counter() - started
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        rolling_stats.add(view, recorder, total)
+
+        slowest_time, slowest_sql = recorder.slowest
+        if slowest_time * 1000 >= SLOW_QUERY_MS:
+            logger.warning("Slow query (%.0f ms) in %s: %s", slowest_time * 1000, view, slowest_sql)
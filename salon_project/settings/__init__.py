@@ -0,0 +1,18 @@
+"""
+Pick the settings profile from DJANGO_ENV (dev by default):
+
+    DJANGO_ENV=prod gunicorn salon_project.wsgi
+
+or name it directly, DJANGO_SETTINGS_MODULE=salon_project.settings.prod.
+Each profile sets DJANGO_ENV itself, so both ways end up the same.
+"""
+from decouple import config
+
+DJANGO_ENV = config('DJANGO_ENV', default='dev')
+
+if DJANGO_ENV == 'prod':
+    from .prod import *  # noqa: F401,F403
+elif DJANGO_ENV == 'dev':
+    from .dev import *  # noqa: F401,F403
+else:
+    raise ImportError(f"Unknown DJANGO_ENV {DJANGO_ENV!r}, expected 'dev' or 'prod'")
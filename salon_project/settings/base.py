@@ -1,23 +1,18 @@
+"""
+Settings shared by every profile. dev.py and prod.py build on top of this;
+DJANGO_ENV picks which one is loaded (see __init__.py).
+"""
 import os
-import pymysql
-import mysql.connector
 from datetime import timedelta
-from decouple import config
+from decouple import config, Csv
 
-# Use PyMySQL as MySQLdb
-pymysql.install_as_MySQLdb()
-
-BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # SECURITY
 SECRET_KEY = config('SECRET_KEY', default='django-insecure-change-me')
-DEBUG = True
-
-ALLOWED_HOSTS = ['localhost', '127.0.0.1', '0.0.0.0']
+DEBUG = False
 
-# CORS Settings (if needed for other purposes)
-CORS_ALLOWED_ORIGINS = []
-CORS_ALLOW_CREDENTIALS = False
+ALLOWED_HOSTS = config('ALLOWED_HOSTS', default='localhost,127.0.0.1,0.0.0.0', cast=Csv())
 
 #Email Configuration
 
@@ -33,10 +28,6 @@ EMAIL_HOST_PASSWORD = 'uzrh yyzf ujck ynig'
 DEFAULT_FROM_EMAIL = 'Glamour Touch <glamourtouch58@gmail.com>'
 
 
-
-
-
-
 # APPLICATIONS
 INSTALLED_APPS = [
     'django.contrib.admin',
@@ -57,6 +48,8 @@ INSTALLED_APPS = [
 
 # MIDDLEWARE
 MIDDLEWARE = [
+    # First, so session/auth queries are counted too
+    'salon_project.query_stats.QueryStatsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -68,27 +61,12 @@ MIDDLEWARE = [
 
 ROOT_URLCONF = 'salon_project.urls'
 
-# REST Framework settings
-REST_FRAMEWORK = {
-    'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
-    ),
-    'DEFAULT_PERMISSION_CLASSES': [
-        'rest_framework.permissions.IsAuthenticated',
-    ],
-    'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
-        'rest_framework.renderers.BrowsableAPIRenderer',
-    ],
-}
-
-# JWT Settings
-SIMPLE_JWT = {
-    'ACCESS_TOKEN_LIFETIME': timedelta(minutes=60),
-    'REFRESH_TOKEN_LIFETIME': timedelta(days=1),
-    'ROTATE_REFRESH_TOKENS': True,
-    'BLACKLIST_AFTER_ROTATION': True,
-}
+# QUERY STATS (salon_project.query_stats)
+# Statements slower than this are logged; the window is requests kept per view
+QUERY_STATS_SLOW_MS = config('QUERY_STATS_SLOW_MS', default=100, cast=int)
+QUERY_STATS_WINDOW = 200
+# Staff send this request header to get Server-Timing on pages that never load the user
+QUERY_STATS_TIMING_HEADER = 'X-Server-Timing'
 
 # Static files (CSS, JavaScript, Images)
 STATIC_URL = '/static/'
@@ -97,6 +75,19 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# Hashed + precompressed static files once collected (needs collectstatic)
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'salon_project.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
+# Serve STATIC_ROOT from the WSGI handler in salon_project.static_handler
+SERVE_STATIC = config('SERVE_STATIC', default=True, cast=bool)
+
 # Media files
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
@@ -121,14 +112,18 @@ TEMPLATES = [
 WSGI_APPLICATION = 'salon_project.wsgi.application'
 
 # DATABASE
+# mysqlclient (C) when installed, PyMySQL otherwise; DB_DRIVER forces one.
+# The driver is imported by salon_project.db_backends.mysql on first query.
+DB_DRIVER = config('DB_DRIVER', default='auto')
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.mysql',
-        'NAME': 'salon_db',
-        'USER': 'root',  # Default MySQL username is 'root'
-        'PASSWORD': '',  # Replace with your MySQL root password
-        'HOST': 'localhost',
-        'PORT': '3306',
+        'ENGINE': 'salon_project.db_backends.mysql',
+        'NAME': config('DB_NAME', default='salon_db'),
+        'USER': config('DB_USER', default='root'),  # Default MySQL username is 'root'
+        'PASSWORD': config('DB_PASSWORD', default=''),
+        'HOST': config('DB_HOST', default='localhost'),
+        'PORT': config('DB_PORT', default='3306'),
         'OPTIONS': {
             'init_command': "SET sql_mode='STRICT_TRANS_TABLES', default_storage_engine=INNODB",
             'charset': 'utf8mb4',
@@ -141,6 +136,28 @@ DATABASES = {
     }
 }
 
+# Local stand-in without a MySQL server (benchmark_db_drivers.py, quick checks)
+if config('DB_ENGINE', default='mysql') == 'sqlite':
+    DATABASES['default'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': config('DB_SQLITE_PATH', default=os.path.join(BASE_DIR, 'db.sqlite3')),
+    }
+
+# CACHE
+# Any Django cache backend, e.g. django.core.cache.backends.redis.RedisCache
+# with CACHE_LOCATION=redis://127.0.0.1:6379/1 to share entries between workers
+CACHES = {
+    'default': {
+        'BACKEND': config('CACHE_BACKEND', default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config('CACHE_LOCATION', default='salon-cache'),
+    }
+}
+
+# RELEASE
+# Identifier of the deployed code (e.g. the git commit); pages cached by
+# booking.catalog are keyed by it so a deploy never serves stale HTML
+RELEASE = config('RELEASE', default='')
+
 # CUSTOM USER MODEL
 AUTH_USER_MODEL = 'booking.User'
 
@@ -186,11 +203,4 @@ TIME_ZONE = 'Asia/Kathmandu'
 USE_I18N = True
 USE_TZ = True
 
-# STATIC & MEDIA FILES
-STATIC_URL = '/static/'
-STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
-
-MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
-
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
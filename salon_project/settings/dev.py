@@ -0,0 +1,22 @@
+from copy import deepcopy
+
+from .base import *  # noqa: F401,F403
+
+DJANGO_ENV = 'dev'
+
+DEBUG = config('DEBUG', default=True, cast=bool)
+
+# The dicts below are copied before they change: base's are shared with
+# prod.py whenever both profiles get imported in one process
+
+# Plain files from STATICFILES_DIRS, no collectstatic needed
+STORAGES = {
+    **STORAGES,
+    'staticfiles': {
+        'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage',
+    },
+}
+
+# New connection per request, so a restarted local MySQL is picked up straight away
+DATABASES = deepcopy(DATABASES)
+DATABASES['default']['CONN_MAX_AGE'] = 0
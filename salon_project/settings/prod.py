@@ -0,0 +1,51 @@
+from copy import deepcopy
+from importlib.util import find_spec
+
+from salon_project.db_driver import install_mysql_driver
+
+from .base import *  # noqa: F401,F403
+
+DJANGO_ENV = 'prod'
+
+# Only for chasing a problem on a live box; booking.W001 warns while it is on
+DEBUG = config('DEBUG', default=False, cast=bool)
+
+# DATABASE
+# Keep connections open between requests instead of paying the MySQL
+# handshake + init_command every time; ping them before reuse.
+# Copied first: base's dict is shared with dev.py when both get imported.
+DATABASES = deepcopy(DATABASES)
+DATABASES['default']['CONN_MAX_AGE'] = config('DB_CONN_MAX_AGE', default=300, cast=int)
+DATABASES['default']['CONN_HEALTH_CHECKS'] = True
+
+# Optional pool shared by the threads of a worker (pip install django-db-connection-pool)
+DB_POOL = config('DB_POOL', default=False, cast=bool)
+
+if DB_POOL and find_spec('dj_db_conn_pool'):
+    # The pool's backend imports MySQLdb itself, bypassing db_backends.mysql
+    install_mysql_driver(DB_DRIVER)
+    DATABASES['default']['ENGINE'] = 'dj_db_conn_pool.backends.mysql'
+    DATABASES['default']['POOL_OPTIONS'] = {
+        'POOL_SIZE': config('DB_POOL_SIZE', default=10, cast=int),
+        'MAX_OVERFLOW': config('DB_POOL_MAX_OVERFLOW', default=10, cast=int),
+        'RECYCLE': config('DB_POOL_RECYCLE', default=3600, cast=int),
+        'PRE_PING': True,
+    }
+    # The pool owns reuse; Django hands the connection back after each request
+    DATABASES['default']['CONN_MAX_AGE'] = 0
+    DATABASES['default']['CONN_HEALTH_CHECKS'] = False
+
+# TEMPLATES
+# Parse each template once per process
+TEMPLATES = deepcopy(TEMPLATES)
+TEMPLATES[0]['APP_DIRS'] = False
+TEMPLATES[0]['OPTIONS']['loaders'] = [
+    ('django.template.loaders.cached.Loader', [
+        'django.template.loaders.filesystem.Loader',
+        'django.template.loaders.app_directories.Loader',
+    ]),
+]
+
+# SESSIONS
+# Served from the cache, written through to the database
+SESSION_ENGINE = 'django.contrib.sessions.backends.cached_db'
@@ -0,0 +1,103 @@
+import mimetypes
+import os
+import re
+from email.utils import formatdate
+
+
+# ManifestStaticFilesStorage inserts a 12 character md5 prefix: style.3d2f1a9c8b7e.css
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.[^/.]+$')
+
+CHUNK_SIZE = 64 * 1024
+
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'public, max-age=0, must-revalidate'
+
+
+class PrecompressedStaticFiles:
+    """
+    WSGI wrapper serving STATIC_ROOT straight from disk, ahead of Django.
+
+    Picks the .br / .gz variant written by CompressedManifestStaticFilesStorage
+    when the client accepts it (and .webp for images), and marks
+    content-hashed files as immutable. Anything else falls through to the
+    wrapped application.
+    """
+
+    def __init__(self, application, root, prefix):
+        self.application = application
+        self.root = os.path.realpath(root)
+        self.prefix = prefix if prefix.endswith('/') else prefix + '/'
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        if (
+            environ.get('REQUEST_METHOD') not in ('GET', 'HEAD')
+            or not path.startswith(self.prefix)
+        ):
+            return self.application(environ, start_response)
+
+        full_path = os.path.realpath(os.path.join(self.root, path[len(self.prefix):]))
+        if not full_path.startswith(self.root + os.sep) or not os.path.isfile(full_path):
+            return self.application(environ, start_response)
+
+        return self.serve(environ, start_response, full_path)
+
+    def pick_variant(self, environ, full_path):
+        """
+        Return (file path, content encoding, vary header).
+        """
+        content_type = mimetypes.guess_type(full_path)[0] or ''
+
+        if content_type.startswith('image/'):
+            accept = environ.get('HTTP_ACCEPT', '')
+            if 'image/webp' in accept and os.path.isfile(full_path + '.webp'):
+                return full_path + '.webp', None, 'Accept'
+            return full_path, None, 'Accept'
+
+        accept_encoding = environ.get('HTTP_ACCEPT_ENCODING', '')
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if encoding in accept_encoding and os.path.isfile(full_path + suffix):
+                return full_path + suffix, encoding, 'Accept-Encoding'
+        return full_path, None, 'Accept-Encoding'
+
+    def serve(self, environ, start_response, full_path):
+        variant, encoding, vary = self.pick_variant(environ, full_path)
+        stat = os.stat(variant)
+
+        content_type = mimetypes.guess_type(variant if variant.endswith('.webp') else full_path)[0]
+        etag = f'"{int(stat.st_mtime):x}-{stat.st_size:x}"'
+
+        headers = [
+            ('Content-Type', content_type or 'application/octet-stream'),
+            ('Last-Modified', formatdate(stat.st_mtime, usegmt=True)),
+            ('ETag', etag),
+            ('Cache-Control', IMMUTABLE if HASHED_NAME.search(full_path) else REVALIDATE),
+            ('Vary', vary),
+        ]
+        if encoding:
+            headers.append(('Content-Encoding', encoding))
+
+        if environ.get('HTTP_IF_NONE_MATCH') == etag:
+            start_response('304 Not Modified', headers)
+            return []
+
+        headers.append(('Content-Length', str(stat.st_size)))
+        start_response('200 OK', headers)
+
+        if environ['REQUEST_METHOD'] == 'HEAD':
+            return []
+
+        fh = open(variant, 'rb')
+        file_wrapper = environ.get('wsgi.file_wrapper')
+        if file_wrapper:
+            return file_wrapper(fh, CHUNK_SIZE)
+        return _read_chunks(fh)
+
+
+def _read_chunks(fh):
+    with fh:
+        while True:
+            chunk = fh.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
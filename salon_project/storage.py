@@ -0,0 +1,84 @@
+import gzip
+import logging
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+
+try:
+    import brotli
+except ImportError:  # optional: only gzip variants are written without it
+    brotli = None
+
+
+logger = logging.getLogger(__name__)
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    Content-hashed static files, plus precompressed and WebP variants
+    written next to them at collectstatic time:
+
+        css/style.3d2f1a9c8b7e.css      (hashed, cache forever)
+        css/style.3d2f1a9c8b7e.css.br
+        css/style.3d2f1a9c8b7e.css.gz
+        img/hero-bg.0c1d2e3f4a5b.jpg.webp
+
+    salon_project.static_handler serves the best variant per request.
+    """
+
+    compress_extensions = ('.css', '.js', '.svg', '.txt', '.json', '.map')
+    webp_extensions = ('.jpg', '.jpeg', '.png')
+    webp_quality = 80
+
+    # Variants that do not save at least this much are not kept
+    min_saving = 0.05
+
+    def hashed_name(self, name, content=None, filename=None):
+        try:
+            return super().hashed_name(name, content, filename)
+        except ValueError:
+            if content is not None:
+                raise
+            # Vendor CSS pointing at files we never shipped
+            # (lightbox.min.css -> images/loading.gif): leave the url() as is
+            logger.warning("Static reference %s not found, left unhashed", name)
+            return name
+
+    def post_process(self, paths, dry_run=False, **options):
+        written = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if hashed_name and not isinstance(processed, Exception):
+                written.add(hashed_name)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+
+        for name in sorted(written):
+            self.write_variants(name)
+
+    def write_variants(self, name):
+        path = self.path(name)
+        ext = os.path.splitext(name)[1].lower()
+
+        if ext in self.compress_extensions:
+            with open(path, 'rb') as fh:
+                data = fh.read()
+            self._keep_if_smaller(path + '.gz', data, gzip.compress(data, 9, mtime=0))
+            if brotli is not None:
+                self._keep_if_smaller(path + '.br', data, brotli.compress(data))
+
+        elif ext in self.webp_extensions:
+            # collectstatic only; {% static %} lookups at runtime never get here
+            from PIL import Image
+
+            with Image.open(path) as image:
+                if image.mode not in ('RGB', 'RGBA'):
+                    image = image.convert('RGBA')
+                image.save(path + '.webp', 'WEBP', quality=self.webp_quality, method=6)
+            if os.path.getsize(path + '.webp') > os.path.getsize(path) * (1 - self.min_saving):
+                os.remove(path + '.webp')
+
+    def _keep_if_smaller(self, target, original, compressed):
+        if len(compressed) <= len(original) * (1 - self.min_saving):
+            with open(target, 'wb') as fh:
+                fh.write(compressed)
@@ -0,0 +1,33 @@
+from contextlib import contextmanager
+
+from salon_project.query_stats import QueryRecorder
+
+
+class QueryBudgetMixin:
+    """
+    TestCase mixin: fail when a block runs more queries than it is allowed.
+
+        with self.assertMaxQueries(6):
+            self.client.get(reverse('services'))
+
+    Unlike assertNumQueries the budget is a ceiling, and the failure lists
+    the repeated statements, which is usually where an N+1 hides.
+    """
+
+    @contextmanager
+    def assertMaxQueries(self, budget):
+        recorder = QueryRecorder()
+        with recorder.record():
+            yield recorder
+
+        if recorder.count > budget:
+            repeated = "\n".join(
+                f"  {count}x {sql}" for sql, count in sorted(
+                    recorder.duplicates.items(), key=lambda item: -item[1]
+                )
+            ) or "  (none)"
+            self.fail(
+                f"{recorder.count} queries, budget is {budget}.\n"
+                f"Repeated statements:\n{repeated}\n"
+                f"All statements:\n" + "\n".join(f"  {sql}" for sql in recorder.statements)
+            )
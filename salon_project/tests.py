@@ -0,0 +1,161 @@
+import gzip
+import importlib
+import os
+import shutil
+import tempfile
+
+from django.test import SimpleTestCase
+
+from .static_handler import IMMUTABLE, REVALIDATE, PrecompressedStaticFiles
+from .storage import CompressedManifestStaticFilesStorage
+
+
+CSS = b"body { color: red; }\n" * 200
+
+
+class PrecompressedStaticFilesTest(SimpleTestCase):
+
+    def setUp(self):
+        self.base = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.base, ignore_errors=True)
+        self.root = os.path.join(self.base, 'static')
+
+        self.write('css/style.3d2f1a9c8b7e.css', CSS)
+        self.write('css/style.3d2f1a9c8b7e.css.gz', gzip.compress(CSS))
+        self.write('css/style.3d2f1a9c8b7e.css.br', b'brotli bytes')
+        self.write('css/plain.css', CSS)
+        self.write('img/hero.png', b'png bytes')
+        self.write('img/hero.png.webp', b'webp')
+        # Next to STATIC_ROOT, not inside it
+        with open(os.path.join(self.base, 'secret.txt'), 'wb') as fh:
+            fh.write(b'secret')
+        os.symlink(os.path.join(self.base, 'secret.txt'), os.path.join(self.root, 'link.txt'))
+
+        self.handler = PrecompressedStaticFiles(self.fallback, self.root, '/static/')
+
+    def write(self, name, data):
+        path = os.path.join(self.root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as fh:
+            fh.write(data)
+
+    def fallback(self, environ, start_response):
+        start_response('404 Not Found', [('Content-Type', 'text/plain')])
+        return [b'django']
+
+    def get(self, path, method='GET', **headers):
+        environ = {'REQUEST_METHOD': method, 'PATH_INFO': path}
+        environ.update({f"HTTP_{name.upper()}": value for name, value in headers.items()})
+        response = {}
+
+        def start_response(status, headers):
+            response['status'] = status
+            response['headers'] = dict(headers)
+
+        body = b''.join(self.handler(environ, start_response))
+        return response['status'], response['headers'], body
+
+    def test_paths_outside_the_root_fall_through(self):
+        for path in ('/static/../secret.txt', '/static/css/../../secret.txt', '/static/link.txt'):
+            status, _, body = self.get(path)
+            self.assertEqual((status, body), ('404 Not Found', b'django'), path)
+
+        self.assertEqual(self.get('/static/missing.css')[2], b'django')
+        self.assertEqual(self.get('/media/x.png')[2], b'django')
+        self.assertEqual(self.get('/static/css/plain.css', method='POST')[2], b'django')
+
+    def test_best_encoding_is_served(self):
+        path = '/static/css/style.3d2f1a9c8b7e.css'
+
+        _, headers, body = self.get(path, accept_encoding='gzip, deflate, br')
+        self.assertEqual((headers['Content-Encoding'], body), ('br', b'brotli bytes'))
+
+        _, headers, body = self.get(path, accept_encoding='gzip')
+        self.assertEqual(headers['Content-Encoding'], 'gzip')
+        self.assertEqual(gzip.decompress(body), CSS)
+
+        _, headers, body = self.get(path)
+        self.assertNotIn('Content-Encoding', headers)
+        self.assertEqual(body, CSS)
+        self.assertEqual(headers['Content-Type'], 'text/css')
+        self.assertEqual(headers['Vary'], 'Accept-Encoding')
+
+    def test_webp_is_negotiated_on_accept(self):
+        _, headers, body = self.get('/static/img/hero.png', accept='image/avif,image/webp,*/*')
+        self.assertEqual((headers['Content-Type'], body), ('image/webp', b'webp'))
+        self.assertEqual(headers['Vary'], 'Accept')
+
+        _, headers, body = self.get('/static/img/hero.png', accept='image/png')
+        self.assertEqual((headers['Content-Type'], body), ('image/png', b'png bytes'))
+
+    def test_hashed_names_are_immutable(self):
+        self.assertEqual(self.get('/static/css/style.3d2f1a9c8b7e.css')[1]['Cache-Control'], IMMUTABLE)
+        self.assertEqual(self.get('/static/css/plain.css')[1]['Cache-Control'], REVALIDATE)
+
+    def test_matching_etag_gets_a_304(self):
+        _, headers, _ = self.get('/static/css/plain.css')
+
+        status, again, body = self.get('/static/css/plain.css', if_none_match=headers['ETag'])
+        self.assertEqual((status, body), ('304 Not Modified', b''))
+        self.assertEqual(again['ETag'], headers['ETag'])
+
+        status, _, _ = self.get('/static/css/plain.css', if_none_match='"other"')
+        self.assertEqual(status, '200 OK')
+
+    def test_each_encoding_has_its_own_etag(self):
+        path = '/static/css/style.3d2f1a9c8b7e.css'
+        plain = self.get(path)[1]['ETag']
+        gzipped = self.get(path, accept_encoding='gzip')[1]['ETag']
+
+        self.assertNotEqual(plain, gzipped)
+        self.assertEqual(self.get(path, if_none_match=plain, accept_encoding='gzip')[0], '200 OK')
+
+    def test_head_has_headers_only(self):
+        status, headers, body = self.get('/static/css/plain.css', method='HEAD')
+        self.assertEqual((status, body), ('200 OK', b''))
+        self.assertEqual(headers['Content-Length'], str(len(CSS)))
+
+
+class CompressedStorageTest(SimpleTestCase):
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.storage = CompressedManifestStaticFilesStorage(location=self.root, base_url='/static/')
+
+    def write(self, name, data):
+        with open(os.path.join(self.root, name), 'wb') as fh:
+            fh.write(data)
+
+    def test_only_worthwhile_variants_are_kept(self):
+        self.write('big.css', CSS)
+        self.write('tiny.js', b'x')
+
+        self.storage.write_variants('big.css')
+        self.storage.write_variants('tiny.js')
+
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'big.css.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'tiny.js.gz')))
+        self.assertFalse(os.path.exists(os.path.join(self.root, 'tiny.js.br')))
+
+    def test_missing_vendor_reference_is_left_unhashed(self):
+        with self.assertLogs('salon_project.storage', 'WARNING'):
+            self.assertEqual(self.storage.hashed_name('images/loading.gif'), 'images/loading.gif')
+
+
+class SettingsProfileTest(SimpleTestCase):
+
+    def test_profiles_do_not_share_base_settings(self):
+        base = importlib.import_module('salon_project.settings.base')
+        dev = importlib.import_module('salon_project.settings.dev')
+        prod = importlib.import_module('salon_project.settings.prod')
+
+        self.assertEqual((dev.DJANGO_ENV, prod.DJANGO_ENV), ('dev', 'prod'))
+        self.assertEqual(
+            prod.STORAGES['staticfiles']['BACKEND'], 'salon_project.storage.CompressedManifestStaticFilesStorage',
+        )
+        self.assertEqual(base.STORAGES['staticfiles'], prod.STORAGES['staticfiles'])
+        self.assertNotEqual(dev.STORAGES['staticfiles'], prod.STORAGES['staticfiles'])
+        self.assertIsNot(dev.DATABASES['default'], prod.DATABASES['default'])
+        self.assertTrue(base.TEMPLATES[0]['APP_DIRS'])
+        self.assertIn('loaders', prod.TEMPLATES[0]['OPTIONS'])
@@ -7,10 +7,27 @@ For more information on this file, see
 https://docs.djangoproject.com/en/4.2/howto/deployment/wsgi/
 """
 
+import logging
 import os
 
+from django.conf import settings
+from django.core import checks
 from django.core.wsgi import get_wsgi_application
 
+from salon_project.static_handler import PrecompressedStaticFiles
+
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'salon_project.settings')
 
 application = get_wsgi_application()
+
+# Perf-hostile settings show up in the worker log at boot
+for warning in checks.run_checks(tags=['performance']):
+    logging.getLogger(__name__).warning("%s", warning)
+
+if settings.SERVE_STATIC and not settings.DEBUG:
+    # Precompressed, far-future cached static files, ahead of Django
+    application = PrecompressedStaticFiles(
+        application,
+        settings.STATIC_ROOT,
+        settings.STATIC_URL,
+    )